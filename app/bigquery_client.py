@@ -0,0 +1,114 @@
+"""
+Clientes de BigQuery compartidos por la API y los scripts
+
+Crear un ``bigquery.Client`` repite el descubrimiento de credenciales, la
+obtención del token y la creación de la sesión HTTP. ``get_client`` guarda un
+cliente por (proyecto, ubicación, credenciales) y lo reutiliza en el mismo
+proceso: el servicio de la API y los scripts que corren en los workers
+persistentes comparten la sesión y sus conexiones abiertas.
+
+Este módulo no importa la configuración de base de datos ni los servicios,
+así que los scripts lo pueden importar sin efectos secundarios.
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import bigquery
+from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
+
+from .config import settings
+
+# (proyecto, ubicación, archivo de credenciales) -> cliente
+_clients: Dict[Tuple[Optional[str], Optional[str], Optional[str]], bigquery.Client] = {}
+_lock = threading.Lock()
+stats = {"created": 0, "reused": 0}
+
+
+def build_client(
+    project: Optional[str] = None,
+    location: Optional[str] = None,
+    credentials: Optional[Any] = None,
+    client_options: Optional[Dict[str, Any]] = None,
+) -> bigquery.Client:
+    """
+    Crea un cliente con un pool de BIGQUERY_HTTP_POOL_SIZE conexiones HTTP
+
+    Args:
+        project: Proyecto de GCP (None = el de las credenciales)
+        location: Ubicación por defecto de los jobs
+        credentials: Credenciales (None = Application Default Credentials)
+        client_options: Opciones del cliente (por ejemplo ``api_endpoint``)
+
+    Returns:
+        Cliente de BigQuery nuevo
+    """
+    if credentials is None:
+        credentials, default_project = google.auth.default(scopes=bigquery.Client.SCOPE)
+        project = project or default_project
+
+    # requests conserva hasta pool_maxsize conexiones por host; con menos
+    # conexiones que hilos las sobrantes se cierran después de cada llamada
+    size = settings.BIGQUERY_HTTP_POOL_SIZE
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size, max_retries=3)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return bigquery.Client(
+        project=project,
+        credentials=credentials,
+        location=location,
+        client_options=client_options,
+        _http=session,
+    )
+
+
+def get_client(
+    project: Optional[str] = None,
+    location: Optional[str] = None,
+    credentials_path: Optional[str] = None,
+) -> bigquery.Client:
+    """
+    Cliente de BigQuery compartido en el proceso
+
+    Sin argumentos equivale a ``bigquery.Client()`` (Application Default
+    Credentials y el proyecto del entorno).
+
+    Args:
+        project: Proyecto de GCP (None = el de las credenciales)
+        location: Ubicación por defecto de los jobs
+        credentials_path: Archivo de service account (None = Application
+            Default Credentials)
+
+    Returns:
+        Cliente en caché para esa combinación, creado la primera vez
+    """
+    key = (project, location, credentials_path)
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            stats["reused"] += 1
+            return client
+
+        credentials = None
+        if credentials_path:
+            credentials = service_account.Credentials.from_service_account_file(
+                credentials_path, scopes=bigquery.Client.SCOPE
+            )
+        client = build_client(project, location, credentials)
+        _clients[key] = client
+        stats["created"] += 1
+        return client
+
+
+def clear_clients() -> None:
+    """Cierra y descarta los clientes en caché"""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
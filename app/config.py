@@ -26,6 +26,17 @@ class Settings(BaseSettings):
     BIGQUERY_DATASET_DEV: str = "staging"
     BIGQUERY_DATASET_PRD: str = "production"
     BIGQUERY_LOCATION: str = "us-central1"
+    # Consulta del estado de los jobs: espera inicial y máxima entre consultas
+    BIGQUERY_POLL_INITIAL_SECONDS: float = 0.5
+    BIGQUERY_POLL_MAX_SECONDS: float = 10.0
+    # Hilos para las llamadas cortas a la API (envío, reload, cancelación)
+    BIGQUERY_THREADS: int = 4
+    # Conexiones HTTP que conserva cada cliente (al menos BIGQUERY_THREADS)
+    BIGQUERY_HTTP_POOL_SIZE: int = 10
+    # Filas del resultado de un procedimiento que se descargan como muestra
+    PROCEDURE_PREVIEW_ROWS: int = 5
+    # Vigencia del catálogo de rutinas (INFORMATION_SCHEMA.ROUTINES) en memoria
+    ROUTINE_CACHE_TTL_SECONDS: float = 300.0
 
     # Configuración de entornos
     DEV_ENABLED: bool = True
@@ -40,6 +51,34 @@ class Settings(BaseSettings):
     # Timeouts (en segundos)
     SCRIPT_TIMEOUT: int = 300  # 5 minutos
     PROCEDURE_TIMEOUT: int = 600  # 10 minutos
+    # Espera entre SIGTERM y SIGKILL al terminar un script (timeout o cancelación)
+    SCRIPT_KILL_GRACE: float = 5.0
+
+    # Optimización (procesos para resolver por fragmentos, 0 = todos los CPUs)
+    OPTIMIZATION_WORKERS: int = 1
+    # Matriz de rangos de precio: archivo .json/.yaml o bq://proyecto.dataset.tabla
+    # (YAML requiere el extra "yaml")
+    PRICE_RANGES_SOURCE: Optional[str] = None
+    # Propagación de precios: "pandas" (en el contenedor) o "bigquery" (en SQL)
+    PRICE_PROPAGATION_MODE: str = "pandas"
+    # Escritura de tablas: filas por archivo Parquet y códec de compresión
+    UPLOAD_CHUNK_ROWS: int = 500_000
+    PARQUET_COMPRESSION: str = "snappy"
+
+    # Estado de los flujos: "memory" (por instancia) o "sql" (DATABASE_URL)
+    FLOW_STORE: str = "memory"
+    # Pasos de un flujo que se ejecutan a la vez cuando sus dependencias lo permiten
+    FLOW_MAX_CONCURRENCY: int = 4
+    # Checkpoints para reanudar flujos: archivo SQLite (None = en memoria)
+    FLOW_CHECKPOINT_PATH: Optional[str] = None
+
+    # Scripts: "subprocess" (un proceso por paso) o "worker" (procesos persistentes)
+    SCRIPT_EXECUTION_MODE: str = "subprocess"
+    SCRIPT_WORKERS: int = 2
+    # Caracteres de salida conservados por paso (inicio y final; el resto se omite)
+    SCRIPT_OUTPUT_MAX_CHARS: int = 100_000
+    # Segundos entre publicaciones de la salida parcial de los pasos en ejecución
+    FLOW_PROGRESS_INTERVAL: float = 2.0
 
     class Config:
         env_file = ".env"
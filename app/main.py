@@ -2,6 +2,9 @@
 Aplicación principal FastAPI para la API de Elasticidad
 """
 
+from contextlib import asynccontextmanager
+from typing import List
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
@@ -13,8 +16,11 @@ from .models.flow import (
     FlowResponse,
     FlowValidationRequest,
     FlowValidationResponse,
+    StepResult,
 )
+from .services.checkpoint_store import InMemoryCheckpointStore, SQLiteCheckpointStore
 from .services.flow_executor import FlowExecutor
+from .services.flow_runner import FlowRunner
 from .services.bigquery_service import bigquery_service
 
 # Configurar logging
@@ -28,10 +34,43 @@ logger.add(
 # Mensaje de prueba para verificar nivel DEBUG
 logger.info(f"Aplicación iniciando - DEBUG habilitado: {settings.LOG_LEVEL == 'DEBUG'}")
 
+# Inicializar executor y runner de flujos en segundo plano
+flow_executor = FlowExecutor()
+flow_runner = FlowRunner(
+    flow_executor,
+    checkpoints=(
+        SQLiteCheckpointStore(settings.FLOW_CHECKPOINT_PATH)
+        if settings.FLOW_CHECKPOINT_PATH
+        else InMemoryCheckpointStore()
+    ),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Configura el almacenamiento de flujos y detiene los flujos en curso"""
+    db_manager = None
+    if settings.FLOW_STORE == "sql":
+        from .services.flow_store import SQLFlowStore
+        from .utils.database import db_manager
+
+        await db_manager.initialize()
+        store = SQLFlowStore(db_manager)
+        await store.initialize()
+        flow_runner.store = store
+        logger.info("Estado de flujos almacenado en base de datos")
+    yield
+    await flow_runner.shutdown()
+    await flow_executor.close()
+    if db_manager:
+        await db_manager.close()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="API para ejecutar flujos de procesamiento en entornos DEV y PRD",
+    lifespan=lifespan,
 )
 
 # Configurar CORS
@@ -43,9 +82,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Inicializar executor
-flow_executor = FlowExecutor()
-
 
 @app.get("/")
 async def root():
@@ -67,16 +103,19 @@ async def health_check():
     return {"status": "healthy", "version": settings.APP_VERSION}
 
 
-@app.post("/dev/execute", response_model=FlowResponse)
+@app.post("/dev/execute", response_model=FlowResponse, status_code=202)
 async def execute_dev_flow(flow_request: FlowRequest):
     """
-    Ejecuta un flujo en el entorno de desarrollo
+    Inicia un flujo en el entorno de desarrollo
+
+    El flujo se ejecuta en segundo plano; su avance se consulta en
+    ``GET /flows/{flow_id}`` y ``GET /flows/{flow_id}/steps``.
 
     Args:
         flow_request: Configuración del flujo a ejecutar
 
     Returns:
-        FlowResponse: Resultado de la ejecución
+        FlowResponse: Estado inicial del flujo con su flow_id
     """
     if not settings.DEV_ENABLED:
         raise HTTPException(status_code=503, detail="El entorno DEV no está habilitado")
@@ -126,24 +165,32 @@ async def execute_dev_flow(flow_request: FlowRequest):
     logger.info(f"Ejecutando flujo DEV con {len(flow_request.flow)} pasos")
 
     try:
-        result = await flow_executor.execute_flow(flow_request.flow, environment="dev")
-        logger.info("Flujo DEV ejecutado exitosamente")
+        result = await flow_runner.submit(
+            flow_request.flow,
+            environment="dev",
+            metadata=flow_request.metadata,
+            on_failure=flow_request.on_failure,
+        )
+        logger.info(f"Flujo DEV {result.flow_id} iniciado")
         return result
     except Exception as e:
-        logger.error(f"Error ejecutando flujo DEV: {str(e)}")
+        logger.error(f"Error iniciando flujo DEV: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error en ejecución: {str(e)}")
 
 
-@app.post("/prd/execute", response_model=FlowResponse)
+@app.post("/prd/execute", response_model=FlowResponse, status_code=202)
 async def execute_prd_flow(flow_request: FlowRequest):
     """
-    Ejecuta un flujo en el entorno de producción
+    Inicia un flujo en el entorno de producción
+
+    El flujo se ejecuta en segundo plano; su avance se consulta en
+    ``GET /flows/{flow_id}`` y ``GET /flows/{flow_id}/steps``.
 
     Args:
         flow_request: Configuración del flujo a ejecutar
 
     Returns:
-        FlowResponse: Resultado de la ejecución
+        FlowResponse: Estado inicial del flujo con su flow_id
     """
     if not settings.PRD_ENABLED:
         raise HTTPException(status_code=503, detail="El entorno PRD no está habilitado")
@@ -151,11 +198,16 @@ async def execute_prd_flow(flow_request: FlowRequest):
     logger.info(f"Ejecutando flujo PRD con {len(flow_request.flow)} pasos")
 
     try:
-        result = await flow_executor.execute_flow(flow_request.flow, environment="prd")
-        logger.info("Flujo PRD ejecutado exitosamente")
+        result = await flow_runner.submit(
+            flow_request.flow,
+            environment="prd",
+            metadata=flow_request.metadata,
+            on_failure=flow_request.on_failure,
+        )
+        logger.info(f"Flujo PRD {result.flow_id} iniciado")
         return result
     except Exception as e:
-        logger.error(f"Error ejecutando flujo PRD: {str(e)}")
+        logger.error(f"Error iniciando flujo PRD: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error en ejecución: {str(e)}")
 
 
@@ -182,17 +234,99 @@ async def validate_flow_syntax(flow_request: FlowValidationRequest):
         raise HTTPException(status_code=400, detail=f"Error en validación: {str(e)}")
 
 
-@app.get("/procedures/{environment}")
-async def list_procedures(environment: str):
+@app.get("/flows/{flow_id}", response_model=FlowResponse)
+async def get_flow(flow_id: str):
     """
-    Lista los procedimientos disponibles en BigQuery para un entorno
+    Consulta el estado de un flujo
 
     Args:
-        environment: Entorno (dev o prd)
+        flow_id: ID del flujo devuelto por /dev/execute o /prd/execute
 
     Returns:
-        dict: Lista de procedimientos disponibles
+        FlowResponse: Estado actual del flujo y de sus pasos
+    """
+    flow = await flow_runner.get_flow(flow_id)
+    if flow is None:
+        raise HTTPException(status_code=404, detail=f"Flujo {flow_id} no encontrado")
+    return flow
+
+
+@app.get("/flows/{flow_id}/steps", response_model=List[StepResult])
+async def get_flow_steps(flow_id: str):
+    """
+    Consulta el avance de los pasos de un flujo
+
+    Args:
+        flow_id: ID del flujo
+
+    Returns:
+        List[StepResult]: Resultado actual de cada paso (pending, running, ...)
+    """
+    steps = await flow_runner.get_steps(flow_id)
+    if steps is None:
+        raise HTTPException(status_code=404, detail=f"Flujo {flow_id} no encontrado")
+    return steps
+
+
+@app.post("/flows/{flow_id}/resume", response_model=FlowResponse, status_code=202)
+async def resume_flow(flow_id: str, include_downstream: bool = False):
+    """
+    Reanuda un flujo desde sus pasos fallidos u omitidos
+
+    Los pasos que terminaron con éxito no se vuelven a ejecutar y conservan
+    su resultado registrado.
+
+    Args:
+        flow_id: ID del flujo
+        include_downstream: Volver a ejecutar también los pasos que dependen
+            de los pasos fallidos u omitidos
+
+    Returns:
+        FlowResponse: Estado inicial del flujo reanudado
+    """
+    actual = await flow_runner.get_flow(flow_id)
+    if actual and not getattr(settings, f"{actual.environment.upper()}_ENABLED"):
+        raise HTTPException(
+            status_code=503,
+            detail=f"El entorno {actual.environment.upper()} no está habilitado",
+        )
+
+    try:
+        flow = await flow_runner.resume(flow_id, include_downstream=include_downstream)
+    except (RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if flow is None:
+        raise HTTPException(
+            status_code=404, detail=f"Flujo {flow_id} sin checkpoint para reanudar"
+        )
+    return flow
+
+
+@app.post("/flows/{flow_id}/cancel", response_model=FlowResponse)
+async def cancel_flow(flow_id: str):
     """
+    Cancela un flujo en ejecución
+
+    Termina los scripts en curso (con sus procesos hijos) y cancela los jobs
+    de BigQuery en curso; los pasos sin terminar quedan "cancelled".
+
+    Args:
+        flow_id: ID del flujo
+
+    Returns:
+        FlowResponse: Estado final del flujo cancelado
+    """
+    try:
+        flow = await flow_runner.cancel(flow_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if flow is None:
+        raise HTTPException(status_code=404, detail=f"Flujo {flow_id} no encontrado")
+    return flow
+
+
+def _check_environment(environment: str) -> None:
+    """Valida que el entorno exista y esté habilitado"""
     if environment not in ["dev", "prd"]:
         raise HTTPException(status_code=400, detail="El entorno debe ser 'dev' o 'prd'")
 
@@ -202,6 +336,22 @@ async def list_procedures(environment: str):
     if environment == "prd" and not settings.PRD_ENABLED:
         raise HTTPException(status_code=503, detail="El entorno PRD no está habilitado")
 
+
+@app.get("/procedures/{environment}")
+async def list_procedures(environment: str):
+    """
+    Lista los procedimientos disponibles en BigQuery para un entorno
+
+    La lista sale del catálogo en caché (ver ``POST /procedures/{environment}/refresh``).
+
+    Args:
+        environment: Entorno (dev o prd)
+
+    Returns:
+        dict: Lista de procedimientos disponibles
+    """
+    _check_environment(environment)
+
     try:
         procedures = await bigquery_service.list_procedures(environment)
         return {
@@ -216,6 +366,38 @@ async def list_procedures(environment: str):
         )
 
 
+@app.post("/procedures/{environment}/refresh")
+async def refresh_procedures(environment: str):
+    """
+    Vuelve a consultar el catálogo de rutinas de un entorno en BigQuery
+
+    Útil después de crear o eliminar un procedimiento, sin esperar a que
+    venza la caché (ROUTINE_CACHE_TTL_SECONDS).
+
+    Args:
+        environment: Entorno (dev o prd)
+
+    Returns:
+        dict: Procedimientos disponibles según el catálogo actualizado
+    """
+    _check_environment(environment)
+
+    bigquery_service.invalidate_routines(environment)
+    try:
+        await bigquery_service.get_routines(environment, refresh=True)
+    except Exception as e:
+        logger.error(f"Error actualizando rutinas de {environment}: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error accediendo a BigQuery: {str(e)}"
+        )
+    procedures = await bigquery_service.list_procedures(environment)
+    return {
+        "environment": environment,
+        "total_procedures": len(procedures),
+        "procedures": procedures,
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,21 +1,25 @@
 """Modelos de la aplicación"""
 
 from .flow import (
+    FailurePolicy,
     FlowRequest,
     FlowResponse,
     FlowStep,
     FlowValidationRequest,
     FlowValidationResponse,
+    ScriptExecutionMode,
     StepResult,
     StepType,
 )
 
 __all__ = [
+    "FailurePolicy",
     "FlowRequest",
     "FlowResponse",
     "FlowStep",
     "FlowValidationRequest",
     "FlowValidationResponse",
+    "ScriptExecutionMode",
     "StepResult",
     "StepType",
 ]
@@ -16,6 +16,21 @@ class StepType(str, Enum):
     CALL_PROCEDURE = "call_procedure"  # Alias para procedure
 
 
+class ScriptExecutionMode(str, Enum):
+    """Cómo se ejecutan los pasos de tipo script"""
+
+    SUBPROCESS = "subprocess"  # Un proceso de Python nuevo por paso
+    WORKER = "worker"  # Procesos persistentes con las librerías precargadas
+
+
+class FailurePolicy(str, Enum):
+    """Qué hacer con el resto del flujo cuando un paso falla"""
+
+    CONTINUE = "continue"  # Ejecutar los pasos restantes
+    STOP = "stop"  # No iniciar más pasos; los pendientes quedan omitidos
+    SKIP_DEPENDENTS = "skip_dependents"  # Omitir los pasos que dependen del fallido
+
+
 class FlowStep(BaseModel):
     """Modelo para un paso individual del flujo"""
 
@@ -28,6 +43,29 @@ class FlowStep(BaseModel):
     timeout: Optional[int] = Field(
         default=None, description="Timeout específico para este paso en segundos"
     )
+    depends_on: Optional[List[int]] = Field(
+        default=None,
+        description=(
+            "Pasos que deben terminar antes de este. None = el paso anterior "
+            "(ejecución secuencial); [] = sin dependencias"
+        ),
+    )
+    on_failure: Optional[FailurePolicy] = Field(
+        default=None,
+        description="Política si este paso falla (None = la política del flujo)",
+    )
+    execution: Optional[ScriptExecutionMode] = Field(
+        default=None,
+        description="Modo de ejecución del script (None = SCRIPT_EXECUTION_MODE)",
+    )
+    preview_rows: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description=(
+            "Filas del resultado del procedimiento que se incluyen en la "
+            "salida (None = PROCEDURE_PREVIEW_ROWS)"
+        ),
+    )
 
     @field_validator("name")
     @classmethod
@@ -46,10 +84,84 @@ class FlowStep(BaseModel):
         return v
 
 
+def resolve_dependencies(steps: List[FlowStep]) -> Dict[int, List[int]]:
+    """
+    Obtiene las dependencias de cada paso del flujo
+
+    Un paso sin ``depends_on`` depende del paso anterior en orden de número,
+    lo que conserva la ejecución secuencial de los flujos sin dependencias.
+
+    Args:
+        steps: Pasos del flujo
+
+    Returns:
+        Diccionario {paso: [pasos de los que depende]}
+
+    Raises:
+        ValueError: Si un paso depende de sí mismo o de un paso inexistente
+    """
+    numeros = sorted(step.step for step in steps)
+    existentes = set(numeros)
+    dependencias = {}
+    for step in sorted(steps, key=lambda x: x.step):
+        if step.depends_on is None:
+            posicion = numeros.index(step.step)
+            dependencias[step.step] = [numeros[posicion - 1]] if posicion else []
+            continue
+        if step.step in step.depends_on:
+            raise ValueError(f"El paso {step.step} no puede depender de sí mismo")
+        faltantes = sorted(set(step.depends_on) - existentes)
+        if faltantes:
+            raise ValueError(
+                f"El paso {step.step} depende de pasos inexistentes: {faltantes}"
+            )
+        dependencias[step.step] = sorted(set(step.depends_on))
+    return dependencias
+
+
+def find_cycle(dependencies: Dict[int, List[int]]) -> Optional[List[int]]:
+    """
+    Busca un ciclo en el grafo de dependencias
+
+    Args:
+        dependencies: Resultado de ``resolve_dependencies``
+
+    Returns:
+        Pasos del ciclo (el primero se repite al final) o None si no hay
+    """
+    visitado: Dict[int, int] = {}  # 1 = en el recorrido actual, 2 = terminado
+    camino: List[int] = []
+
+    def visitar(paso: int) -> Optional[List[int]]:
+        visitado[paso] = 1
+        camino.append(paso)
+        for previo in dependencies.get(paso, []):
+            if visitado.get(previo) == 1:
+                return camino[camino.index(previo) :] + [previo]
+            if previo not in visitado:
+                ciclo = visitar(previo)
+                if ciclo:
+                    return ciclo
+        camino.pop()
+        visitado[paso] = 2
+        return None
+
+    for paso in sorted(dependencies):
+        if paso not in visitado:
+            ciclo = visitar(paso)
+            if ciclo:
+                return ciclo
+    return None
+
+
 class FlowRequest(BaseModel):
     """Modelo para la solicitud de ejecución de flujo"""
 
     flow: List[FlowStep] = Field(..., description="Lista de pasos del flujo")
+    on_failure: FailurePolicy = Field(
+        default=FailurePolicy.CONTINUE,
+        description="Política cuando un paso falla: continue, stop, skip_dependents",
+    )
     metadata: Optional[Dict[str, Any]] = Field(
         default=None, description="Metadatos adicionales para el flujo"
     )
@@ -72,6 +184,13 @@ class FlowRequest(BaseModel):
                 f"Esperado: {expected_steps}, Recibido: {steps}"
             )
 
+        # Verificar que las dependencias formen un grafo acíclico
+        cycle = find_cycle(resolve_dependencies(v))
+        if cycle:
+            raise ValueError(
+                f"Ciclo de dependencias entre pasos: {' -> '.join(map(str, cycle))}"
+            )
+
         return v
 
     class Config:
@@ -126,8 +245,10 @@ class StepResult(BaseModel):
     step: int
     type: StepType
     name: str
-    status: str = Field(..., description="success, error, skipped")
-    start_time: datetime
+    status: str = Field(
+        ..., description="pending, running, success, error, skipped, cancelled"
+    )
+    start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     duration_seconds: Optional[float] = None
     output: Optional[str] = None
@@ -140,13 +261,16 @@ class FlowResponse(BaseModel):
 
     flow_id: str = Field(..., description="ID único del flujo ejecutado")
     environment: str = Field(..., description="Entorno donde se ejecutó (dev/prd)")
-    status: str = Field(..., description="success, partial_success, error")
+    status: str = Field(
+        ..., description="running, success, partial_success, error, cancelled"
+    )
     start_time: datetime
     end_time: Optional[datetime] = None
     duration_seconds: Optional[float] = None
     total_steps: int
     successful_steps: int
     failed_steps: int
+    skipped_steps: int = 0
     results: List[StepResult] = Field(..., description="Resultados de cada paso")
     error_summary: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
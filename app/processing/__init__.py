@@ -0,0 +1,42 @@
+"""Procesamiento numérico compartido por los scripts del flujo"""
+
+from .bounds import agregar_limites, cargar_rangos
+from .indicators import INDICADORES, Indicador, ejecutar_indicadores
+from .parallel import ejecutar_por_fragmentos
+from .price_solver import (
+    MODELOS,
+    comparar_resultados,
+    resolver_lote,
+    resolver_slsqp,
+)
+from .propagation import propagar_valor
+from .query_builder import sql_lectura
+from .query_reader import leer_consulta
+from .schemas import tipos_de, unificar_categorias
+from .smoothing import aplicar_suavizado, crear_estrategias, suavizar_elasticidades
+from .step_metrics import MetricasPaso
+from .table_writer import EscritorBigQuery, EscritorLocal
+
+__all__ = [
+    "agregar_limites",
+    "cargar_rangos",
+    "INDICADORES",
+    "Indicador",
+    "ejecutar_indicadores",
+    "ejecutar_por_fragmentos",
+    "MODELOS",
+    "comparar_resultados",
+    "resolver_lote",
+    "resolver_slsqp",
+    "propagar_valor",
+    "sql_lectura",
+    "leer_consulta",
+    "tipos_de",
+    "unificar_categorias",
+    "aplicar_suavizado",
+    "crear_estrategias",
+    "suavizar_elasticidades",
+    "MetricasPaso",
+    "EscritorBigQuery",
+    "EscritorLocal",
+]
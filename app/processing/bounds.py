@@ -0,0 +1,176 @@
+"""
+Rangos de precio permitidos por grupo de artículo y canal de venta
+
+La matriz de rangos (grupo_articulo × canal) se carga una sola vez por
+proceso, se transforma a formato largo y se une con la tabla de optimización
+en una sola operación vectorizada para obtener ``precio_min``/``precio_max``.
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+CANALES = ("PU", "MM", "MA", "DI")
+
+# Canal usado para canales no contemplados en la matriz
+CANAL_POR_DEFECTO = "PU"
+
+# Prefijo para leer la matriz desde una tabla de BigQuery
+PREFIJO_BIGQUERY = "bq://"
+
+# Matriz por defecto: variación máxima permitida (fracción) por canal
+RANGOS_POR_DEFECTO = [
+    ["ABARROTES COMESTIBLES", 0.05, 0.04, 0.03, 0.02],
+    ["LÁCTEOS", 0.04, 0.03, 0.02, 0.01],
+    ["ABARROTES INSTITUCIONAL", 0.06, 0.05, 0.04, 0.03],
+    ["COMIDAS PREPARADAS", 0.05, 0.04, 0.03, 0.02],
+    ["CONGELADOS", 0.05, 0.04, 0.03, 0.02],
+    ["RES", 0.06, 0.05, 0.04, 0.03],
+    ["BEBIDAS NO ALCOHÓLICAS", 0.04, 0.03, 0.02, 0.01],
+    ["ABARROTES NO COMESTIBLES", 0.06, 0.05, 0.04, 0.03],
+    ["VÍSCERAS Y OTROS", 0.08, 0.06, 0.05, 0.04],
+    ["CERDO", 0.06, 0.05, 0.04, 0.03],
+    ["FRUTAS Y VERDURAS", 0.05, 0.04, 0.03, 0.02],
+    ["CARNES FRÍAS", 0.05, 0.04, 0.03, 0.02],
+    ["MADURADOS", 0.06, 0.05, 0.04, 0.03],
+    ["CREMAS Y YOGHURTS", 0.04, 0.03, 0.02, 0.01],
+    ["PESCADOS Y MARISCOS", 0.06, 0.05, 0.04, 0.03],
+    ["AVES", 0.05, 0.04, 0.03, 0.02],
+]
+
+
+def _normalizar(datos) -> pd.DataFrame:
+    """Convierte registros o un mapeo {grupo: {canal: rango}} a DataFrame ancho"""
+    if isinstance(datos, dict):
+        df = pd.DataFrame.from_dict(datos, orient="index")
+        df.index.name = "grupo_articulo"
+        df = df.reset_index()
+    else:
+        df = pd.DataFrame(datos)
+
+    faltantes = {"grupo_articulo", *CANALES} - set(df.columns)
+    if faltantes:
+        raise ValueError(
+            f"La matriz de rangos no tiene las columnas: {sorted(faltantes)}"
+        )
+    return df[["grupo_articulo", *CANALES]]
+
+
+def _leer_archivo(ruta: Path) -> pd.DataFrame:
+    """Lee la matriz desde un archivo JSON o YAML"""
+    with open(ruta, encoding="utf-8") as archivo:
+        if ruta.suffix.lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError as e:
+                raise RuntimeError(
+                    "Se requiere PyYAML para leer rangos desde YAML; "
+                    'instalar el extra con pip install -e ".[yaml]"'
+                ) from e
+            datos = yaml.safe_load(archivo)
+        else:
+            datos = json.load(archivo)
+    return _normalizar(datos)
+
+
+def _leer_bigquery(tabla: str) -> pd.DataFrame:
+    """Lee la matriz desde una tabla de BigQuery con el cliente compartido"""
+    from app.bigquery_client import get_client
+
+    from .query_reader import leer_consulta
+
+    columnas = ", ".join(["grupo_articulo", *CANALES])
+    query = f"SELECT {columnas} FROM `{tabla}`"
+    return _normalizar(leer_consulta(get_client(), query))
+
+
+@lru_cache(maxsize=None)
+def _cargar_rangos(fuente: Optional[str]) -> pd.DataFrame:
+    if not fuente:
+        return pd.DataFrame(RANGOS_POR_DEFECTO, columns=["grupo_articulo", *CANALES])
+    if fuente.startswith(PREFIJO_BIGQUERY):
+        return _leer_bigquery(fuente[len(PREFIJO_BIGQUERY) :])
+    return _leer_archivo(Path(fuente))
+
+
+def cargar_rangos(fuente: Optional[str] = None) -> pd.DataFrame:
+    """
+    Carga la matriz de rangos (una vez por proceso y fuente)
+
+    Args:
+        fuente: None para la matriz por defecto, ruta a un archivo
+            ``.json``/``.yaml`` o ``bq://proyecto.dataset.tabla``
+
+    Returns:
+        DataFrame ancho con columnas grupo_articulo, PU, MM, MA, DI; es una
+        copia, modificarla no cambia la matriz guardada para otras ejecuciones
+    """
+    return _cargar_rangos(fuente).copy()
+
+
+def rangos_largos(df_rangos: pd.DataFrame) -> pd.Series:
+    """
+    Transforma la matriz a formato largo indexado por (grupo_articulo, canal)
+
+    Si un grupo aparece más de una vez se usa su primera fila, igual que la
+    regla original fila por fila.
+
+    Args:
+        df_rangos: Matriz ancha de rangos
+
+    Returns:
+        Serie con el rango indexada por (grupo_articulo, id_canal_venta)
+    """
+    largo = df_rangos.drop_duplicates("grupo_articulo", keep="first").melt(
+        id_vars="grupo_articulo",
+        value_vars=list(CANALES),
+        var_name="id_canal_venta",
+        value_name="rango",
+    )
+    return largo.set_index(["grupo_articulo", "id_canal_venta"])["rango"].astype(float)
+
+
+def agregar_limites(
+    df: pd.DataFrame, df_rangos: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Agrega ``precio_min``/``precio_max`` según grupo de artículo y canal
+
+    Los canales que no están en la matriz usan el rango de 'PU'.
+
+    Args:
+        df: Tabla de optimización (se modifica y se devuelve)
+        df_rangos: Matriz ancha de rangos; por defecto ``cargar_rangos()``
+
+    Returns:
+        El mismo DataFrame con las columnas de límites
+
+    Raises:
+        ValueError: Si hay grupos de artículo sin rango definido
+    """
+    if df_rangos is None:
+        df_rangos = cargar_rangos()
+
+    # astype(object): una columna categórica no acepta el canal por defecto
+    # si no está entre sus categorías
+    canal = (
+        df["id_canal_venta"]
+        .astype(object)
+        .where(df["id_canal_venta"].isin(CANALES), CANAL_POR_DEFECTO)
+    )
+    claves = pd.MultiIndex.from_arrays([df["grupo_articulo"].astype(object), canal])
+    rango = rangos_largos(df_rangos).reindex(claves).to_numpy()
+
+    sin_rango = np.isnan(rango)
+    if sin_rango.any():
+        grupos = sorted(map(str, df.loc[sin_rango, "grupo_articulo"].unique()))
+        raise ValueError(f"Grupos de artículo sin rango de precio: {grupos}")
+
+    precio = df["precio_unitario_promedio"].to_numpy(dtype=float)
+    df["precio_min"] = (1.0 - rango) * precio
+    df["precio_max"] = (1.0 + rango) * precio
+    return df
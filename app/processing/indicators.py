@@ -0,0 +1,189 @@
+"""
+Registro de indicadores externos y su propagación
+
+Cada indicador (tasa de ocupación, tipo de cambio, INPC, ...) se describe de
+forma declarativa: consulta de origen, claves de grupo, orden, columna de
+valor y tabla destino. Un mismo motor descarga, propaga (ver
+``propagation.propagar_valor``), depura y sube cada indicador; los
+indicadores son independientes y se procesan de forma concurrente. Agregar
+un indicador nuevo (p. ej. PIB) consiste en agregar una entrada a
+``INDICADORES``.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+from pydantic import BaseModel, Field
+
+from .propagation import UMBRAL_POR_DEFECTO, propagar_valor
+from .query_reader import leer_consulta
+from .table_writer import EscritorBigQuery, EscritorParquet
+
+
+class Indicador(BaseModel):
+    """Definición declarativa de un indicador externo"""
+
+    nombre: str = Field(..., description="Identificador del indicador")
+    query: str = Field(..., description="Consulta de origen en BigQuery")
+    tabla_destino: str = Field(..., description="Tabla destino (dataset.tabla)")
+    claves: List[str] = Field(
+        default_factory=list, description="Columnas de grupo (vacía = una serie)"
+    )
+    orden: List[str] = Field(..., description="Columnas de orden dentro del grupo")
+    valor: str = Field(..., description="Columna con el valor a propagar")
+    columnas: Optional[List[str]] = Field(
+        default=None, description="Columnas a conservar (None = todas)"
+    )
+    deduplicar: Optional[List[str]] = Field(
+        default=None,
+        description="Subconjunto para drop_duplicates (None = sin depurar)",
+    )
+    umbral: float = Field(
+        default=UMBRAL_POR_DEFECTO, description="Variación relativa para propagar"
+    )
+
+
+INDICADORES: List[Indicador] = [
+    Indicador(
+        nombre="tasa_ocupacion",
+        query="""
+    SELECT
+        Periodo,
+        Trimestre,
+        Entidad_Federativa,
+        100*(SUM(`Población_ocupada`)/SUM(`Población_en_edad_de_trabajar`)) AS tasa_ocupacion
+    FROM `fuentes_externas.tasa_neta_ocupacion`
+    WHERE
+        Entidad_Federativa != 'Nacional'
+    GROUP BY
+        Periodo,
+        Trimestre,
+        Entidad_Federativa
+""",
+        tabla_destino="staging.variaciones_tasa_ocupacion_filtrado",
+        claves=["Entidad_Federativa"],
+        orden=["Periodo", "Trimestre"],
+        valor="tasa_ocupacion",
+        columnas=["Entidad_Federativa", "Periodo", "Trimestre", "tasa_ocupacion"],
+        deduplicar=["Entidad_Federativa", "tasa_ocupacion"],
+    ),
+    Indicador(
+        nombre="tipo_cambio",
+        query="""
+    SELECT
+      fecha,
+      AVG(tipo_cambio) AS tipo_cambio_dia,
+    FROM `fuentes_externas.tipo_cambio`
+    GROUP BY fecha
+""",
+        tabla_destino="staging.variaciones_tipo_cambio_filtrado",
+        orden=["fecha"],
+        valor="tipo_cambio_dia",
+        columnas=["fecha", "tipo_cambio_dia"],
+        deduplicar=["tipo_cambio_dia"],
+    ),
+    Indicador(
+        nombre="inpc",
+        query="""
+    SELECT
+      fecha,
+      AVG(inpc_nacional) AS inpc_avg,
+    FROM `fuentes_externas.ipc_mensual`
+    GROUP BY fecha
+""",
+        tabla_destino="staging.variaciones_inpc_filtrado",
+        orden=["fecha"],
+        valor="inpc_avg",
+        columnas=["fecha", "inpc_avg"],
+        deduplicar=["inpc_avg"],
+    ),
+]
+
+
+def procesar_indicador(df: pd.DataFrame, indicador: Indicador) -> pd.DataFrame:
+    """
+    Propaga el valor del indicador y depura los valores repetidos
+
+    Args:
+        df: Resultado de la consulta del indicador
+        indicador: Definición del indicador
+
+    Returns:
+        DataFrame ordenado con el valor propagado en su columna original
+    """
+    if indicador.columnas:
+        df = df[indicador.columnas]
+    adaptada = f"{indicador.valor}_adaptada"
+    df = propagar_valor(
+        df,
+        claves=indicador.claves,
+        orden=indicador.orden,
+        valor=indicador.valor,
+        umbral=indicador.umbral,
+        columna_valor=adaptada,
+    )
+    df[indicador.valor] = df[adaptada]
+    df = df.drop(columns=[adaptada])
+    if indicador.deduplicar:
+        df = df.drop_duplicates(subset=indicador.deduplicar, keep="first")
+    return df
+
+
+def ejecutar_indicador(
+    client,
+    indicador: Indicador,
+    proyecto: str,
+    escritor: Optional[EscritorParquet] = None,
+) -> int:
+    """
+    Descarga, procesa y sube un indicador
+
+    Args:
+        client: Cliente de BigQuery
+        indicador: Definición del indicador
+        proyecto: Proyecto de la tabla destino
+        escritor: Escritor de la tabla destino (None = ``EscritorBigQuery``)
+
+    Returns:
+        Filas escritas en la tabla destino
+    """
+    df = procesar_indicador(leer_consulta(client, indicador.query), indicador)
+    escritor = escritor or EscritorBigQuery(client)
+    escritor.escribir(df, f"{proyecto}.{indicador.tabla_destino}")
+    return len(df)
+
+
+def ejecutar_indicadores(
+    client,
+    proyecto: str,
+    indicadores: Sequence[Indicador] = INDICADORES,
+    max_workers: Optional[int] = None,
+    escritor: Optional[EscritorParquet] = None,
+) -> Dict[str, Any]:
+    """
+    Ejecuta los indicadores de forma concurrente compartiendo un cliente
+
+    Args:
+        client: Cliente de BigQuery
+        proyecto: Proyecto de las tablas destino
+        indicadores: Indicadores a ejecutar (por defecto ``INDICADORES``)
+        max_workers: Hilos concurrentes (None = uno por indicador)
+        escritor: Escritor de las tablas destino (None = ``EscritorBigQuery``)
+
+    Returns:
+        Diccionario {nombre: filas escritas}
+
+    Raises:
+        Exception: El primer error de un indicador, después de terminar los demás
+    """
+    if not indicadores:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(indicadores)) as pool:
+        futuros = {
+            indicador.nombre: pool.submit(
+                ejecutar_indicador, client, indicador, proyecto, escritor
+            )
+            for indicador in indicadores
+        }
+    return {nombre: futuro.result() for nombre, futuro in futuros.items()}
@@ -0,0 +1,159 @@
+"""
+Selección del modelo (aproximado/exacto) por material/zona/canal
+
+Antes se resolvían ambos modelos para todas las filas y luego se descartaba
+la mitad con un ``merge`` contra ``df_metodo``. Aquí el modelo se decide
+primero y sólo se resuelve el que se conserva, en una pasada sobre un único
+DataFrame.
+"""
+
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .price_solver import MODELO_APROXIMADO, MODELO_EXACTO, MODELOS
+
+CLAVES = ["id_material", "id_zona", "id_canal_venta"]
+
+# Observaciones mínimas de elasticidad para usar el modelo exacto
+MIN_OBSERVACIONES_EXACTA = 12
+
+# Elasticidad absoluta a partir de la cual se usa el modelo exacto
+ELASTICIDAD_EXACTA = 2
+
+# Variación máxima de precio a partir de la cual se usa el modelo exacto
+VARIACION_PRECIO_EXACTA = 0.05
+
+
+def seleccionar_modelo(df_check: pd.DataFrame, df_cambio: pd.DataFrame) -> pd.DataFrame:
+    """
+    Decide el modelo por material/zona/canal
+
+    Se evalúa la historia de elasticidad (``df_check``) y la variación máxima
+    de precio (``df_cambio``); si ambos criterios coinciden se usa ese modelo,
+    si difieren se usa el exacto.
+
+    Args:
+        df_check: Elasticidades históricas con ``elasticidad_promedio_historico_count``
+        df_cambio: Precios semanales con ``precio_unitario_promedio_anterior``
+
+    Returns:
+        DataFrame ``df_metodo`` con las claves y la columna ``modelo``
+    """
+    df_check = df_check.copy()
+    df_check["elasticidad_promedio_historico_count"] = df_check[
+        "elasticidad_promedio_historico_count"
+    ].fillna(0)
+    df_check["modelo_elast"] = np.select(
+        [
+            df_check["elasticidad_promedio_historico_count"]
+            >= MIN_OBSERVACIONES_EXACTA,
+            np.abs(df_check["elasticidad_promedio_historico"]) > ELASTICIDAD_EXACTA,
+        ],
+        [MODELO_EXACTO, MODELO_EXACTO],
+        default=MODELO_APROXIMADO,
+    )
+
+    var_precio = np.abs(
+        (
+            df_cambio["precio_unitario_promedio"]
+            - df_cambio["precio_unitario_promedio_anterior"]
+        )
+        / df_cambio["precio_unitario_promedio_anterior"]
+    )
+    df_var_precio = (
+        df_cambio[CLAVES]
+        .assign(var_precio=var_precio)
+        .groupby(by=CLAVES, observed=True)
+        .max()
+        .reset_index()
+    )
+    df_var_precio["modelo_precio"] = np.where(
+        df_var_precio["var_precio"] > VARIACION_PRECIO_EXACTA,
+        MODELO_EXACTO,
+        MODELO_APROXIMADO,
+    )
+
+    df_metodo = df_check.merge(df_var_precio, on=CLAVES, how="left")
+    df_metodo["modelo"] = np.where(
+        df_metodo["modelo_elast"] == df_metodo["modelo_precio"],
+        df_metodo["modelo_elast"],
+        MODELO_EXACTO,
+    )
+    return df_metodo
+
+
+def optimizar_por_modelo(
+    df: pd.DataFrame,
+    df_metodo: pd.DataFrame,
+    resolver: Callable[[pd.DataFrame, str], pd.DataFrame],
+    efectos: Dict[str, str],
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Resuelve cada fila sólo con el modelo seleccionado
+
+    La salida conserva el orden y la multiplicidad del flujo anterior
+    (``concat`` de ambos modelos seguido de ``merge`` interno con
+    ``df_metodo``), pero cada par fila/modelo se resuelve una sola vez.
+
+    Args:
+        df: Tabla de optimización con límites de precio y coeficientes
+        df_metodo: Resultado de ``seleccionar_modelo``
+        resolver: Función ``(df, modelo) -> DataFrame`` que resuelve un modelo
+        efectos: Columna de ``df`` con el efecto externo de cada modelo
+
+    Returns:
+        Tupla (df_salida, resumen) con el resumen de resoluciones realizadas
+    """
+    claves = df[CLAVES].reset_index(drop=True)
+    claves["_fila"] = np.arange(len(df))
+
+    # Mismo orden que concat([aproximada, exacta]) + merge interno
+    candidatos = pd.concat(
+        [claves.assign(modelo=modelo) for modelo in MODELOS], ignore_index=True
+    )
+    pares = candidatos.merge(
+        df_metodo[CLAVES + ["modelo"]], on=CLAVES + ["modelo"], how="inner"
+    )
+
+    resultados = []
+    resoluciones = {}
+    for modelo in MODELOS:
+        filas = np.unique(pares.loc[pares["modelo"] == modelo, "_fila"].to_numpy())
+        resoluciones[modelo] = int(len(filas))
+        if not len(filas):
+            continue
+        sub = df.iloc[filas].assign(efecto_externo=lambda d: d[efectos[modelo]])
+        res = resolver(sub, modelo)
+        res["test_porc_dif_precio"] = (
+            100 * (res["precio_sugerido"] - res["precio_actual"]) / res["precio_actual"]
+        )
+        res["test_porc_dif_ganancia"] = (
+            100
+            * (res["ganancia_nueva"] - res["ganancia_actual"])
+            / res["ganancia_actual"]
+        )
+        res["modelo"] = modelo
+        res["_fila"] = filas
+        resultados.append(res)
+
+    if resultados:
+        df_res = pd.concat(resultados, ignore_index=True)
+    else:
+        df_res = pd.DataFrame(columns=["_fila", "modelo"])
+    df_salida = (
+        pares[["_fila", "modelo"]]
+        .merge(df_res, on=["_fila", "modelo"], how="left", sort=False)
+        .drop(columns=["_fila"])
+    )
+    df_salida = df_salida[[c for c in df_res.columns if c != "_fila"]]
+
+    total = sum(resoluciones.values())
+    resumen = {
+        "filas_entrada": int(len(df)),
+        "filas_salida": int(len(df_salida)),
+        "resoluciones": resoluciones,
+        "resoluciones_evitadas": int(len(MODELOS) * len(df) - total),
+    }
+    return df_salida, resumen
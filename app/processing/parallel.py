@@ -0,0 +1,92 @@
+"""
+Ejecución por fragmentos en varios procesos
+
+Las filas de la tabla de optimización (material/zona/canal) son
+independientes entre sí, por lo que el DataFrame se divide en fragmentos
+contiguos que se resuelven en un ``ProcessPoolExecutor`` y se vuelven a unir
+en el orden original.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def resolver_workers(workers: Optional[int]) -> int:
+    """
+    Normaliza el número de procesos solicitado
+
+    Args:
+        workers: Procesos deseados; 0 o None usa todos los CPUs disponibles
+
+    Returns:
+        Número de procesos a usar (al menos 1)
+    """
+    if not workers or workers < 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def dividir_fragmentos(df: pd.DataFrame, fragmentos: int) -> List[pd.DataFrame]:
+    """
+    Divide el DataFrame en fragmentos contiguos de tamaño similar
+
+    Args:
+        df: DataFrame a dividir
+        fragmentos: Número de fragmentos deseado
+
+    Returns:
+        Lista de fragmentos no vacíos en el orden original
+    """
+    fragmentos = max(1, min(fragmentos, len(df)))
+    limites = np.array_split(np.arange(len(df)), fragmentos)
+    return [df.iloc[idx[0] : idx[-1] + 1] for idx in limites if len(idx)]
+
+
+def _contexto_procesos():
+    """Usa fork cuando está disponible para no reimportar el script principal"""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def ejecutar_por_fragmentos(
+    func: Callable[..., pd.DataFrame],
+    df: pd.DataFrame,
+    *args: Any,
+    workers: int = 1,
+    fragmentos_por_worker: int = 4,
+) -> pd.DataFrame:
+    """
+    Aplica ``func`` a fragmentos de ``df`` en paralelo y concatena el resultado
+
+    ``func`` debe ser una función de nivel de módulo (serializable) que
+    reciba un DataFrame y devuelva otro con una fila por fila de entrada.
+
+    Args:
+        func: Función a aplicar a cada fragmento
+        df: DataFrame de entrada
+        *args: Argumentos adicionales para ``func``
+        workers: Número de procesos; con 1 se ejecuta en el proceso actual
+        fragmentos_por_worker: Fragmentos por proceso para balancear la carga
+
+    Returns:
+        DataFrame con los resultados en el mismo orden que ``df``
+    """
+    workers = resolver_workers(workers)
+    if workers == 1 or len(df) < 2:
+        return func(df, *args)
+
+    fragmentos = dividir_fragmentos(df, workers * fragmentos_por_worker)
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(fragmentos)), mp_context=_contexto_procesos()
+    ) as executor:
+        futuros = [executor.submit(func, fragmento, *args) for fragmento in fragmentos]
+        # Se recorren en el orden de envío para conservar el orden original
+        resultados = [futuro.result() for futuro in futuros]
+
+    return pd.concat(resultados, ignore_index=True)
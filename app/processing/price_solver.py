@@ -0,0 +1,424 @@
+"""
+Motor vectorizado de optimización de precios por material/zona/canal
+
+Cada fila de la tabla de optimización es un problema 1-D acotado: maximizar la
+ganancia en ``[precio_min, precio_max]`` sujeto a ``precio >= coste + 0.01``.
+En lugar de llamar a SLSQP fila por fila, se evalúa la función objetivo para
+todas las filas a la vez sobre una malla densa y se refina el mejor punto con
+búsqueda de sección dorada, todo con arreglos de NumPy.
+"""
+
+import math
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+MODELO_APROXIMADO = "aproximada"
+MODELO_EXACTO = "exacta"
+MODELOS = (MODELO_APROXIMADO, MODELO_EXACTO)
+
+# Margen mínimo del precio sobre el coste (1 centavo)
+MARGEN_MINIMO = 0.01
+
+# Umbral bajo el cual una elasticidad externa se considera nula
+UMBRAL_ELASTICIDAD_EXTERNA = 0.2
+
+# Columnas de salida, mismas que generaba el ciclo original
+COLUMNAS_SALIDA = [
+    "id_material",
+    "id_zona",
+    "id_canal_venta",
+    "precio_actual",
+    "coste_unitario",
+    "demanda_actual",
+    "ganancia_actual",
+    "precio_sugerido",
+    "prediccion_ventas",
+    "ganancia_nueva",
+]
+
+# (elasticidad externa, variación porcentual) para el modelo aproximado
+_EXTERNAS_APROXIMADA = [
+    ("elasticidad_tasa_ocupacion", "porc_var_tasa_ocupacion"),
+    ("elasticidad_tipo_cambio", "porc_var_tipo_cambio"),
+    ("elasticidad_inpc", "porc_var_inpc_nacional"),
+    ("elasticidad_pib", "porc_var_pib"),
+]
+
+# (elasticidad externa, valor actual, valor base) para el modelo exacto
+_EXTERNAS_EXACTA = [
+    ("elasticidad_tasa_ocupacion", "tasa_ocupacion_avg_actual", "tasa_ocupacion_avg"),
+    ("elasticidad_tipo_cambio", "tipo_cambio_avg_actual", "tipo_cambio_avg"),
+    ("elasticidad_inpc", "inpc_nacional_actual", "inpc_nacional"),
+    ("elasticidad_pib", "pib_millones_actual", "pib_millones"),
+]
+
+# Columnas de la tabla de optimización que leen el solver y los efectos externos
+COLUMNAS_ENTRADA = [
+    "precio_unitario_promedio",
+    "coste_unitario",
+    "unidades_sum_kgv",
+    "elasticidad_promedio_historico",
+    *dict.fromkeys(
+        columna
+        for externas in (_EXTERNAS_APROXIMADA, _EXTERNAS_EXACTA)
+        for fila in externas
+        for columna in fila
+    ),
+]
+
+_RAZON_DORADA = (math.sqrt(5.0) - 1.0) / 2.0
+
+
+def calcular_coef_k(elasticidad: pd.Series) -> np.ndarray:
+    """
+    Calcula el coeficiente k de elasticidad variable
+
+    Args:
+        elasticidad: Elasticidad promedio histórica por fila
+
+    Returns:
+        Arreglo con el coeficiente k (8, 5 o 3)
+    """
+    return np.select(
+        [elasticidad <= -1.5, elasticidad <= -1.0, elasticidad <= -0.2],
+        [8, 5, 3],
+        default=3,
+    )
+
+
+def calcular_efecto_externo(df: pd.DataFrame, modelo: str) -> np.ndarray:
+    """
+    Calcula el efecto de las variables externas sobre la demanda
+
+    Para el modelo aproximado es la suma de ``beta * variación`` (aditivo) y
+    para el exacto el producto de los factores isoelásticos (multiplicativo).
+    Las elasticidades en el rango [-0.2, 0.2] no aportan efecto.
+
+    Args:
+        df: DataFrame con las columnas externas de la tabla de optimización
+        modelo: "aproximada" o "exacta"
+
+    Returns:
+        Arreglo con el efecto externo por fila
+    """
+    _validar_modelo(modelo)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if modelo == MODELO_APROXIMADO:
+            efecto = np.zeros(len(df))
+            for col_elast, col_var in _EXTERNAS_APROXIMADA:
+                elast = df[col_elast].to_numpy(dtype=float)
+                termino = elast * df[col_var].to_numpy(dtype=float)
+                efecto = efecto + np.where(
+                    np.abs(elast) > UMBRAL_ELASTICIDAD_EXTERNA, termino, 0.0
+                )
+        else:
+            efecto = np.ones(len(df))
+            for col_elast, col_actual, col_base in _EXTERNAS_EXACTA:
+                elast = df[col_elast].to_numpy(dtype=float)
+                razon = df[col_actual].to_numpy(dtype=float) / df[col_base].to_numpy(
+                    dtype=float
+                )
+                efecto = efecto * np.where(
+                    np.abs(elast) > UMBRAL_ELASTICIDAD_EXTERNA, razon**elast, 1.0
+                )
+
+    return efecto
+
+
+def ganancia(
+    precio: np.ndarray,
+    precio_actual: np.ndarray,
+    coste: np.ndarray,
+    unidades: np.ndarray,
+    elasticidad: np.ndarray,
+    coef_k: np.ndarray,
+    efecto_externo: np.ndarray,
+    modelo: str,
+) -> np.ndarray:
+    """
+    Evalúa la ganancia (función objetivo sin negar) para precios dados
+
+    Todos los argumentos deben ser transmisibles entre sí (broadcasting), lo
+    que permite evaluar una malla de precios por fila en una sola llamada.
+
+    Returns:
+        Arreglo con la ganancia esperada
+    """
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        variacion = (precio - precio_actual) / precio_actual
+        nueva_elast = elasticidad * (1 + coef_k * np.abs(variacion))
+        if modelo == MODELO_APROXIMADO:
+            delta_q = (nueva_elast * (100 * variacion) + efecto_externo) / 100
+            demanda = unidades * (1 + delta_q)
+        else:
+            demanda = (
+                unidades * (precio / precio_actual) ** nueva_elast * efecto_externo
+            )
+        return demanda * (precio - coste)
+
+
+def _validar_modelo(modelo: str):
+    """Valida que el modelo sea uno de los soportados"""
+    if modelo not in MODELOS:
+        raise ValueError(f"Modelo no soportado: {modelo}. Opciones: {MODELOS}")
+
+
+def _parametros(df: pd.DataFrame, modelo: str) -> Dict[str, np.ndarray]:
+    """Extrae los arreglos que necesita la función objetivo"""
+    efecto = (
+        df["efecto_externo"].to_numpy(dtype=float)
+        if "efecto_externo" in df.columns
+        else calcular_efecto_externo(df, modelo)
+    )
+    coef_k = (
+        df["coef_k"].to_numpy(dtype=float)
+        if "coef_k" in df.columns
+        else calcular_coef_k(df["elasticidad_promedio_historico"]).astype(float)
+    )
+    return {
+        "precio_actual": df["precio_unitario_promedio"].to_numpy(dtype=float),
+        "coste": df["coste_unitario"].to_numpy(dtype=float),
+        "unidades": df["unidades_sum_kgv"].to_numpy(dtype=float),
+        "elasticidad": df["elasticidad_promedio_historico"].to_numpy(dtype=float),
+        "coef_k": coef_k,
+        "efecto_externo": efecto,
+    }
+
+
+def _limites(df: pd.DataFrame, coste: np.ndarray):
+    """Calcula el intervalo factible [lo, hi] combinando rango y coste"""
+    precio_min = df["precio_min"].to_numpy(dtype=float)
+    precio_max = df["precio_max"].to_numpy(dtype=float)
+    lo = np.maximum(precio_min, coste + MARGEN_MINIMO)
+    # Si el rango completo queda bajo el coste, se usa el extremo superior
+    lo = np.minimum(lo, precio_max)
+    return lo, precio_max
+
+
+def _maximizar_bloque(
+    params: Dict[str, np.ndarray],
+    lo: np.ndarray,
+    hi: np.ndarray,
+    modelo: str,
+    puntos_malla: int,
+    xtol: float,
+    max_iter: int,
+) -> np.ndarray:
+    """Maximiza la ganancia de un bloque de filas (malla + sección dorada)"""
+    columnas = {k: v[:, None] for k, v in params.items()}
+
+    # 1. Malla densa sobre [lo, hi]
+    t = np.linspace(0.0, 1.0, puntos_malla)
+    paso = (hi - lo) / (puntos_malla - 1)
+    malla = lo[:, None] + (hi - lo)[:, None] * t[None, :]
+    valores = ganancia(malla, modelo=modelo, **columnas)
+    valores = np.where(np.isnan(valores), -np.inf, valores)
+    mejor = np.argmax(valores, axis=1)
+    filas = np.arange(len(lo))
+    x_malla = malla[filas, mejor]
+    g_malla = valores[filas, mejor]
+
+    # 2. Refinamiento con sección dorada en el intervalo vecino al mejor punto
+    a = np.maximum(x_malla - paso, lo)
+    b = np.minimum(x_malla + paso, hi)
+    c = b - _RAZON_DORADA * (b - a)
+    d = a + _RAZON_DORADA * (b - a)
+    gc = ganancia(c, modelo=modelo, **params)
+    gd = ganancia(d, modelo=modelo, **params)
+    tolerancia = xtol * np.maximum(1.0, np.abs(x_malla))
+
+    for _ in range(max_iter):
+        activo = (b - a) > tolerancia
+        if not activo.any():
+            break
+        # Si f(c) >= f(d) el máximo está en [a, d]; si no, en [c, b]
+        izquierda = activo & ~(gd > gc)
+        derecha = activo & (gd > gc)
+
+        b = np.where(izquierda, d, b)
+        d = np.where(izquierda, c, d)
+        gd = np.where(izquierda, gc, gd)
+        a = np.where(derecha, c, a)
+        c = np.where(derecha, d, c)
+        gc = np.where(derecha, gd, gc)
+
+        c_nuevo = b - _RAZON_DORADA * (b - a)
+        d_nuevo = a + _RAZON_DORADA * (b - a)
+        c = np.where(izquierda, c_nuevo, c)
+        d = np.where(derecha, d_nuevo, d)
+        gc = np.where(izquierda, ganancia(c, modelo=modelo, **params), gc)
+        gd = np.where(derecha, ganancia(d, modelo=modelo, **params), gd)
+
+    x_dorado = (a + b) / 2
+    g_dorado = ganancia(x_dorado, modelo=modelo, **params)
+    g_dorado = np.where(np.isnan(g_dorado), -np.inf, g_dorado)
+
+    # Nunca devolver un punto peor que el mejor de la malla
+    return np.where(g_dorado >= g_malla, x_dorado, x_malla)
+
+
+def _armar_salida(
+    df: pd.DataFrame, precio: np.ndarray, params: Dict[str, np.ndarray], modelo: str
+) -> pd.DataFrame:
+    """Construye el DataFrame de salida con las columnas del ciclo original"""
+    precio_actual = params["precio_actual"]
+    coste = params["coste"]
+    ganancia_actual = ganancia(precio_actual, modelo=modelo, **params)
+    ganancia_nueva = ganancia(precio, modelo=modelo, **params)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        demanda_actual = np.where(
+            precio_actual != coste, ganancia_actual / (precio_actual - coste), 0.0
+        )
+        prediccion = ganancia_nueva / (precio - coste)
+
+    return pd.DataFrame(
+        {
+            "id_material": df["id_material"].to_numpy(),
+            "id_zona": df["id_zona"].to_numpy(),
+            "id_canal_venta": df["id_canal_venta"].to_numpy(),
+            "precio_actual": precio_actual,
+            "coste_unitario": coste,
+            "demanda_actual": demanda_actual,
+            "ganancia_actual": ganancia_actual,
+            "precio_sugerido": precio,
+            "prediccion_ventas": prediccion,
+            "ganancia_nueva": ganancia_nueva,
+        },
+        columns=COLUMNAS_SALIDA,
+    )
+
+
+def resolver_lote(
+    df: pd.DataFrame,
+    modelo: str,
+    puntos_malla: int = 33,
+    xtol: float = 1e-7,
+    max_iter: int = 100,
+    tamano_bloque: int = 50_000,
+) -> pd.DataFrame:
+    """
+    Resuelve la optimización de precios para todas las filas del DataFrame
+
+    Args:
+        df: Tabla de optimización con ``precio_min``/``precio_max`` por fila
+        modelo: "aproximada" o "exacta"
+        puntos_malla: Puntos de la malla inicial sobre el rango de precios
+        xtol: Tolerancia relativa del refinamiento sobre el precio
+        max_iter: Iteraciones máximas de sección dorada
+        tamano_bloque: Filas procesadas por bloque para acotar la memoria
+
+    Returns:
+        DataFrame con las columnas de ``COLUMNAS_SALIDA`` en el orden de ``df``
+    """
+    _validar_modelo(modelo)
+    if puntos_malla < 3:
+        raise ValueError("puntos_malla debe ser al menos 3")
+
+    params = _parametros(df, modelo)
+    lo, hi = _limites(df, params["coste"])
+
+    precio = np.empty(len(df))
+    for inicio in range(0, len(df), tamano_bloque):
+        fin = inicio + tamano_bloque
+        bloque = {k: v[inicio:fin] for k, v in params.items()}
+        precio[inicio:fin] = _maximizar_bloque(
+            bloque, lo[inicio:fin], hi[inicio:fin], modelo, puntos_malla, xtol, max_iter
+        )
+
+    return _armar_salida(df, precio, params, modelo)
+
+
+def resolver_slsqp(df: pd.DataFrame, modelo: str) -> pd.DataFrame:
+    """
+    Implementación de referencia: un ``minimize(method="SLSQP")`` por fila
+
+    Reproduce el ciclo original de ``optimizacion_v3.py`` y se conserva para
+    verificar el motor vectorizado y como punto de comparación en benchmarks.
+
+    Args:
+        df: Tabla de optimización con ``precio_min``/``precio_max`` por fila
+        modelo: "aproximada" o "exacta"
+
+    Returns:
+        DataFrame con las columnas de ``COLUMNAS_SALIDA`` en el orden de ``df``
+    """
+    from scipy.optimize import minimize
+
+    _validar_modelo(modelo)
+    params = _parametros(df, modelo)
+    precio_min = df["precio_min"].to_numpy(dtype=float)
+    precio_max = df["precio_max"].to_numpy(dtype=float)
+
+    precio = np.empty(len(df))
+    for i in range(len(df)):
+        fila = {k: v[i] for k, v in params.items()}
+
+        def objective(p, fila=fila):
+            return -1.0 * ganancia(p[0], modelo=modelo, **fila)
+
+        def constraint1(p, fila=fila):
+            return (p[0] - MARGEN_MINIMO) - fila["coste"]
+
+        solution = minimize(
+            objective,
+            [fila["precio_actual"]],
+            method="SLSQP",
+            bounds=[(precio_min[i], precio_max[i])],
+            constraints=[{"type": "ineq", "fun": constraint1}],
+        )
+        precio[i] = solution.x[0]
+
+    return _armar_salida(df, precio, params, modelo)
+
+
+def comparar_resultados(
+    resultado: pd.DataFrame,
+    referencia: pd.DataFrame,
+    tolerancia: float = 1e-3,
+) -> Dict[str, Any]:
+    """
+    Compara dos salidas del optimizador fila a fila
+
+    Una fila coincide si la ganancia nueva difiere menos de ``tolerancia``
+    (relativa) o si ``resultado`` obtiene una ganancia mayor que la referencia,
+    ya que SLSQP puede detenerse en un óptimo local.
+
+    Args:
+        resultado: Salida a validar (p. ej. de ``resolver_lote``)
+        referencia: Salida de referencia (p. ej. de ``resolver_slsqp``)
+        tolerancia: Tolerancia relativa permitida
+
+    Returns:
+        Dict con el resumen de la comparación
+    """
+    g_res = resultado["ganancia_nueva"].to_numpy(dtype=float)
+    g_ref = referencia["ganancia_nueva"].to_numpy(dtype=float)
+    p_res = resultado["precio_sugerido"].to_numpy(dtype=float)
+    p_ref = referencia["precio_sugerido"].to_numpy(dtype=float)
+
+    escala = np.maximum(np.abs(g_ref), 1e-12)
+    dif_ganancia = np.abs(g_res - g_ref) / escala
+    dif_precio = np.abs(p_res - p_ref) / np.maximum(np.abs(p_ref), 1e-12)
+    comparable = ~(np.isnan(g_res) & np.isnan(g_ref))
+    mejora = (g_res > g_ref) & (dif_ganancia > tolerancia)
+    coincide = ~comparable | (dif_ganancia <= tolerancia) | mejora
+
+    return {
+        "filas": int(len(g_ref)),
+        "tolerancia": tolerancia,
+        "filas_fuera_de_tolerancia": int((~coincide).sum()),
+        "filas_con_mejor_ganancia": int(mejora.sum()),
+        "max_dif_relativa_ganancia": _max_finito(dif_ganancia[comparable]),
+        "max_dif_relativa_precio": _max_finito(dif_precio[comparable]),
+        "dentro_de_tolerancia": bool(coincide.all()),
+    }
+
+
+def _max_finito(valores: np.ndarray) -> Optional[float]:
+    """Máximo de los valores finitos o None si no hay"""
+    finitos = valores[np.isfinite(valores)]
+    return float(finitos.max()) if finitos.size else None
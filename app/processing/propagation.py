@@ -0,0 +1,116 @@
+"""
+Propagación de valores "pegajosos" por grupo
+
+Dentro de cada grupo, ordenado por fecha, se conserva el último valor ancla
+mientras la variación relativa respecto a él sea menor que un umbral; cuando
+la variación lo supera, el valor actual pasa a ser el nuevo ancla. Es la
+regla que ``unificacion_precios_variacion.py`` aplicaba con ``iterrows()``
+para evitar elasticidades elevadas por cambios de precio menores a 1%.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+UMBRAL_POR_DEFECTO = 0.01
+
+
+def inicio_de_grupo(df: pd.DataFrame, claves: Sequence[str]) -> np.ndarray:
+    """
+    Marca las filas donde cambia el grupo respecto a la fila anterior
+
+    Un valor nulo en alguna clave nunca se considera igual al anterior, igual
+    que la comparación ``==`` del ciclo original.
+
+    Args:
+        df: DataFrame ya ordenado por claves
+        claves: Columnas que definen el grupo (puede ser vacía)
+
+    Returns:
+        Arreglo booleano con True en la primera fila de cada grupo
+    """
+    inicio = np.zeros(len(df), dtype=bool)
+    if len(df):
+        inicio[0] = True
+    for clave in claves:
+        columna = df[clave]
+        inicio |= (columna.ne(columna.shift()) | columna.isna()).to_numpy()
+    return inicio
+
+
+def posiciones_ancla(
+    valores: np.ndarray, inicio: np.ndarray, umbral: float = UMBRAL_POR_DEFECTO
+) -> np.ndarray:
+    """
+    Calcula, para cada fila, la posición de su valor ancla
+
+    El ancla depende del ancla anterior, por lo que la regla es secuencial;
+    se resuelve con un único recorrido sobre listas nativas (sin pandas por
+    fila), que es varios órdenes de magnitud más rápido que ``iterrows()``.
+
+    Args:
+        valores: Valores a propagar en el orden del grupo
+        inicio: Marca de primera fila de cada grupo (ver ``inicio_de_grupo``)
+        umbral: Variación relativa por debajo de la cual se conserva el ancla
+
+    Returns:
+        Arreglo de posiciones (enteros) del ancla de cada fila
+    """
+    anclas = []
+    ancla = -1
+    valor_ancla = float("nan")
+    for i, (valor, nuevo) in enumerate(zip(valores.tolist(), inicio.tolist())):
+        # Un ancla en 0 o nula nunca se conserva (la división no es válida)
+        if (
+            nuevo
+            or valor_ancla == 0
+            or not abs(valor - valor_ancla) / valor_ancla < umbral
+        ):
+            ancla = i
+            valor_ancla = valor
+        anclas.append(ancla)
+    return np.asarray(anclas, dtype=np.int64)
+
+
+def propagar_valor(
+    df: pd.DataFrame,
+    claves: Sequence[str],
+    orden: Sequence[str],
+    valor: str,
+    umbral: float = UMBRAL_POR_DEFECTO,
+    columna_valor: Optional[str] = None,
+    ancla_de: Optional[str] = None,
+    columna_ancla: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Propaga ``valor`` dentro de cada grupo mientras varíe menos del umbral
+
+    Args:
+        df: DataFrame de entrada (no se modifica)
+        claves: Columnas que definen el grupo; vacía para una sola serie
+        orden: Columnas de orden dentro del grupo (p. ej. la fecha)
+        valor: Columna con el valor a propagar
+        umbral: Variación relativa máxima para conservar el ancla
+        columna_valor: Nombre de la columna con el valor propagado
+            (por defecto ``{valor}_propagado``)
+        ancla_de: Columna adicional cuyo valor se toma de la fila ancla
+            (p. ej. la fecha en que se fijó el precio)
+        columna_ancla: Nombre de la columna para ``ancla_de``
+            (por defecto ``{ancla_de}_ancla``)
+
+    Returns:
+        Copia de ``df`` ordenada por ``claves + orden`` con las columnas
+        propagadas agregadas
+    """
+    df_p = df.sort_values(by=[*claves, *orden])
+
+    inicio = inicio_de_grupo(df_p, claves)
+    with np.errstate(invalid="ignore"):
+        valores = df_p[valor].to_numpy(dtype=float, na_value=np.nan)
+    anclas = posiciones_ancla(valores, inicio, umbral)
+
+    df_p[columna_valor or f"{valor}_propagado"] = df_p[valor].to_numpy()[anclas]
+    if ancla_de:
+        df_p[columna_ancla or f"{ancla_de}_ancla"] = df_p[ancla_de].to_numpy()[anclas]
+    return df_p
@@ -0,0 +1,206 @@
+"""
+Propagación de valores "pegajosos" ejecutada en el motor SQL
+
+Genera la misma regla de ``propagation.propagar_valor`` como un script SQL
+con CTE recursiva, para que BigQuery escriba la tabla destino directamente
+sin descargar ni volver a subir la tabla completa. La numeración de filas se
+materializa primero en una tabla temporal: BigQuery no materializa las CTE
+no recursivas, y unir cada paso de la recursión con una CTE ``numerado``
+volvería a leer y ordenar la tabla de origen completa en cada iteración.
+Cada fila con alguna clave nula forma su propio grupo, igual que
+``propagation.inicio_de_grupo``.
+Con el dialecto ``sqlite`` el mismo script se compara en los tests contra
+el camino de pandas.
+"""
+
+from typing import Optional, Sequence
+
+from .propagation import UMBRAL_POR_DEFECTO
+from .query_builder import DIALECTOS, citar_tabla
+
+# Límite de iteraciones de las CTE recursivas en BigQuery
+MAXIMO_FILAS_POR_GRUPO = 500
+
+
+def _dividir(numerador: str, denominador: str, dialecto: str) -> str:
+    """División que devuelve NULL en lugar de fallar cuando el denominador es 0"""
+    if dialecto == "bigquery":
+        return f"SAFE_DIVIDE({numerador}, {denominador})"
+    # SQLite devuelve NULL al dividir entre 0; el 1.0 evita división entera
+    return f"({numerador}) * 1.0 / ({denominador})"
+
+
+def _desempate(dialecto: str) -> str:
+    """Orden determinista entre filas con las mismas claves y orden"""
+    if dialecto == "bigquery":
+        return "FARM_FINGERPRINT(TO_JSON_STRING(t))"
+    return "t.rowid"
+
+
+def _numeracion(claves: Sequence[str], orden_filas: str) -> str:
+    """Columnas ``_grupo`` y ``_fila`` de la tabla temporal ``_numerado``"""
+    fila = f"ROW_NUMBER() OVER (ORDER BY {orden_filas})"
+    if not claves:
+        return f"1 AS _grupo, {fila} AS _fila"
+    lista = ", ".join(claves)
+    # Una fila con clave nula es un grupo de una sola fila con id negativo,
+    # distinto de los grupos numerados por DENSE_RANK
+    nula = " OR ".join(f"{clave} IS NULL" for clave in claves)
+    return (
+        f"CASE WHEN {nula} THEN -{fila}"
+        f" ELSE DENSE_RANK() OVER (ORDER BY {lista}) END AS _grupo,\n"
+        f"  CASE WHEN {nula} THEN 1"
+        f" ELSE ROW_NUMBER() OVER (PARTITION BY {lista} ORDER BY {orden_filas})"
+        " END AS _fila"
+    )
+
+
+def _union(fila: str) -> str:
+    """Condición de unión entre ``_numerado n`` y ``propagado p``"""
+    return f"n._grupo = p._grupo AND n._fila = {fila}"
+
+
+def sql_filas_por_grupo(
+    origen: str, claves: Sequence[str], dialecto: str = "bigquery"
+) -> str:
+    """
+    Genera el SQL que cuenta las filas del grupo más grande de ``origen``
+
+    Las filas con alguna clave nula no se cuentan porque cada una forma su
+    propio grupo. Sirve para verificar ``MAXIMO_FILAS_POR_GRUPO`` antes de
+    ejecutar ``sql_propagacion`` en BigQuery.
+
+    Args:
+        origen: Tabla de entrada
+        claves: Columnas que definen el grupo; vacía para una sola serie
+        dialecto: ``bigquery`` o ``sqlite``
+
+    Returns:
+        Consulta que devuelve una fila con la columna ``filas``
+    """
+    if dialecto not in DIALECTOS:
+        raise ValueError(f"Dialecto no válido: {dialecto}. Usar {DIALECTOS}")
+    tabla = citar_tabla(origen, dialecto)
+    if not claves:
+        return f"SELECT COUNT(*) AS filas FROM {tabla}"
+    return (
+        "SELECT COALESCE(MAX(filas), 0) AS filas FROM (\n"
+        f"  SELECT COUNT(*) AS filas FROM {tabla}\n"
+        f"  WHERE {' AND '.join(f'{clave} IS NOT NULL' for clave in claves)}\n"
+        f"  GROUP BY {', '.join(claves)}\n"
+        ")"
+    )
+
+
+def sql_propagacion(
+    origen: str,
+    destino: str,
+    claves: Sequence[str],
+    orden: Sequence[str],
+    valor: str,
+    umbral: float = UMBRAL_POR_DEFECTO,
+    ancla_de: Optional[str] = None,
+    columna_ancla: Optional[str] = None,
+    excluir: Sequence[str] = (),
+    columnas: Optional[Sequence[str]] = None,
+    dialecto: str = "bigquery",
+) -> str:
+    """
+    Genera el SQL que propaga ``valor`` y escribe el resultado en ``destino``
+
+    La tabla destino conserva las columnas de ``origen`` (menos ``excluir``)
+    con ``valor`` reemplazado por el valor propagado y, si se indica
+    ``ancla_de``, una columna adicional con el valor de la fila ancla.
+
+    BigQuery limita las CTE recursivas a ``MAXIMO_FILAS_POR_GRUPO``
+    iteraciones: cada grupo puede tener como máximo 500 filas (casi 10 años
+    de historia semanal; ver ``sql_filas_por_grupo``). El script numera las
+    filas una sola vez en la tabla temporal ``_numerado`` (con un desempate
+    determinista para filas repetidas) y la recursión se une contra esa
+    tabla por ``_grupo`` y ``_fila``.
+
+    Args:
+        origen: Tabla de entrada (``dataset.tabla`` o ``proyecto.dataset.tabla``)
+        destino: Tabla de salida (se reemplaza)
+        claves: Columnas que definen el grupo; vacía para una sola serie
+        orden: Columnas de orden dentro del grupo
+        valor: Columna con el valor a propagar
+        umbral: Variación relativa máxima para conservar el ancla
+        ancla_de: Columna cuyo valor se toma de la fila ancla
+        columna_ancla: Nombre de la columna para ``ancla_de``
+            (por defecto ``{ancla_de}_ancla``)
+        excluir: Columnas de ``origen`` que no se escriben en ``destino``
+        columnas: Columnas de ``origen``; requerido en ``sqlite``, en
+            BigQuery se usa ``SELECT * EXCEPT/REPLACE`` si no se indica
+        dialecto: ``bigquery`` o ``sqlite``
+
+    Returns:
+        Script SQL de varias sentencias listo para ejecutarse
+
+    Raises:
+        ValueError: Si el dialecto no es válido o faltan las columnas en sqlite
+    """
+    if dialecto not in DIALECTOS:
+        raise ValueError(f"Dialecto no válido: {dialecto}. Usar {DIALECTOS}")
+    if columnas is None and dialecto != "bigquery":
+        raise ValueError(f"El dialecto {dialecto} requiere la lista de columnas")
+
+    conserva = (
+        f"{_dividir(f'ABS(n.{valor} - p._valor_ancla)', 'p._valor_ancla', dialecto)}"
+        f" < {umbral!r}"
+    )
+    base_ancla = f", {ancla_de} AS _ancla" if ancla_de else ""
+    paso_ancla = (
+        f",\n      CASE WHEN {conserva} THEN p._ancla ELSE n.{ancla_de} END"
+        if ancla_de
+        else ""
+    )
+
+    if columnas is None:
+        excepto = ", ".join(["_grupo", "_fila", *excluir])
+        reemplazo = f"n.* EXCEPT ({excepto}) REPLACE (p._valor_ancla AS {valor})"
+    else:
+        reemplazo = ", ".join(
+            f"p._valor_ancla AS {c}" if c == valor else f"n.{c}"
+            for c in columnas
+            if c not in excluir
+        )
+    salida_ancla = ""
+    if ancla_de:
+        salida_ancla = f", p._ancla AS {columna_ancla or f'{ancla_de}_ancla'}"
+
+    if dialecto == "bigquery":
+        numerar = "CREATE TEMP TABLE _numerado AS"
+        crear = f"CREATE OR REPLACE TABLE {citar_tabla(destino, dialecto)} AS"
+    else:
+        numerar = "DROP TABLE IF EXISTS temp._numerado;\nCREATE TEMP TABLE _numerado AS"
+        crear = (
+            f"DROP TABLE IF EXISTS {citar_tabla(destino, dialecto)};\n"
+            f"CREATE TABLE {citar_tabla(destino, dialecto)} AS"
+        )
+    orden_filas = ", ".join([*orden, _desempate(dialecto)])
+
+    return f"""{numerar}
+SELECT
+  t.*,
+  {_numeracion(claves, orden_filas)}
+FROM {citar_tabla(origen, dialecto)} t;
+
+{crear}
+WITH RECURSIVE
+  propagado AS (
+    SELECT _grupo, _fila, {valor} AS _valor_ancla{base_ancla}
+    FROM _numerado
+    WHERE _fila = 1
+    UNION ALL
+    SELECT
+      n._grupo,
+      n._fila,
+      CASE WHEN {conserva} THEN p._valor_ancla ELSE n.{valor} END{paso_ancla}
+    FROM propagado p
+    JOIN _numerado n ON {_union("p._fila + 1")}
+  )
+SELECT {reemplazo}{salida_ancla}
+FROM _numerado n
+JOIN propagado p ON {_union("p._fila")};
+"""
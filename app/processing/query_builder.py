@@ -0,0 +1,170 @@
+"""
+Consultas de lectura con proyección y filtros declarados por el script
+
+En lugar de ``SELECT * FROM tabla`` seguido de filtros en pandas, el script
+declara las columnas que usa y los filtros que aplica y ``sql_lectura``
+genera la consulta. BigQuery cobra por las columnas leídas, así que la
+proyección reduce los bytes procesados, la transferencia y la memoria del
+DataFrame; los filtros reducen las filas descargadas.
+
+``DIALECTOS`` y ``citar_tabla`` son compartidos con ``propagation_sql``.
+"""
+
+import datetime
+import re
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+DIALECTOS = ("bigquery", "sqlite")
+
+OPERADORES = ("=", "!=", "<", "<=", ">", ">=", "IN", "NOT IN")
+OPERADORES_NULOS = ("IS NULL", "IS NOT NULL")
+
+# (columna, operador, valor); con IS NULL / IS NOT NULL el valor se omite
+Filtro = Tuple[Any, ...]
+
+_IDENTIFICADOR = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _columna(nombre: str) -> str:
+    """Valida un nombre de columna (no se citan ni se aceptan expresiones)"""
+    if not _IDENTIFICADOR.match(nombre):
+        raise ValueError(f"Nombre de columna inválido: {nombre!r}")
+    return nombre
+
+
+def citar_tabla(nombre: str, dialecto: str) -> str:
+    """
+    Cita el nombre de tabla según el dialecto
+
+    Args:
+        nombre: Tabla (``dataset.tabla`` o ``proyecto.dataset.tabla``)
+        dialecto: ``bigquery`` o ``sqlite``
+
+    Returns:
+        Nombre citado
+
+    Raises:
+        ValueError: Si el nombre contiene comillas
+    """
+    if "`" in nombre or '"' in nombre:
+        raise ValueError(f"Nombre de tabla inválido: {nombre!r}")
+    return f"`{nombre}`" if dialecto == "bigquery" else f'"{nombre}"'
+
+
+def literal(valor: Any, dialecto: str = "bigquery") -> str:
+    """
+    Convierte un valor de Python en un literal SQL
+
+    Args:
+        valor: str, int, float, bool, date/datetime o None
+        dialecto: ``bigquery`` o ``sqlite``
+
+    Returns:
+        Literal SQL
+
+    Raises:
+        ValueError: Si el tipo no es soportado
+    """
+    if valor is None:
+        return "NULL"
+    if isinstance(valor, bool):
+        if dialecto == "sqlite":
+            return "1" if valor else "0"
+        return "TRUE" if valor else "FALSE"
+    if isinstance(valor, (int, float)):
+        return repr(valor)
+    if isinstance(valor, datetime.datetime):
+        texto = valor.isoformat(sep=" ")
+        return f"TIMESTAMP '{texto}'" if dialecto == "bigquery" else f"'{texto}'"
+    if isinstance(valor, datetime.date):
+        texto = valor.isoformat()
+        return f"DATE '{texto}'" if dialecto == "bigquery" else f"'{texto}'"
+    if isinstance(valor, str):
+        if dialecto == "bigquery":
+            escapado = valor.replace("\\", "\\\\").replace("'", "\\'")
+        else:
+            escapado = valor.replace("'", "''")
+        return f"'{escapado}'"
+    raise ValueError(f"Tipo de valor no soportado en filtros: {type(valor).__name__}")
+
+
+def condicion(filtro: Filtro, dialecto: str = "bigquery") -> str:
+    """
+    Genera la condición SQL de un filtro
+
+    Args:
+        filtro: ``(columna, operador, valor)`` o ``(columna, "IS NULL")``
+        dialecto: ``bigquery`` o ``sqlite``
+
+    Returns:
+        Condición SQL
+
+    Raises:
+        ValueError: Si el operador no es válido o el valor no corresponde
+    """
+    columna, operador, *valor = filtro
+    columna = _columna(columna)
+    operador = operador.upper()
+    if operador in OPERADORES_NULOS:
+        if valor:
+            raise ValueError(f"{operador} no recibe valor: {filtro!r}")
+        return f"{columna} {operador}"
+    if operador not in OPERADORES or len(valor) != 1:
+        raise ValueError(f"Filtro inválido: {filtro!r}")
+    valor = valor[0]
+    if operador in ("IN", "NOT IN"):
+        if isinstance(valor, str) or not valor:
+            raise ValueError(f"{operador} requiere una lista no vacía: {filtro!r}")
+        valores = ", ".join(literal(v, dialecto) for v in valor)
+        return f"{columna} {operador} ({valores})"
+    if valor is None:
+        raise ValueError(
+            f"Use IS NULL / IS NOT NULL para comparar con NULL: {filtro!r}"
+        )
+    return f"{columna} {operador} {literal(valor, dialecto)}"
+
+
+def sql_lectura(
+    tabla: str,
+    columnas: Optional[Sequence[str]] = None,
+    filtros: Sequence[Filtro] = (),
+    expresiones: Optional[Dict[str, str]] = None,
+    distinct: bool = False,
+    dialecto: str = "bigquery",
+) -> str:
+    """
+    Genera la consulta que lee solo las columnas y filas que usa el script
+
+    Args:
+        tabla: Tabla (``dataset.tabla`` o ``proyecto.dataset.tabla``)
+        columnas: Columnas a leer (None = todas, ``SELECT *``)
+        filtros: Filtros combinados con AND (ver ``condicion``)
+        expresiones: Columnas calculadas ``{alias: expresión SQL}``; la
+            expresión se incluye tal cual, no debe venir de datos externos
+        distinct: Eliminar filas duplicadas
+        dialecto: ``bigquery`` o ``sqlite``
+
+    Returns:
+        Consulta SQL
+
+    Raises:
+        ValueError: Si el dialecto, una columna o un filtro no son válidos
+    """
+    if dialecto not in DIALECTOS:
+        raise ValueError(f"Dialecto no soportado: {dialecto}. Opciones: {DIALECTOS}")
+
+    seleccion = [_columna(c) for c in columnas] if columnas else ["*"]
+    if len(set(seleccion)) != len(seleccion):
+        raise ValueError(f"Columnas repetidas: {list(columnas)}")
+    for alias, expresion in (expresiones or {}).items():
+        seleccion.append(f"{expresion} AS {_columna(alias)}")
+
+    partes = [
+        f"SELECT{' DISTINCT' if distinct else ''}",
+        "    " + ",\n    ".join(seleccion),
+        f"FROM {citar_tabla(tabla, dialecto)}",
+    ]
+    if filtros:
+        condiciones = [condicion(f, dialecto) for f in filtros]
+        partes.append("WHERE " + "\n    AND ".join(condiciones))
+    return "\n".join(partes)
@@ -0,0 +1,230 @@
+"""
+Lectura de resultados de BigQuery como lotes de Arrow
+
+``client.query(query).to_dataframe()`` descarga el resultado página por página
+con la API REST (tabledata.list) y arma columnas de objetos. Aquí el resultado
+se descarga como lotes de Arrow: con la Storage Read API cuando el paquete
+``google-cloud-bigquery-storage`` está instalado y por REST si no. Las
+columnas se pueden proyectar (solo se descargan las pedidas) y convertir a
+tipos compactos antes de pasar a pandas.
+
+Los lotes se pueden grabar en archivos Arrow (``guardar_lotes``) para probar
+los scripts sin conexión a BigQuery (ver ``tests/fixtures``).
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Tipos de Arrow que pandas convierte a float64/object por defecto
+_TIPOS_NULABLES = {
+    pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+
+@lru_cache(maxsize=None)
+def cliente_storage(client):
+    """
+    Cliente de la Storage Read API para un cliente de BigQuery
+
+    Args:
+        client: Cliente de BigQuery
+
+    Returns:
+        ``BigQueryReadClient`` o None si el paquete no está instalado
+    """
+    try:
+        from google.cloud import bigquery_storage  # noqa: F401
+    except ImportError:
+        return None
+    return client._ensure_bqstorage_client()
+
+
+def filas_consulta(client, query: str, columnas: Optional[Sequence[str]] = None):
+    """
+    Ejecuta una consulta y devuelve el iterador de su resultado
+
+    Con ``columnas`` el resultado se lee de la tabla destino del job con
+    ``selected_fields``, así que las demás columnas no se descargan.
+
+    Args:
+        client: Cliente de BigQuery
+        query: Query SQL
+        columnas: Columnas a descargar (None = todas)
+
+    Returns:
+        ``RowIterator`` del resultado
+
+    Raises:
+        ValueError: Si alguna columna no existe en el resultado
+    """
+    job = client.query(query)
+    filas = job.result()
+    if not columnas:
+        return filas
+
+    campos = {campo.name: campo for campo in filas.schema}
+    faltantes = [c for c in columnas if c not in campos]
+    if faltantes:
+        raise ValueError(f"Columnas inexistentes en el resultado: {faltantes}")
+    if job.destination is None:
+        return filas
+    return client.list_rows(
+        job.destination, selected_fields=[campos[c] for c in columnas]
+    )
+
+
+def lotes_arrow(
+    client,
+    filas,
+    columnas: Optional[Sequence[str]] = None,
+    storage: bool = True,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Descarga un resultado como lotes de Arrow
+
+    Args:
+        client: Cliente de BigQuery (para crear el cliente de Storage)
+        filas: ``RowIterator`` del resultado
+        columnas: Columnas a conservar de cada lote (None = todas)
+        storage: Usar la Storage Read API si está disponible
+
+    Returns:
+        Iterador de ``RecordBatch``
+    """
+    bqstorage = cliente_storage(client) if storage else None
+    for lote in filas.to_arrow_iterable(bqstorage_client=bqstorage):
+        yield lote.select(list(columnas)) if columnas else lote
+
+
+def a_dataframe(
+    lotes: Iterable[pa.RecordBatch],
+    tipos: Optional[Dict[str, str]] = None,
+    columnas: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Convierte lotes de Arrow en un DataFrame con tipos compactos
+
+    Los enteros y booleanos quedan como tipos nulables de pandas (``Int64``,
+    ``boolean``) en lugar de float64/object. ``tipos`` convierte columnas
+    adicionales: ``"category"`` se codifica como diccionario en Arrow y los
+    flotantes (por ejemplo NUMERIC a ``float32``) se convierten en Arrow sin
+    pasar por objetos ``Decimal``.
+
+    Args:
+        lotes: Lotes de Arrow con el mismo esquema
+        tipos: Tipo de pandas por columna
+        columnas: Columnas del DataFrame si no hay lotes
+
+    Returns:
+        DataFrame con los datos de todos los lotes
+    """
+    lotes = list(lotes)
+    if not lotes:
+        return pd.DataFrame(columns=list(columnas or ())).astype(tipos or {})
+
+    tabla = pa.Table.from_batches(lotes)
+    del lotes
+    convertir_en_pandas = {}
+    for columna, tipo in (tipos or {}).items():
+        indice = tabla.schema.get_field_index(columna)
+        if indice < 0:
+            raise ValueError(f"Columna inexistente: {columna}")
+        if tipo == "category":
+            datos = tabla.column(indice).dictionary_encode()
+        elif _es_flotante(tipo):
+            datos = pc.cast(tabla.column(indice), pa.from_numpy_dtype(np.dtype(tipo)))
+        else:
+            convertir_en_pandas[columna] = tipo
+            continue
+        tabla = tabla.set_column(indice, columna, datos)
+
+    # self_destruct libera cada columna de Arrow al convertirla
+    df = tabla.to_pandas(
+        types_mapper=_TIPOS_NULABLES.get, split_blocks=True, self_destruct=True
+    )
+    del tabla
+    return df.astype(convertir_en_pandas) if convertir_en_pandas else df
+
+
+def _es_flotante(tipo: str) -> bool:
+    """Indica si ``tipo`` es un flotante de numpy (se convierte en Arrow)"""
+    try:
+        return np.dtype(tipo).kind == "f"
+    except TypeError:
+        # Tipos de extensión de pandas ("Int32", "string", "category")
+        return False
+
+
+def leer_consulta(
+    client,
+    query: str,
+    columnas: Optional[Sequence[str]] = None,
+    tipos: Optional[Dict[str, str]] = None,
+    storage: bool = True,
+) -> pd.DataFrame:
+    """
+    Ejecuta una consulta y descarga su resultado como DataFrame vía Arrow
+
+    Reemplaza ``client.query(query).to_dataframe()`` en los scripts.
+
+    Args:
+        client: Cliente de BigQuery
+        query: Query SQL
+        columnas: Columnas a descargar (None = todas)
+        tipos: Tipo de pandas por columna (ver ``a_dataframe``)
+        storage: Usar la Storage Read API si está disponible
+
+    Returns:
+        DataFrame con el resultado
+    """
+    filas = filas_consulta(client, query, columnas)
+    nombres = list(columnas or (campo.name for campo in filas.schema))
+    return a_dataframe(
+        lotes_arrow(client, filas, columnas, storage), tipos, columnas=nombres
+    )
+
+
+def guardar_lotes(lotes: Iterable[pa.RecordBatch], ruta: Union[str, Path]) -> int:
+    """
+    Graba lotes de Arrow en un archivo (formato IPC) para pruebas sin conexión
+
+    Args:
+        lotes: Lotes a grabar, por ejemplo ``lotes_arrow(client, filas)``
+        ruta: Archivo destino
+
+    Returns:
+        Filas grabadas
+    """
+    filas = 0
+    escritor = None
+    try:
+        for lote in lotes:
+            if escritor is None:
+                escritor = pa.ipc.new_file(str(ruta), lote.schema)
+            escritor.write_batch(lote)
+            filas += lote.num_rows
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return filas
+
+
+def cargar_lotes(ruta: Union[str, Path]) -> List[pa.RecordBatch]:
+    """
+    Lee los lotes grabados con ``guardar_lotes``
+
+    Args:
+        ruta: Archivo Arrow
+
+    Returns:
+        Lista de lotes en el orden en que se grabaron
+    """
+    with pa.ipc.open_file(str(ruta)) as lector:
+        return [lector.get_batch(i) for i in range(lector.num_record_batches)]
@@ -0,0 +1,219 @@
+"""
+Tipos compactos por tabla para las lecturas de los scripts
+
+Sin tipos declarados las claves (``id_material``, ``id_zona``,
+``id_canal_venta``, ``grupo_articulo``) llegan como cadenas de Python y los
+NUMERIC como ``Decimal``. Aquí se declara, por tabla, el tipo de pandas de
+cada columna y se aplica al leer (``leer_consulta(..., tipos=...)``):
+
+- Claves como ``category``: cada fila guarda un código entero en lugar de
+  una cadena; merges y groupbys comparan códigos si las categorías coinciden
+  (ver ``unificar_categorias``).
+- Elasticidades e indicadores externos como ``float32``.
+- Conteos como enteros nulables (``Int32``).
+- Precio, coste y unidades se mantienen en ``float64``: pasan directo a la
+  tabla de salida y a la ganancia.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import pandas as pd
+
+CATEGORIA = "category"
+
+_CLAVES = {
+    "id_material": CATEGORIA,
+    "id_zona": CATEGORIA,
+    "id_canal_venta": CATEGORIA,
+}
+
+_INDICADORES_EXTERNOS = {
+    columna: "float32"
+    for columna in (
+        "elasticidad_tasa_ocupacion",
+        "porc_var_tasa_ocupacion",
+        "tasa_ocupacion_avg_actual",
+        "tasa_ocupacion_avg",
+        "elasticidad_tipo_cambio",
+        "porc_var_tipo_cambio",
+        "tipo_cambio_avg_actual",
+        "tipo_cambio_avg",
+        "elasticidad_inpc",
+        "porc_var_inpc_nacional",
+        "inpc_nacional_actual",
+        "inpc_nacional",
+        "elasticidad_pib",
+        "porc_var_pib",
+        "pib_millones_actual",
+        "pib_millones",
+    )
+}
+
+_PRECIOS = {
+    "precio_unitario_promedio": "float64",
+    "coste_unitario": "float64",
+}
+
+# Tabla -> {columna: tipo de pandas}
+ESQUEMAS: Dict[str, Dict[str, str]] = {
+    "tabla_prep_optimizacion_semanal": {
+        **_CLAVES,
+        "grupo_articulo": CATEGORIA,
+        **_PRECIOS,
+        "unidades_sum_kgv": "float64",
+        "elasticidad_promedio_historico": "float32",
+        **_INDICADORES_EXTERNOS,
+    },
+    "test_elasticidad_historica_kgv_semanal": {
+        **_CLAVES,
+        "elasticidad_promedio_historico": "float32",
+        "elasticidad_promedio_historico_count": "Int32",
+    },
+    "test_variaciones_precios_unidad_semanal_externos": {
+        **_CLAVES,
+        **_PRECIOS,
+        "precio_unitario_promedio_anterior": "float64",
+    },
+}
+ESQUEMAS["test_variaciones_precios_unidad_semanal_externos_v2"] = ESQUEMAS[
+    "test_variaciones_precios_unidad_semanal_externos"
+]
+
+
+def tipos_de(tabla: str, columnas: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """
+    Tipos declarados de una tabla
+
+    Args:
+        tabla: Nombre de la tabla, con o sin ``proyecto.dataset.``
+        columnas: Limitar a estas columnas (las no declaradas se omiten)
+
+    Returns:
+        Diccionario {columna: tipo} para ``leer_consulta``
+
+    Raises:
+        KeyError: Si la tabla no tiene esquema declarado
+    """
+    esquema = ESQUEMAS[tabla.strip("`").rsplit(".", 1)[-1]]
+    if columnas is None:
+        return dict(esquema)
+    return {c: esquema[c] for c in columnas if c in esquema}
+
+
+def aplicar_tipos(df: pd.DataFrame, tipos: Dict[str, str]) -> pd.DataFrame:
+    """
+    Convierte un DataFrame ya cargado a los tipos indicados
+
+    Args:
+        df: DataFrame de entrada
+        tipos: {columna: tipo}; las columnas ausentes se ignoran
+
+    Returns:
+        DataFrame nuevo con los tipos aplicados
+    """
+    presentes = {c: t for c, t in tipos.items() if c in df.columns}
+    # Decimal (NUMERIC) no se convierte directo a float32
+    decimales = [
+        c
+        for c, t in presentes.items()
+        if t.startswith("float") and df[c].dtype == object
+    ]
+    if decimales:
+        df = df.astype({c: "float64" for c in decimales})
+    return df.astype(presentes)
+
+
+def unificar_categorias(
+    dfs: Sequence[pd.DataFrame], columnas: Sequence[str]
+) -> List[pd.DataFrame]:
+    """
+    Da las mismas categorías a una columna en varios DataFrames
+
+    pandas solo une por códigos cuando ambas columnas categóricas tienen las
+    mismas categorías; si difieren, convierte las claves a objetos y el
+    merge pierde la ventaja.
+
+    Args:
+        dfs: DataFrames que se van a unir
+        columnas: Columnas categóricas en común
+
+    Returns:
+        Los DataFrames con las categorías unificadas (copias superficiales)
+    """
+    dfs = [df.copy(deep=False) for df in dfs]
+    for columna in columnas:
+        series = [df[columna] for df in dfs if columna in df.columns]
+        if not all(isinstance(s.dtype, pd.CategoricalDtype) for s in series):
+            continue
+        categorias = series[0].cat.categories
+        for serie in series[1:]:
+            categorias = categorias.union(serie.cat.categories)
+        for df in dfs:
+            if columna in df.columns:
+                df[columna] = df[columna].cat.set_categories(categorias)
+    return dfs
+
+
+def memoria_mb(df: pd.DataFrame) -> float:
+    """Memoria del DataFrame en MB, incluyendo el contenido de las cadenas"""
+    return round(df.memory_usage(deep=True).sum() / 1024**2, 2)
+
+
+def _tipo_por_defecto(serie: pd.Series):
+    """Tipo con el que la columna llegaría sin tipos declarados (None = igual)"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.categories.dtype
+    if serie.dtype == "float32":
+        return "float64"
+    if serie.dtype == "Int32":
+        return "Int64"
+    return None
+
+
+def memoria_sin_tipos_mb(df: pd.DataFrame) -> float:
+    """
+    Memoria que ocuparía el DataFrame con los tipos por defecto de la lectura
+
+    Convierte una columna a la vez, así que no duplica la tabla en memoria.
+    Es una cota inferior: las columnas NUMERIC, que sin tipos llegan como
+    objetos ``Decimal``, se cuentan como float64.
+
+    Args:
+        df: DataFrame con los tipos compactos
+
+    Returns:
+        Memoria en MB con categorías como cadenas, float64 e Int64
+    """
+    usos = df.memory_usage(deep=True)
+    for columna in df.columns:
+        tipo = _tipo_por_defecto(df[columna])
+        if tipo is not None:
+            usos[columna] = (
+                df[columna].astype(tipo).memory_usage(deep=True, index=False)
+            )
+    return round(usos.sum() / 1024**2, 2)
+
+
+def reporte_memoria(
+    antes: Union[pd.DataFrame, float], despues: pd.DataFrame
+) -> Dict[str, float]:
+    """
+    Compara la memoria de un DataFrame antes y después de aplicar los tipos
+
+    Args:
+        antes: DataFrame con los tipos por defecto, o su memoria en MB
+            (p. ej. ``memoria_sin_tipos_mb(despues)``)
+        despues: El mismo DataFrame con los tipos compactos
+
+    Returns:
+        Diccionario con antes_mb, despues_mb y reduccion_porcentaje
+    """
+    mb_antes = memoria_mb(antes) if isinstance(antes, pd.DataFrame) else antes
+    mb_despues = memoria_mb(despues)
+    return {
+        "antes_mb": mb_antes,
+        "despues_mb": mb_despues,
+        "reduccion_porcentaje": (
+            round(100 * (1 - mb_despues / mb_antes), 1) if mb_antes else 0.0
+        ),
+    }
@@ -0,0 +1,305 @@
+"""
+Suavizado de elasticidades por material/zona/canal
+
+Para cada combinación existente se evalúan estrategias de suavizado
+(promedio, media móvil, exponencial, ...) en orden de prioridad sobre la
+serie semanal ordenada por fecha. Cada estrategia solo se calcula para las
+combinaciones que ninguna estrategia anterior dejó dentro del rango válido.
+Todo se resuelve con ``groupby`` en lugar de filtrar la tabla completa por
+cada combinación del producto cartesiano material × zona × canal.
+
+Para agregar una estrategia se define una subclase de ``EstrategiaSuavizado``
+y se registra en ``ESTRATEGIAS``.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+import numpy as np
+import pandas as pd
+
+CLAVES = ["id_material", "id_zona", "id_canal_venta"]
+
+# Columna de la tabla semanal que se reemplaza con la elasticidad suavizada
+COLUMNA_ELASTICIDAD = "elasticidad_promedio_historico"
+
+# Límite inferior de elasticidad válida (el superior es 0)
+LIM_ELAST_NEG = -3
+VENTANA_MEDIA_MOVIL = 3
+ALPHA_EXPONENCIAL = 0.3
+
+# Filtro de evaluación sobre elasticidad_promedio_historico: (min, max]
+FILTRO_MIN = 0.0
+FILTRO_MAX = 0.5
+
+COLUMNAS_SUAVIZADO: List[str] = [
+    *CLAVES,
+    "elasticidad_promedio_historico",
+    "elasticidad_promedio_historico_rango",
+    "elasticidad_media_movil",
+    "elasticidad_media_movil_rango",
+    "elasticidad_exp",
+    "elasticidad_exp_rango",
+]
+
+
+def en_rango(valores, lim_elast_neg: float = LIM_ELAST_NEG) -> np.ndarray:
+    """
+    Marca con "True"/"False" (texto) si la elasticidad está en el rango válido
+
+    Args:
+        valores: Elasticidades
+        lim_elast_neg: Límite inferior del rango
+
+    Returns:
+        Arreglo de textos "True"/"False"; los nulos quedan en "False"
+    """
+    valores = np.asarray(valores, dtype=float)
+    return np.where((valores <= 0) & (valores >= lim_elast_neg), "True", "False")
+
+
+def _promedio_por_grupo(serie: pd.Series) -> pd.Series:
+    """Promedio de una serie indexada por (claves, fila) por combinación"""
+    return serie.groupby(level=list(range(len(CLAVES))), sort=False).mean()
+
+
+class EstrategiaSuavizado:
+    """Estrategia que calcula una elasticidad por combinación"""
+
+    nombre: str = ""
+    # Columna de salida; el indicador de rango se guarda en "{columna}_rango"
+    columna: str = ""
+    # False: si la estrategia queda en rango se conserva la elasticidad original
+    suaviza: bool = True
+
+    @classmethod
+    def desde_parametros(cls, parametros: Dict[str, Any]) -> "EstrategiaSuavizado":
+        """Crea la estrategia tomando de ``parametros`` los que necesite"""
+        return cls()
+
+    def calcular(self, grupos) -> pd.Series:
+        """
+        Calcula la elasticidad de cada combinación
+
+        Args:
+            grupos: ``SeriesGroupBy`` de ``elasticidad_semana`` por CLAVES,
+                con cada serie ordenada por fecha
+
+        Returns:
+            Serie indexada por CLAVES
+        """
+        raise NotImplementedError
+
+
+class Promedio(EstrategiaSuavizado):
+    """Promedio simple de la serie semanal"""
+
+    nombre = "promedio"
+    columna = "elasticidad_promedio_historico"
+    suaviza = False
+
+    def calcular(self, grupos) -> pd.Series:
+        return grupos.mean()
+
+
+class MediaMovil(EstrategiaSuavizado):
+    """Promedio de la media móvil de la serie semanal"""
+
+    nombre = "media_movil"
+    columna = "elasticidad_media_movil"
+
+    def __init__(self, ventana: int = VENTANA_MEDIA_MOVIL):
+        self.ventana = ventana
+
+    @classmethod
+    def desde_parametros(cls, parametros: Dict[str, Any]) -> "MediaMovil":
+        return cls(ventana=int(parametros.get("ventana", VENTANA_MEDIA_MOVIL)))
+
+    def calcular(self, grupos) -> pd.Series:
+        return _promedio_por_grupo(grupos.rolling(window=self.ventana).mean())
+
+
+class Exponencial(EstrategiaSuavizado):
+    """Promedio del suavizado exponencial de la serie semanal"""
+
+    nombre = "exponencial"
+    columna = "elasticidad_exp"
+
+    def __init__(self, alpha: float = ALPHA_EXPONENCIAL):
+        self.alpha = alpha
+
+    @classmethod
+    def desde_parametros(cls, parametros: Dict[str, Any]) -> "Exponencial":
+        return cls(alpha=float(parametros.get("alpha", ALPHA_EXPONENCIAL)))
+
+    def calcular(self, grupos) -> pd.Series:
+        return _promedio_por_grupo(grupos.ewm(alpha=self.alpha, adjust=False).mean())
+
+
+ESTRATEGIAS: Dict[str, Type[EstrategiaSuavizado]] = {
+    Promedio.nombre: Promedio,
+    MediaMovil.nombre: MediaMovil,
+    Exponencial.nombre: Exponencial,
+}
+
+ESTRATEGIAS_POR_DEFECTO = (Promedio.nombre, MediaMovil.nombre, Exponencial.nombre)
+
+
+def parsear_nombres(texto: str) -> List[str]:
+    """
+    Convierte la lista de estrategias recibida por línea de comandos
+
+    Acepta "promedio,media_movil" y también la representación de una lista
+    de Python ("['promedio', 'media_movil']"), que es como llega un valor
+    lista desde ``FlowStep.parameters``.
+
+    Args:
+        texto: Nombres separados por comas
+
+    Returns:
+        Lista de nombres
+    """
+    nombres = (nombre.strip(" '\"[]") for nombre in texto.split(","))
+    return [nombre for nombre in nombres if nombre]
+
+
+def crear_estrategias(
+    nombres: Sequence[str] = ESTRATEGIAS_POR_DEFECTO, **parametros: Any
+) -> List[EstrategiaSuavizado]:
+    """
+    Crea las estrategias en orden de prioridad
+
+    Args:
+        nombres: Nombres registrados en ``ESTRATEGIAS``
+        **parametros: Parámetros de las estrategias (ventana, alpha, ...)
+
+    Returns:
+        Lista de estrategias
+
+    Raises:
+        ValueError: Si un nombre no está registrado o la lista está vacía
+    """
+    desconocidas = [nombre for nombre in nombres if nombre not in ESTRATEGIAS]
+    if desconocidas:
+        raise ValueError(
+            f"Estrategias de suavizado no válidas: {desconocidas}. "
+            f"Usar {list(ESTRATEGIAS)}"
+        )
+    if not nombres:
+        raise ValueError("Se requiere al menos una estrategia de suavizado")
+    return [ESTRATEGIAS[nombre].desde_parametros(parametros) for nombre in nombres]
+
+
+def suavizar_elasticidades(
+    df: pd.DataFrame,
+    lim_elast_neg: float = LIM_ELAST_NEG,
+    ventana: int = VENTANA_MEDIA_MOVIL,
+    alpha: float = ALPHA_EXPONENCIAL,
+    estrategias: Optional[Sequence[EstrategiaSuavizado]] = None,
+) -> pd.DataFrame:
+    """
+    Evalúa las estrategias por combinación hasta que una quede en rango
+
+    Las estrategias posteriores a la que dejó la combinación en rango no se
+    calculan: repiten el valor de la primera estrategia y se marcan "False".
+
+    Args:
+        df: Tabla semanal con claves, ``fecha_semana`` y ``elasticidad_semana``
+        lim_elast_neg: Límite inferior de elasticidad válida
+        ventana: Ventana de la media móvil (si no se indican estrategias)
+        alpha: Factor del suavizado exponencial (si no se indican estrategias)
+        estrategias: Estrategias en orden de prioridad; por defecto promedio,
+            media móvil y exponencial
+
+    Returns:
+        DataFrame con CLAVES y, por estrategia, su columna y su indicador de
+        rango; una fila por combinación en el orden de aparición de material,
+        zona y canal
+    """
+    if estrategias is None:
+        estrategias = crear_estrategias(ventana=ventana, alpha=alpha)
+
+    # Códigos en orden de aparición, igual que recorrer los .unique()
+    codigos = {}
+    valores = {}
+    for clave in CLAVES:
+        codigos[clave], valores[clave] = pd.factorize(df[clave])
+    serie = pd.DataFrame(
+        {
+            **codigos,
+            "fecha_semana": df["fecha_semana"].to_numpy(),
+            "elasticidad_semana": df["elasticidad_semana"].to_numpy(),
+        }
+    )
+    # factorize marca los nulos con -1: esas filas no pertenecen a ninguna combinación
+    serie = serie[(serie[CLAVES] >= 0).all(axis=1)]
+    serie = serie.sort_values(by=[*CLAVES, "fecha_semana"], kind="stable")
+
+    por_grupo = serie.groupby(CLAVES, sort=False)
+    indice = por_grupo.size().index
+    grupo_de_fila = por_grupo.ngroup().to_numpy()
+
+    df_suav = pd.DataFrame(
+        {clave: valores[clave].take(indice.get_level_values(clave)) for clave in CLAVES}
+    )
+    pendiente = np.ones(len(indice), dtype=bool)
+    primer_valor = None
+    for estrategia in estrategias:
+        calculado = np.full(len(indice), np.nan)
+        if pendiente.any():
+            filas = serie[pendiente[grupo_de_fila]]
+            grupos = filas.groupby(CLAVES, sort=False)["elasticidad_semana"]
+            calculado = estrategia.calcular(grupos).reindex(indice).to_numpy()
+        if primer_valor is None:
+            primer_valor = calculado
+        rango = np.where(pendiente, en_rango(calculado, lim_elast_neg), "False")
+        df_suav[estrategia.columna] = np.where(pendiente, calculado, primer_valor)
+        df_suav[f"{estrategia.columna}_rango"] = rango
+        pendiente &= rango == "False"
+    return df_suav
+
+
+def aplicar_suavizado(
+    df: pd.DataFrame,
+    df_suav: pd.DataFrame,
+    estrategias: Optional[Sequence[EstrategiaSuavizado]] = None,
+) -> pd.DataFrame:
+    """
+    Reemplaza la elasticidad de la tabla con la estrategia que quedó en rango
+
+    Si la estrategia en rango no suaviza (promedio) se conserva la
+    elasticidad original. La elasticidad previa queda en
+    ``elasticidad_promedio_historico_presuavizado`` y ``suavizado_aplicado``
+    indica si se aplicó un suavizado.
+
+    Args:
+        df: Tabla semanal completa
+        df_suav: Resultado de ``suavizar_elasticidades``
+        estrategias: Las mismas estrategias usadas para ``df_suav``
+
+    Returns:
+        Tabla con las columnas originales más ``suavizado_aplicado`` y
+        ``elasticidad_promedio_historico_presuavizado``
+    """
+    if estrategias is None:
+        estrategias = crear_estrategias()
+
+    repetidas = [c for c in df_suav.columns if c in df.columns and c not in CLAVES]
+    df_g = df.merge(df_suav.drop(columns=repetidas), on=CLAVES, how="left")
+
+    original = df_g[COLUMNA_ELASTICIDAD]
+    condiciones = [df_g[f"{e.columna}_rango"] == "True" for e in estrategias]
+    df_g["suavizado_aplicado"] = np.select(
+        condiciones,
+        ["suavizado" if e.suaviza else "no_suavizado" for e in estrategias],
+        default="no_suavizado",
+    )
+    elasticidad = np.select(
+        condiciones,
+        [df_g[e.columna] if e.suaviza else original for e in estrategias],
+        default=original,
+    )
+    df_g["elasticidad_promedio_historico_presuavizado"] = original
+    df_g[COLUMNA_ELASTICIDAD] = elasticidad
+
+    columnas = [c for e in estrategias for c in (e.columna, f"{e.columna}_rango")]
+    return df_g.drop(columns=[c for c in columnas if c in df_g.columns and c not in df])
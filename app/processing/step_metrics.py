@@ -0,0 +1,104 @@
+"""
+Métricas estructuradas de un paso del flujo
+
+El ejecutor pasa a cada script la ruta de un archivo en la variable
+``FLOW_RESULT_FILE``; el script escribe ahí un objeto JSON con sus métricas
+(filas leídas y escritas, duración por fase, memoria máxima) y el ejecutor
+lo agrega a ``StepResult.metadata``. Sin la variable (script ejecutado a
+mano) ``guardar`` no escribe nada.
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Debe coincidir con ``RESULT_FILE_ENV`` del ejecutor de flujos
+ARCHIVO_RESULTADO_ENV = "FLOW_RESULT_FILE"
+
+
+def memoria_maxima_mb() -> Optional[float]:
+    """
+    Memoria residente máxima del proceso en MB
+
+    En los workers persistentes es el máximo desde que inició el worker, no
+    solo durante el script actual.
+    """
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB y macOS bytes
+    return round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class MetricasPaso:
+    """
+    Acumula las métricas de un script y las escribe para el ejecutor
+
+    Ejemplo:
+        metricas = MetricasPaso()
+        with metricas.fase("lectura"):
+            df = metricas.leidas(client.query(query).to_dataframe())
+        ...
+        metricas.escritas(len(df_salida))
+        metricas.guardar(modelos=resumen)
+    """
+
+    def __init__(self):
+        self.filas_leidas = 0
+        self.filas_escritas = 0
+        self.fases: Dict[str, float] = {}
+
+    @contextmanager
+    def fase(self, nombre: str) -> Iterator[None]:
+        """Mide la duración de una fase (se suma si la fase se repite)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.fases[nombre] = round(self.fases.get(nombre, 0.0) + duracion, 4)
+
+    def leidas(self, df):
+        """Suma las filas de un DataFrame leído y lo devuelve sin cambios"""
+        self.filas_leidas += len(df)
+        return df
+
+    def escritas(self, filas: int) -> None:
+        """Suma filas escritas en el destino"""
+        self.filas_escritas += filas
+
+    def como_dict(self, **extra: Any) -> Dict[str, Any]:
+        """Métricas en el formato que espera el ejecutor"""
+        return {
+            "rows_read": self.filas_leidas,
+            "rows_written": self.filas_escritas,
+            "phase_seconds": dict(self.fases),
+            "peak_memory_mb": memoria_maxima_mb(),
+            **extra,
+        }
+
+    def guardar(self, ruta: Optional[str] = None, **extra: Any) -> bool:
+        """
+        Escribe las métricas en el archivo de resultado del paso
+
+        Args:
+            ruta: Archivo destino (None = variable FLOW_RESULT_FILE)
+            **extra: Valores adicionales serializables a JSON
+
+        Returns:
+            True si se escribieron las métricas
+        """
+        ruta = ruta or os.environ.get(ARCHIVO_RESULTADO_ENV)
+        if not ruta:
+            return False
+        with open(ruta, "w") as f:
+            json.dump(self.como_dict(**extra), f, default=str)
+        return True
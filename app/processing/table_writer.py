@@ -0,0 +1,333 @@
+"""
+Escritura de tablas como Parquet con esquema explícito
+
+``client.load_table_from_dataframe(df, tabla, LoadJobConfig(autodetect=True))``
+vuelve a inferir el esquema en cada ejecución: una columna NUMERIC cambia de
+precisión según los datos y una columna sin valores queda sin tipo. Aquí el
+esquema se fija antes de serializar:
+
+- Cadenas y categorías como STRING; las categorías se escriben con
+  codificación de diccionario (BigQuery las lee como STRING).
+- Flotantes como FLOAT64 y enteros como INT64; ``float32``/``Int32`` se
+  escriben sin ampliar y BigQuery los convierte al cargar.
+- Decimales como NUMERIC (o BIGNUMERIC si no caben).
+- Fechas como DATE y timestamps como TIMESTAMP/DATETIME en microsegundos.
+
+La tabla se escribe en fragmentos de Parquet comprimidos. ``EscritorBigQuery``
+carga cada fragmento en una tabla temporal y la copia al destino al final,
+así el destino se reemplaza de una vez y queda intacto si una carga falla.
+``EscritorLocal`` escribe los mismos archivos en disco para pruebas y
+benchmarks sin BigQuery.
+"""
+
+import io
+import shutil
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .schemas import aplicar_tipos
+
+COMPRESIONES = ("snappy", "zstd", "gzip", "none")
+
+NUMERIC = pa.decimal128(38, 9)
+BIGNUMERIC = pa.decimal256(76, 38)
+
+
+def _tipo_arrow(columna: str, tipo: pa.DataType) -> pa.DataType:
+    """Tipo de Arrow con el que se escribe una columna"""
+    if pa.types.is_dictionary(tipo):
+        return pa.dictionary(tipo.index_type, _tipo_arrow(columna, tipo.value_type))
+    if pa.types.is_string(tipo) or pa.types.is_large_string(tipo):
+        return pa.string()
+    if pa.types.is_boolean(tipo):
+        return pa.bool_()
+    if pa.types.is_unsigned_integer(tipo):
+        return pa.int64()
+    if pa.types.is_integer(tipo):
+        return tipo
+    if pa.types.is_float16(tipo):
+        return pa.float32()
+    if pa.types.is_floating(tipo):
+        return tipo
+    if pa.types.is_decimal(tipo):
+        if tipo.scale <= 9 and tipo.precision - tipo.scale <= 29:
+            return NUMERIC
+        return BIGNUMERIC
+    if pa.types.is_date(tipo):
+        return pa.date32()
+    if pa.types.is_timestamp(tipo):
+        return pa.timestamp("us", tz=tipo.tz)
+    if pa.types.is_null(tipo):
+        raise ValueError(
+            f"La columna {columna} no tiene valores; declare su tipo en 'tipos'"
+        )
+    raise ValueError(f"Tipo no soportado en la columna {columna}: {tipo}")
+
+
+def _tipo_bigquery(tipo: pa.DataType) -> str:
+    """Tipo de BigQuery de una columna normalizada por ``_tipo_arrow``"""
+    if pa.types.is_dictionary(tipo):
+        return _tipo_bigquery(tipo.value_type)
+    if pa.types.is_string(tipo):
+        return "STRING"
+    if pa.types.is_boolean(tipo):
+        return "BOOLEAN"
+    if pa.types.is_integer(tipo):
+        return "INTEGER"
+    if pa.types.is_floating(tipo):
+        return "FLOAT"
+    if pa.types.is_date(tipo):
+        return "DATE"
+    if pa.types.is_timestamp(tipo):
+        return "TIMESTAMP" if tipo.tz else "DATETIME"
+    return "NUMERIC" if tipo == NUMERIC else "BIGNUMERIC"
+
+
+def _normalizar(esquema: pa.Schema) -> pa.Schema:
+    return pa.schema([pa.field(c.name, _tipo_arrow(c.name, c.type)) for c in esquema])
+
+
+def esquema_arrow(df: pd.DataFrame) -> pa.Schema:
+    """
+    Esquema fijo de Arrow para escribir un DataFrame
+
+    Args:
+        df: DataFrame a escribir
+
+    Returns:
+        Esquema con tipos compatibles con BigQuery (ver docstring del módulo)
+
+    Raises:
+        ValueError: Si una columna no tiene valores o su tipo no es soportado
+    """
+    return _normalizar(pa.Schema.from_pandas(df, preserve_index=False))
+
+
+def campos_bigquery(esquema: pa.Schema) -> List[Any]:
+    """
+    Esquema de BigQuery equivalente a un esquema de ``esquema_arrow``
+
+    Args:
+        esquema: Esquema de Arrow normalizado
+
+    Returns:
+        Lista de ``SchemaField`` para ``LoadJobConfig(schema=...)``
+    """
+    from google.cloud import bigquery
+
+    return [
+        bigquery.SchemaField(c.name, _tipo_bigquery(c.type), mode="NULLABLE")
+        for c in esquema
+    ]
+
+
+def tabla_arrow(df: pd.DataFrame, tipos: Optional[Dict[str, str]] = None) -> pa.Table:
+    """
+    Convierte un DataFrame a una tabla de Arrow con el esquema fijo
+
+    Args:
+        df: DataFrame a escribir
+        tipos: Tipos de pandas declarados (``schemas.tipos_de``) que se
+            aplican antes de fijar el esquema, p. ej. para columnas sin valores
+
+    Returns:
+        Tabla de Arrow sin metadatos de pandas
+    """
+    if tipos:
+        df = aplicar_tipos(df, tipos)
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    return tabla.cast(_normalizar(tabla.schema))
+
+
+def fragmentos_parquet(
+    tabla: pa.Table, filas_por_fragmento: int, compresion: str = "snappy"
+) -> Iterator[pa.Buffer]:
+    """
+    Serializa una tabla en archivos Parquet de hasta ``filas_por_fragmento``
+
+    Una tabla sin filas produce un archivo vacío con el esquema.
+
+    Args:
+        tabla: Tabla de Arrow
+        filas_por_fragmento: Filas por archivo
+        compresion: Códec de Parquet (``COMPRESIONES``)
+
+    Yields:
+        Contenido de cada archivo Parquet
+    """
+    codec = None if compresion == "none" else compresion
+    for inicio in range(0, max(tabla.num_rows, 1), filas_por_fragmento):
+        salida = pa.BufferOutputStream()
+        # BigQuery no usa las estadísticas de columna al cargar
+        pq.write_table(
+            tabla.slice(inicio, filas_por_fragmento),
+            salida,
+            compression=codec,
+            write_statistics=False,
+        )
+        yield salida.getvalue()
+
+
+class EscritorParquet(ABC):
+    """Serializa un DataFrame en fragmentos de Parquet y los entrega al destino"""
+
+    def __init__(self, filas_por_fragmento: int = 500_000, compresion: str = "snappy"):
+        if filas_por_fragmento < 1:
+            raise ValueError("filas_por_fragmento debe ser mayor que cero")
+        if compresion not in COMPRESIONES:
+            raise ValueError(
+                f"Compresión no soportada: {compresion}. Opciones: {COMPRESIONES}"
+            )
+        self.filas_por_fragmento = filas_por_fragmento
+        self.compresion = compresion
+
+    def escribir(
+        self,
+        df: pd.DataFrame,
+        destino: str,
+        tipos: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Reemplaza el contenido del destino con el DataFrame
+
+        Args:
+            df: DataFrame a escribir
+            destino: Tabla de destino
+            tipos: Tipos de pandas declarados (ver ``tabla_arrow``)
+
+        Returns:
+            Diccionario con destino, filas, fragmentos, bytes y segundos
+        """
+        inicio = time.perf_counter()
+        tabla = tabla_arrow(df, tipos)
+        conteo = {"fragmentos": 0, "bytes": 0}
+
+        def contados():
+            for fragmento in fragmentos_parquet(
+                tabla, self.filas_por_fragmento, self.compresion
+            ):
+                conteo["fragmentos"] += 1
+                conteo["bytes"] += fragmento.size
+                yield fragmento
+
+        self._cargar(destino, tabla.schema, contados())
+        return {
+            "destino": destino,
+            "filas": tabla.num_rows,
+            **conteo,
+            "segundos": round(time.perf_counter() - inicio, 3),
+        }
+
+    @abstractmethod
+    def _cargar(
+        self, destino: str, esquema: pa.Schema, fragmentos: Iterator[pa.Buffer]
+    ) -> None:
+        """
+        Reemplaza el destino con los fragmentos
+
+        Args:
+            destino: Tabla de destino
+            esquema: Esquema fijo de los fragmentos
+            fragmentos: Archivos Parquet serializados (al menos uno)
+        """
+
+
+class EscritorLocal(EscritorParquet):
+    """
+    Escribe cada tabla como un directorio de archivos Parquet
+
+    Los archivos se escriben en un directorio temporal que reemplaza al
+    destino al terminar, igual que la copia desde la tabla temporal en
+    BigQuery.
+    """
+
+    def __init__(self, directorio: Union[str, Path], **kwargs: Any):
+        super().__init__(**kwargs)
+        self.directorio = Path(directorio)
+
+    def ruta(self, destino: str) -> Path:
+        """Directorio donde queda la tabla ``destino``"""
+        return self.directorio / destino
+
+    def _cargar(
+        self, destino: str, esquema: pa.Schema, fragmentos: Iterator[pa.Buffer]
+    ) -> None:
+        final = self.ruta(destino)
+        temporal = final.with_name(f".{final.name}.{uuid.uuid4().hex[:8]}")
+        temporal.mkdir(parents=True)
+        try:
+            for i, fragmento in enumerate(fragmentos):
+                (temporal / f"parte-{i:05d}.parquet").write_bytes(fragmento)
+        except BaseException:
+            shutil.rmtree(temporal, ignore_errors=True)
+            raise
+        anterior = final.with_name(f".{final.name}.anterior")
+        if final.exists():
+            final.rename(anterior)
+        temporal.rename(final)
+        shutil.rmtree(anterior, ignore_errors=True)
+
+
+class EscritorBigQuery(EscritorParquet):
+    """
+    Carga los fragmentos en BigQuery con el esquema fijo
+
+    Con un solo fragmento se carga directo al destino. Con varios, cada uno
+    se agrega a una tabla temporal junto al destino (``<destino>_carga_<id>``)
+    que al final se copia con WRITE_TRUNCATE y se elimina.
+    """
+
+    def __init__(self, client, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.client = client
+
+    def _cargar_archivo(
+        self,
+        fragmento: pa.Buffer,
+        tabla: str,
+        campos: List[Any],
+        disposicion: str,
+    ) -> None:
+        from google.cloud import bigquery
+
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            schema=campos,
+            write_disposition=disposicion,
+        )
+        self.client.load_table_from_file(
+            io.BytesIO(fragmento.to_pybytes()),
+            tabla,
+            size=fragmento.size,
+            job_config=job_config,
+        ).result()
+
+    def _cargar(
+        self, destino: str, esquema: pa.Schema, fragmentos: Iterator[pa.Buffer]
+    ) -> None:
+        campos = campos_bigquery(esquema)
+        primero = next(fragmentos)
+        segundo = next(fragmentos, None)
+        if segundo is None:
+            self._cargar_archivo(primero, destino, campos, "WRITE_TRUNCATE")
+            return
+
+        from google.cloud import bigquery
+
+        temporal = f"{destino}_carga_{uuid.uuid4().hex[:8]}"
+        try:
+            self._cargar_archivo(primero, temporal, campos, "WRITE_TRUNCATE")
+            self._cargar_archivo(segundo, temporal, campos, "WRITE_APPEND")
+            for fragmento in fragmentos:
+                self._cargar_archivo(fragmento, temporal, campos, "WRITE_APPEND")
+            job_config = bigquery.CopyJobConfig(write_disposition="WRITE_TRUNCATE")
+            self.client.copy_table(temporal, destino, job_config=job_config).result()
+        finally:
+            self.client.delete_table(temporal, not_found_ok=True)
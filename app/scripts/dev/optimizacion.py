@@ -13,6 +13,8 @@ import sys
 import time
 from datetime import datetime
 
+from app.processing.step_metrics import MetricasPaso
+
 
 def main():
     """Función principal del script"""
@@ -39,14 +41,17 @@ def main():
         print(f"  - Iteraciones: {args.iterations}")
         print(f"  - Tolerancia: {args.tolerance}")
 
+    metricas = MetricasPaso()
+
     # Simular procesamiento
     print("Ejecutando algoritmo de optimización...")
 
-    for i in range(min(5, args.iterations // 20)):  # Simular progreso
-        time.sleep(0.5)
-        print(
-            f"  Iteración {(i + 1) * 20}/{args.iterations} - Convergencia: {0.1 / (i + 1):.4f}"
-        )
+    with metricas.fase("optimizacion"):
+        for i in range(min(5, args.iterations // 20)):  # Simular progreso
+            time.sleep(0.5)
+            print(
+                f"  Iteración {(i + 1) * 20}/{args.iterations} - Convergencia: {0.1 / (i + 1):.4f}"
+            )
 
     # Simular resultados
     result = {
@@ -62,6 +67,7 @@ def main():
 
     print("Optimización completada:")
     print(json.dumps(result, indent=2))
+    metricas.guardar(algorithm=args.algorithm, iterations_completed=args.iterations)
 
     return 0
 
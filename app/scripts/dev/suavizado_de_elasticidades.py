@@ -4,13 +4,69 @@
 # In[1]:
 
 
+import argparse
+
 import pandas as pd
-import numpy as np
 import time
 
 # from pulp import *
-from google.cloud import bigquery
-from scipy.optimize import minimize
+
+from app.bigquery_client import get_client
+from app.config import settings
+from app.processing.query_reader import leer_consulta
+from app.processing.smoothing import (
+    ALPHA_EXPONENCIAL,
+    ESTRATEGIAS_POR_DEFECTO,
+    FILTRO_MAX,
+    FILTRO_MIN,
+    LIM_ELAST_NEG,
+    VENTANA_MEDIA_MOVIL,
+    aplicar_suavizado,
+    crear_estrategias,
+    parsear_nombres,
+    suavizar_elasticidades,
+)
+from app.processing.step_metrics import MetricasPaso
+from app.processing.table_writer import EscritorBigQuery
+
+# Parametros del script (se reciben desde FlowStep.parameters)
+parser = argparse.ArgumentParser(description="Suavizado de elasticidades semanal")
+parser.add_argument(
+    "--estrategias",
+    default=",".join(ESTRATEGIAS_POR_DEFECTO),
+    help="Estrategias en orden de prioridad, separadas por comas",
+)
+parser.add_argument(
+    "--ventana", type=int, default=VENTANA_MEDIA_MOVIL, help="Ventana de la media movil"
+)
+parser.add_argument(
+    "--alpha",
+    type=float,
+    default=ALPHA_EXPONENCIAL,
+    help="Factor del suavizado exponencial",
+)
+parser.add_argument(
+    "--lim_elast_neg",
+    type=float,
+    default=LIM_ELAST_NEG,
+    help="Limite de elasticidad negativa (Prueba: -10 Real: -3)",
+)
+parser.add_argument(
+    "--filtro_min",
+    type=float,
+    default=FILTRO_MIN,
+    help="Se evaluan elasticidad_promedio_historico > filtro_min",
+)
+parser.add_argument(
+    "--filtro_max",
+    type=float,
+    default=FILTRO_MAX,
+    help="Se evaluan elasticidad_promedio_historico <= filtro_max",
+)
+args = parser.parse_args()
+estrategias = crear_estrategias(
+    parsear_nombres(args.estrategias), ventana=args.ventana, alpha=args.alpha
+)
 
 
 # In[2]:
@@ -26,7 +82,8 @@ pd.options.display.max_rows = None
 
 
 # Carga de tabla
-client = bigquery.Client()
+metricas = MetricasPaso()
+client = get_client()
 print("cliente autenticado")
 
 #  Consulta a BigQuery
@@ -35,7 +92,8 @@ SELECT
     *
 FROM `staging.test_elasticidad_historica_kgv_semanal`
 """
-df_backup = client.query(query).to_dataframe()
+with metricas.fase("lectura"):
+    df_backup = metricas.leidas(leer_consulta(client, query))
 
 
 # In[4]:
@@ -54,186 +112,46 @@ df = df_backup.copy()
 # df = df[df['id_material'] == '6033']
 
 # Por rangos
-lim_elast_neg = -3  # Limite de elasticidad negativa Prueba: -10 Real: -3
+# Limite de elasticidad negativa Prueba: -10 Real: -3
+lim_elast_neg = args.lim_elast_neg
 # df = df[(df['elasticidad_promedio_historico_prev'] > 0) | (df['elasticidad_promedio_historico_prev'] < lim_elast_neg)] #Prueba
 # df = df[(df['elasticidad_promedio_historico'] > 0) | (df['elasticidad_promedio_historico'] < lim_elast_neg)] #Para pipeline
 df = df[
-    (df["elasticidad_promedio_historico"] > 0)
-    & (df["elasticidad_promedio_historico"] <= 0.5)
+    (df["elasticidad_promedio_historico"] > args.filtro_min)
+    & (df["elasticidad_promedio_historico"] <= args.filtro_max)
 ]  # Para evaluacion
 
 
 # In[6]:
 
 
-list_mat = (
-    df.id_material.unique().tolist()
-)  # [0:5] #Sample de 5 materiales en exceso, numero real aprox = 1571
-list_zon = df.id_zona.unique().tolist()
-list_can = df.id_canal_venta.unique().tolist()
-total = len(list_mat) * len(list_zon) * len(list_can)
-
-
-# In[7]:
-
-
-list_suav = []
-count = 1
-for m in list_mat:
-    if count % 1000 == 0:
-        print(f"Procesando material {count} de {len(list_mat)}: {m}")
-    count += 1
-    for z in list_zon:
-        for c in list_can:
-            df_ev = df[
-                (df["id_material"] == m)
-                & (df["id_zona"] == z)
-                & (df["id_canal_venta"] == c)
-            ][["fecha_semana", "elasticidad_semana"]]
-            if len(df_ev) > 0:
-                df_ev = df_ev.sort_values(by="fecha_semana")
-                s = df_ev["elasticidad_semana"]
-                # Promedio
-                elas_prom = s.mean()
-                prom_rango = (
-                    "True"
-                    if (elas_prom <= 0 and elas_prom >= lim_elast_neg)
-                    else "False"
-                )
-                if prom_rango == "False":  # Se hace suavizado solo si es necesario
-                    # Media movil
-                    media_movil = s.rolling(window=3).mean().dropna()
-                    elas_media_movil = media_movil.mean()
-                    media_rango = (
-                        "True"
-                        if (elas_media_movil <= 0 and elas_media_movil >= lim_elast_neg)
-                        else "False"
-                    )
-                    # Exponencial
-                    suavizado_exp = s.ewm(alpha=0.3, adjust=False).mean()
-                    elas_suav_exp = suavizado_exp.mean()
-                    suav_rango = (
-                        "True"
-                        if (elas_suav_exp <= 0 and elas_suav_exp >= lim_elast_neg)
-                        else "False"
-                    )
-                    list_suav.append(
-                        [
-                            m,
-                            z,
-                            c,
-                            elas_prom,
-                            prom_rango,
-                            elas_media_movil,
-                            media_rango,
-                            elas_suav_exp,
-                            suav_rango,
-                        ]
-                    )
-                else:
-                    list_suav.append(
-                        [
-                            m,
-                            z,
-                            c,
-                            elas_prom,
-                            prom_rango,
-                            elas_prom,
-                            "False",
-                            elas_prom,
-                            "False",
-                        ]
-                    )
-                # print(m,z,c,len(df_ev))
-df_suav_test = pd.DataFrame(
-    list_suav,
-    columns=[
-        "id_material",
-        "id_zona",
-        "id_canal_venta",
-        "elasticidad_promedio_historico",
-        "elasticidad_promedio_historico_rango",
-        "elasticidad_media_movil",
-        "elasticidad_media_movil_rango",
-        "elasticidad_exp",
-        "elasticidad_exp_rango",
-    ],
-)
-
-
-# In[8]:
-
-
-df_suav_test = pd.DataFrame(
-    list_suav,
-    columns=[
-        "id_material",
-        "id_zona",
-        "id_canal_venta",
-        "elasticidad_promedio_historico",
-        "elasticidad_promedio_historico_rango",
-        "elasticidad_media_movil",
-        "elasticidad_media_movil_rango",
-        "elasticidad_exp",
-        "elasticidad_exp_rango",
-    ],
-)
+# Estrategias en orden de prioridad por material/zona/canal; cada combinacion
+# deja de evaluarse en cuanto una estrategia queda en rango
+print(f"Iniciando suavizado de elasticidades: {[e.nombre for e in estrategias]}")
+with metricas.fase("suavizado"):
+    df_suav_test = suavizar_elasticidades(
+        df, lim_elast_neg=lim_elast_neg, estrategias=estrategias
+    )
 
 
 # In[12]:
 
 
-df_suav_test = df_suav_test.drop(columns=["elasticidad_promedio_historico"])
-df_g = df_backup.merge(
-    df_suav_test, on=["id_material", "id_zona", "id_canal_venta"], how="left"
-)
-
-df_g["elasticidad_fix"] = np.select(
-    [
-        df_g["elasticidad_promedio_historico_rango"] == "True",
-        df_g["elasticidad_media_movil_rango"] == "True",
-        df_g["elasticidad_exp_rango"] == "True",
-    ],
-    [
-        df_g["elasticidad_promedio_historico"],
-        df_g["elasticidad_media_movil"],
-        df_g["elasticidad_exp"],
-    ],
-    default=df_g["elasticidad_promedio_historico"],
-)
-
-df_g["suavizado_aplicado"] = np.select(
-    [
-        df_g["elasticidad_media_movil_rango"] == "True",
-        df_g["elasticidad_exp_rango"] == "True",
-    ],
-    [
-        "suavizado",
-        "suavizado",
-    ],
-    default="no_suavizado",
-)
-
-df_g["elasticidad_promedio_historico_presuavizado"] = df_g[
-    "elasticidad_promedio_historico"
-]
-df_g["elasticidad_promedio_historico"] = df_g["elasticidad_fix"]
-df_g = df_g.drop(
-    columns=[
-        "elasticidad_fix",
-        "elasticidad_promedio_historico_rango",
-        "elasticidad_media_movil",
-        "elasticidad_media_movil_rango",
-        "elasticidad_exp",
-        "elasticidad_exp_rango",
-    ]
-)
-# df_g = df_g.drop(columns = ['elasticidad_fix','elasticidad_media_movil','elasticidad_exp'])
+with metricas.fase("suavizado"):
+    df_g = aplicar_suavizado(df_backup, df_suav_test, estrategias)
 
 
 # In[16]:
 
 # table_id = "onus-dev-proy-retail-elastici.staging.test_suavizado_semanal"
 table_id = "onus-dev-proy-retail-elastici.staging.test_suavizado_semanal_prev"
-job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE", autodetect=True)
-client.load_table_from_dataframe(df_g, table_id, job_config=job_config).result()
+escritor = EscritorBigQuery(
+    client,
+    filas_por_fragmento=settings.UPLOAD_CHUNK_ROWS,
+    compresion=settings.PARQUET_COMPRESSION,
+)
+with metricas.fase("escritura"):
+    escritura = escritor.escribir(df_g, table_id)
+print(f"Tabla escrita: {escritura}")
+metricas.escritas(escritura["filas"])
+metricas.guardar(estrategias=[e.nombre for e in estrategias])
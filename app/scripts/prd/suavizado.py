@@ -13,6 +13,8 @@ import sys
 import time
 from datetime import datetime
 
+from app.processing.step_metrics import MetricasPaso
+
 
 def main():
     """Función principal del script"""
@@ -35,9 +37,13 @@ def main():
         print(f"  - Output: {args.output}")
         print(f"  - Factor: {args.factor}")
 
+    metricas = MetricasPaso()
+
     # Simular procesamiento
     print("Procesando datos...")
-    time.sleep(2)  # Simular trabajo
+    with metricas.fase("procesamiento"):
+        time.sleep(2)  # Simular trabajo
+    metricas.filas_leidas = metricas.filas_escritas = 1000
 
     # Simular resultados
     result = {
@@ -50,6 +56,7 @@ def main():
 
     print(f"Procesamiento completado:")
     print(json.dumps(result, indent=2))
+    metricas.guardar(smoothing_factor=args.factor)
 
     return 0
 
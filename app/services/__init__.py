@@ -1,6 +1,28 @@
 """Servicios de la aplicación"""
 
+from .checkpoint_store import (
+    CheckpointStore,
+    FlowCheckpoint,
+    InMemoryCheckpointStore,
+    SQLiteCheckpointStore,
+)
 from .flow_executor import FlowExecutor
+from .flow_runner import FlowRunner
+from .flow_store import FlowStore, InMemoryFlowStore, SQLFlowStore
+from .script_worker import ScriptWorkerPool
 from .bigquery_service import BigQueryService, bigquery_service
 
-__all__ = ["FlowExecutor", "BigQueryService", "bigquery_service"]
+__all__ = [
+    "CheckpointStore",
+    "FlowCheckpoint",
+    "InMemoryCheckpointStore",
+    "SQLiteCheckpointStore",
+    "FlowExecutor",
+    "FlowRunner",
+    "FlowStore",
+    "InMemoryFlowStore",
+    "SQLFlowStore",
+    "ScriptWorkerPool",
+    "BigQueryService",
+    "bigquery_service",
+]
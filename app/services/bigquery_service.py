@@ -3,40 +3,56 @@ Servicio para ejecutar consultas y procedimientos en BigQuery
 """
 
 import asyncio
-from typing import Dict, Any, Optional, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, Any, Optional, List, Callable, Tuple
 from google.cloud import bigquery
-from google.oauth2 import service_account
 from loguru import logger
 
+from ..bigquery_client import get_client
 from ..config import settings
 
 
+# Función que recibe los cambios de estado de un job (ver ``wait_job``)
+JobEventCallback = Callable[[Dict[str, Any]], None]
+
+
 class BigQueryService:
-    """Servicio para interactuar con BigQuery"""
+    """
+    Servicio para interactuar con BigQuery
+
+    Los jobs se envían y luego se consultan con ``job.reload()`` desde el
+    event loop con espera creciente entre consultas; las llamadas a la API
+    (cortas) usan un pool de hilos propio y ningún hilo queda bloqueado
+    esperando a que un job termine.
+
+    El catálogo de rutinas de cada entorno (``INFORMATION_SCHEMA.ROUTINES``)
+    se consulta una vez y se guarda en memoria por ROUTINE_CACHE_TTL_SECONDS;
+    las validaciones y los listados de procedimientos se responden desde ahí.
+    """
 
     def __init__(self):
         self.client = None
+        # Entorno -> (momento de la consulta, {routine_name: routine_type})
+        self._routines: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self._routines_locks: Dict[str, asyncio.Lock] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.BIGQUERY_THREADS, thread_name_prefix="bigquery"
+        )
         self._initialize_client()
 
     def _initialize_client(self):
-        """Inicializa el cliente de BigQuery"""
+        """Obtiene el cliente de BigQuery compartido del proceso"""
         try:
-            if settings.GOOGLE_APPLICATION_CREDENTIALS:
-                # Usar service account key file
-                credentials = service_account.Credentials.from_service_account_file(
-                    settings.GOOGLE_APPLICATION_CREDENTIALS
-                )
-                self.client = bigquery.Client(
-                    credentials=credentials,
-                    project=settings.GOOGLE_CLOUD_PROJECT,
-                    location=settings.BIGQUERY_LOCATION,
-                )
-            else:
-                # Usar Application Default Credentials (para Cloud Run)
-                self.client = bigquery.Client(
-                    project=settings.GOOGLE_CLOUD_PROJECT,
-                    location=settings.BIGQUERY_LOCATION,
-                )
+            # Sin archivo de credenciales usa Application Default Credentials
+            # (para Cloud Run)
+            self.client = get_client(
+                project=settings.GOOGLE_CLOUD_PROJECT,
+                location=settings.BIGQUERY_LOCATION,
+                credentials_path=settings.GOOGLE_APPLICATION_CREDENTIALS,
+            )
 
             logger.info("Cliente BigQuery inicializado correctamente")
 
@@ -49,17 +65,25 @@ class BigQueryService:
         procedure_name: str,
         environment: str,
         parameters: Optional[Dict[str, Any]] = None,
+        on_event: Optional[JobEventCallback] = None,
+        preview_rows: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Ejecuta un stored procedure en BigQuery
 
+        Del resultado solo se descargan las primeras ``preview_rows`` filas
+        (una página con ``max_results``); ``total_rows`` se toma de los
+        metadatos del job, sin recorrer el resultado completo.
+
         Args:
             procedure_name: Nombre del procedimiento
             environment: Entorno (dev/prd)
             parameters: Parámetros del procedimiento
+            on_event: Función llamada con cada cambio de estado del job
+            preview_rows: Filas de muestra a descargar (None = PROCEDURE_PREVIEW_ROWS)
 
         Returns:
-            Dict con el resultado de la ejecución
+            Dict con el resultado de la ejecución (incluye los eventos del job)
         """
         if not self.client:
             raise RuntimeError("Cliente BigQuery no inicializado")
@@ -87,11 +111,18 @@ class BigQueryService:
 
         logger.info(f"Ejecutando procedimiento BigQuery: {query}")
 
+        events: List[Dict[str, Any]] = []
+
+        def record(event: Dict[str, Any]) -> None:
+            events.append(event)
+            if on_event:
+                on_event(event)
+
         try:
-            # Ejecutar en un thread pool para no bloquear el event loop
-            job = await asyncio.get_event_loop().run_in_executor(
-                None, self._execute_query_sync, query
-            )
+            if preview_rows is None:
+                preview_rows = settings.PROCEDURE_PREVIEW_ROWS
+            job = await self._call(self._start_query, query)
+            rows = await self.wait_job(job, on_event=record, max_results=preview_rows)
 
             # Procesar resultados
             result = {
@@ -105,16 +136,16 @@ class BigQueryService:
                 "execution_time_ms": job.ended - job.started
                 if job.ended and job.started
                 else None,
+                "events": events,
             }
 
-            # Si hay resultados, incluirlos
-            if job.result().total_rows > 0:
-                rows = list(job.result())
-                result["results"] = [dict(row) for row in rows]
-                result["total_rows"] = len(rows)
+            # Incluir solo la muestra; el total viene de los metadatos del job
+            result["total_rows"] = rows.total_rows or 0
+            if result["total_rows"] > 0 and preview_rows > 0:
+                preview = await self._call(list, rows)
+                result["results"] = [dict(row) for row in preview[:preview_rows]]
             else:
                 result["results"] = []
-                result["total_rows"] = 0
 
             logger.info(f"Procedimiento ejecutado exitosamente. Job ID: {job.job_id}")
             return result
@@ -123,15 +154,21 @@ class BigQueryService:
             logger.error(f"Error ejecutando procedimiento {procedure_name}: {str(e)}")
             raise RuntimeError(f"Error en BigQuery: {str(e)}")
 
-    def _execute_query_sync(self, query: str) -> bigquery.QueryJob:
+    async def _call(self, func: Callable, *args: Any) -> Any:
+        """Ejecuta una llamada bloqueante corta a la API en el pool de BigQuery"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    def _start_query(self, query: str) -> bigquery.QueryJob:
         """
-        Ejecuta una consulta de forma síncrona
+        Inicia una consulta sin esperar a que termine
 
         Args:
             query: Query SQL a ejecutar
 
         Returns:
-            QueryJob con el resultado
+            QueryJob en ejecución
         """
         job_config = bigquery.QueryJobConfig()
         job_config.use_legacy_sql = False
@@ -139,44 +176,180 @@ class BigQueryService:
         # Configurar timeout
         job_config.job_timeout_ms = settings.PROCEDURE_TIMEOUT * 1000
 
-        query_job = self.client.query(query, job_config=job_config)
+        return self.client.query(query, job_config=job_config)
 
-        # Esperar a que termine
-        query_job.result()
+    async def run_query(
+        self, query: str, max_results: Optional[int] = None
+    ) -> bigquery.table.RowIterator:
+        """
+        Ejecuta una consulta y espera su resultado sin bloquear hilos
 
-        return query_job
+        Args:
+            query: Query SQL a ejecutar
+            max_results: Máximo de filas a recorrer (None = todas)
 
-    async def validate_procedure_exists(
-        self, procedure_name: str, environment: str
-    ) -> bool:
+        Returns:
+            Filas del resultado
         """
-        Valida si un procedimiento existe en BigQuery
+        job = await self._call(self._start_query, query)
+        return await self.wait_job(job, max_results=max_results)
+
+    async def wait_job(
+        self,
+        job: bigquery.QueryJob,
+        on_event: Optional[JobEventCallback] = None,
+        timeout: Optional[float] = None,
+        max_results: Optional[int] = None,
+    ) -> bigquery.table.RowIterator:
+        """
+        Espera a que termine un job consultando su estado con espera creciente
+
+        Cada consulta es un ``job.reload()`` corto; entre consultas se espera
+        en el event loop desde BIGQUERY_POLL_INITIAL_SECONDS hasta
+        BIGQUERY_POLL_MAX_SECONDS. Si se excede el timeout o la espera se
+        cancela, el job se cancela para que no siga consumiendo slots.
+
+        Args:
+            job: Job en ejecución
+            on_event: Función llamada con cada cambio de estado del job
+                (job_id, state, timestamp, elapsed_seconds)
+            timeout: Tiempo máximo en segundos (None = PROCEDURE_TIMEOUT)
+            max_results: Máximo de filas a recorrer (None = todas); con un
+                valor pequeño se descarga una sola página
+
+        Returns:
+            Filas del resultado del job (``total_rows`` tiene el total)
+
+        Raises:
+            TimeoutError: Si el job no termina a tiempo (queda cancelado)
+        """
+        loop = asyncio.get_running_loop()
+        timeout = settings.PROCEDURE_TIMEOUT if timeout is None else timeout
+        start = loop.time()
+        delay = settings.BIGQUERY_POLL_INITIAL_SECONDS
+        state = None
+        try:
+            while True:
+                if job.state != state:
+                    state = job.state
+                    logger.debug(f"Job {job.job_id}: {state}")
+                    if on_event:
+                        on_event(
+                            {
+                                "job_id": job.job_id,
+                                "state": state,
+                                "timestamp": datetime.now().isoformat(),
+                                "elapsed_seconds": round(loop.time() - start, 3),
+                            }
+                        )
+                if state == "DONE":
+                    break
+                remaining = timeout - (loop.time() - start)
+                if remaining <= 0:
+                    await self.cancel_job(job)
+                    raise TimeoutError(
+                        f"El job {job.job_id} excedió el timeout de "
+                        f"{timeout}s y fue cancelado"
+                    )
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, settings.BIGQUERY_POLL_MAX_SECONDS)
+                await self._call(job.reload)
+        except asyncio.CancelledError:
+            await self.cancel_job(job)
+            raise
+
+        # El job terminó: result() no espera, solo reporta el error si lo hubo
+        return await self._call(partial(job.result, max_results=max_results))
+
+    async def cancel_job(self, job: bigquery.QueryJob) -> None:
+        """
+        Solicita la cancelación de un job en BigQuery
+
+        Args:
+            job: Job a cancelar
+        """
+        try:
+            await self._call(job.cancel)
+            logger.warning(f"Job {job.job_id} cancelado")
+        except Exception as e:
+            logger.error(f"No se pudo cancelar el job {job.job_id}: {str(e)}")
+
+    async def get_routines(
+        self, environment: str, refresh: bool = False
+    ) -> Dict[str, str]:
+        """
+        Catálogo de rutinas del dataset de un entorno, desde la caché
+
+        Una sola consulta a ``INFORMATION_SCHEMA.ROUTINES`` llena la caché del
+        entorno; las llamadas concurrentes esperan esa misma consulta. Los
+        errores no se guardan en caché.
 
         Args:
-            procedure_name: Nombre del procedimiento
             environment: Entorno (dev/prd)
+            refresh: Consultar BigQuery aunque la caché siga vigente
 
         Returns:
-            True si existe, False si no
+            Diccionario {routine_name: routine_type}
+
+        Raises:
+            RuntimeError: Si el cliente no está inicializado
         """
         if not self.client:
-            return False
+            raise RuntimeError("Cliente BigQuery no inicializado")
+
+        lock = self._routines_locks.setdefault(environment, asyncio.Lock())
+        async with lock:
+            cached = self._routines.get(environment)
+            ttl = settings.ROUTINE_CACHE_TTL_SECONDS
+            if cached and not refresh and time.monotonic() - cached[0] < ttl:
+                return cached[1]
 
-        try:
             dataset = "staging"
 
-            # Consultar información del procedimiento
             query = f"""
-            SELECT routine_name 
+            SELECT routine_name, routine_type
             FROM `onus-{environment}-proy-retail-elastici.{dataset}.INFORMATION_SCHEMA.ROUTINES`
-            WHERE routine_name = '{procedure_name}'
             """
 
-            job = await asyncio.get_event_loop().run_in_executor(
-                None, self._execute_query_sync, query
-            )
+            rows = await self.run_query(query)
+            routines = {
+                row.routine_name: row.routine_type
+                for row in await self._call(list, rows)
+            }
+            self._routines[environment] = (time.monotonic(), routines)
+            logger.debug(f"Catálogo de rutinas {environment}: {len(routines)} rutinas")
+            return routines
+
+    def invalidate_routines(self, environment: Optional[str] = None) -> None:
+        """
+        Descarta el catálogo de rutinas en caché
+
+        Args:
+            environment: Entorno a descartar (None = todos)
+        """
+        if environment is None:
+            self._routines.clear()
+        else:
+            self._routines.pop(environment, None)
+
+    async def validate_procedure_exists(
+        self, procedure_name: str, environment: str
+    ) -> bool:
+        """
+        Valida si un procedimiento existe en BigQuery (desde el catálogo en caché)
 
-            return job.result().total_rows > 0
+        Args:
+            procedure_name: Nombre del procedimiento
+            environment: Entorno (dev/prd)
+
+        Returns:
+            True si existe, False si no
+        """
+        if not self.client:
+            return False
+
+        try:
+            return procedure_name in await self.get_routines(environment)
 
         except Exception as e:
             logger.warning(
@@ -186,7 +359,8 @@ class BigQueryService:
 
     async def list_procedures(self, environment: str) -> List[str]:
         """
-        Lista todos los procedimientos disponibles en un dataset
+        Lista todos los procedimientos disponibles en un dataset (desde el
+        catálogo en caché)
 
         Args:
             environment: Entorno (dev/prd)
@@ -198,21 +372,14 @@ class BigQueryService:
             return []
 
         try:
-            dataset = "staging"
+            routines = await self.get_routines(environment)
 
-            query = f"""
-            SELECT routine_name 
-            FROM `onus-{environment}-proy-retail-elastici.{dataset}.INFORMATION_SCHEMA.ROUTINES`
-            WHERE routine_type = 'PROCEDURE'
-            ORDER BY routine_name
-            """
-
-            job = await asyncio.get_event_loop().run_in_executor(
-                None, self._execute_query_sync, query
+            return sorted(
+                name
+                for name, routine_type in routines.items()
+                if routine_type == "PROCEDURE"
             )
 
-            return [row.routine_name for row in job.result()]
-
         except Exception as e:
             logger.error(f"Error listando procedimientos: {str(e)}")
             return []
@@ -0,0 +1,167 @@
+"""
+Checkpoints de los flujos para reanudarlos
+
+Por cada ``flow_id`` se guarda la definición del flujo (pasos, entorno y
+política de fallas) y el resultado de cada paso terminado. Al reanudar un
+flujo se reutilizan los resultados exitosos y solo se vuelven a ejecutar
+los pasos fallidos, omitidos o que no alcanzaron a terminar.
+"""
+
+import asyncio
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel, Field
+
+from ..models.flow import FailurePolicy, FlowStep, StepResult
+
+
+class FlowCheckpoint(BaseModel):
+    """Definición de un flujo y resultados de sus pasos terminados"""
+
+    flow_id: str
+    environment: str
+    on_failure: FailurePolicy = FailurePolicy.CONTINUE
+    steps: List[FlowStep]
+    metadata: Optional[Dict[str, Any]] = None
+    results: Dict[int, StepResult] = Field(
+        default_factory=dict, description="Último resultado de cada paso terminado"
+    )
+
+
+class CheckpointStore(ABC):
+    """Interfaz para guardar los checkpoints de los flujos"""
+
+    @abstractmethod
+    async def save_definition(self, checkpoint: FlowCheckpoint) -> None:
+        """
+        Guarda la definición del flujo (los resultados se guardan por paso)
+
+        Args:
+            checkpoint: Checkpoint con la definición del flujo
+        """
+
+    @abstractmethod
+    async def save_step(self, flow_id: str, result: StepResult) -> None:
+        """
+        Guarda el resultado de un paso terminado (reemplaza el anterior)
+
+        Args:
+            flow_id: ID del flujo
+            result: Resultado del paso (success, error o skipped)
+        """
+
+    @abstractmethod
+    async def load(self, flow_id: str) -> Optional[FlowCheckpoint]:
+        """
+        Obtiene el checkpoint de un flujo
+
+        Args:
+            flow_id: ID del flujo
+
+        Returns:
+            FlowCheckpoint o None si el flujo no tiene checkpoint
+        """
+
+
+class InMemoryCheckpointStore(CheckpointStore):
+    """Checkpoints en memoria (se pierden al reiniciar la instancia)"""
+
+    def __init__(self):
+        self._checkpoints: Dict[str, FlowCheckpoint] = {}
+
+    async def save_definition(self, checkpoint: FlowCheckpoint) -> None:
+        actual = self._checkpoints.get(checkpoint.flow_id)
+        results = actual.results if actual else {}
+        self._checkpoints[checkpoint.flow_id] = checkpoint.model_copy(
+            deep=True, update={"results": results}
+        )
+
+    async def save_step(self, flow_id: str, result: StepResult) -> None:
+        checkpoint = self._checkpoints.get(flow_id)
+        if checkpoint is not None:
+            checkpoint.results[result.step] = result.model_copy(deep=True)
+
+    async def load(self, flow_id: str) -> Optional[FlowCheckpoint]:
+        checkpoint = self._checkpoints.get(flow_id)
+        return checkpoint.model_copy(deep=True) if checkpoint else None
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """
+    Checkpoints en un archivo SQLite local
+
+    Sirve para pruebas y para instancias con disco persistente; las
+    operaciones se ejecutan en un hilo para no bloquear el event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS flow_checkpoints ("
+                "flow_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS flow_checkpoint_steps ("
+                "flow_id TEXT NOT NULL, step INTEGER NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (flow_id, step))"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Conexión que confirma la transacción y se cierra al salir"""
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _save_definition(self, checkpoint: FlowCheckpoint) -> None:
+        data = checkpoint.model_dump_json(exclude={"results"})
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO flow_checkpoints (flow_id, data) VALUES (?, ?) "
+                "ON CONFLICT (flow_id) DO UPDATE SET data = excluded.data",
+                (checkpoint.flow_id, data),
+            )
+
+    def _save_step(self, flow_id: str, result: StepResult) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO flow_checkpoint_steps (flow_id, step, data) "
+                "VALUES (?, ?, ?) "
+                "ON CONFLICT (flow_id, step) DO UPDATE SET data = excluded.data",
+                (flow_id, result.step, result.model_dump_json()),
+            )
+
+    def _load(self, flow_id: str) -> Optional[FlowCheckpoint]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM flow_checkpoints WHERE flow_id = ?", (flow_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            steps = conn.execute(
+                "SELECT data FROM flow_checkpoint_steps WHERE flow_id = ? "
+                "ORDER BY step",
+                (flow_id,),
+            ).fetchall()
+        results = [StepResult.model_validate_json(data) for (data,) in steps]
+        checkpoint = FlowCheckpoint.model_validate_json(row[0])
+        checkpoint.results = {result.step: result for result in results}
+        return checkpoint
+
+    async def save_definition(self, checkpoint: FlowCheckpoint) -> None:
+        await asyncio.to_thread(self._save_definition, checkpoint)
+
+    async def save_step(self, flow_id: str, result: StepResult) -> None:
+        await asyncio.to_thread(self._save_step, flow_id, result)
+
+    async def load(self, flow_id: str) -> Optional[FlowCheckpoint]:
+        return await asyncio.to_thread(self._load, flow_id)
@@ -3,17 +3,42 @@ Ejecutor de flujos - Maneja la ejecución de scripts y procedimientos
 """
 
 import asyncio
+import codecs
+import contextlib
+import json
 import os
+import signal
+import tempfile
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 from loguru import logger
 
 from ..config import settings
-from ..models.flow import FlowStep, FlowResponse, StepResult, StepType
+from ..models.flow import (
+    FailurePolicy,
+    FlowStep,
+    FlowResponse,
+    ScriptExecutionMode,
+    StepResult,
+    StepType,
+    find_cycle,
+    resolve_dependencies,
+)
 from .bigquery_service import bigquery_service
+from .checkpoint_store import CheckpointStore
+from .flow_store import FlowStore
+from .script_output import OutputBuffer
+from .script_worker import ScriptWorkerPool
+
+# Variable con la ruta donde el script escribe sus métricas en JSON
+# (ver ``app.processing.step_metrics``)
+RESULT_FILE_ENV = "FLOW_RESULT_FILE"
+RESULT_FILE_MAX_BYTES = 1024 * 1024
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
 
 
 class FlowExecutor:
@@ -22,45 +47,167 @@ class FlowExecutor:
     def __init__(self):
         self.scripts_path = Path(settings.SCRIPTS_PATH)
         self.scripts_path.mkdir(exist_ok=True, parents=True)
+        self.worker_pool: Optional[ScriptWorkerPool] = None
+
+    def create_flow(
+        self,
+        flow_steps: List[FlowStep],
+        environment: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> FlowResponse:
+        """
+        Crea el estado inicial de un flujo con todos sus pasos pendientes
+
+        Args:
+            flow_steps: Lista de pasos a ejecutar
+            environment: Entorno de ejecución (dev/prd)
+            metadata: Metadatos del flujo
+
+        Returns:
+            FlowResponse: Flujo en estado "running"
+        """
+        return FlowResponse(
+            flow_id=str(uuid.uuid4()),
+            environment=environment,
+            status="running",
+            start_time=datetime.now(),
+            total_steps=len(flow_steps),
+            successful_steps=0,
+            failed_steps=0,
+            results=[
+                StepResult(
+                    step=step.step, type=step.type, name=step.name, status="pending"
+                )
+                for step in sorted(flow_steps, key=lambda x: x.step)
+            ],
+            metadata=metadata,
+        )
 
     async def execute_flow(
-        self, flow_steps: List[FlowStep], environment: str
+        self,
+        flow_steps: List[FlowStep],
+        environment: str,
+        flow: Optional[FlowResponse] = None,
+        store: Optional[FlowStore] = None,
+        max_concurrency: Optional[int] = None,
+        on_failure: FailurePolicy = FailurePolicy.CONTINUE,
+        checkpoints: Optional[CheckpointStore] = None,
+        completed: Optional[Dict[int, StepResult]] = None,
     ) -> FlowResponse:
         """
         Ejecuta un flujo completo de pasos
 
+        Los pasos se programan según sus dependencias (``depends_on``): cada
+        paso inicia cuando terminan los pasos de los que depende, hasta
+        ``max_concurrency`` pasos a la vez. Sin dependencias declaradas cada
+        paso depende del anterior y la ejecución es secuencial.
+
+        Cuando un paso falla se aplica su política (``FlowStep.on_failure``)
+        o la del flujo: ``continue`` sigue con los demás pasos, ``stop`` no
+        inicia más pasos y ``skip_dependents`` omite los pasos que dependen
+        (directa o indirectamente) del paso fallido. Los pasos omitidos
+        quedan con estado "skipped" sin ejecutarse.
+
         Args:
             flow_steps: Lista de pasos a ejecutar
             environment: Entorno de ejecución (dev/prd)
+            flow: Estado inicial creado con ``create_flow`` (None = crear uno)
+            store: Almacenamiento donde publicar el avance de cada paso
+            max_concurrency: Pasos simultáneos (None = FLOW_MAX_CONCURRENCY)
+            on_failure: Política del flujo para los pasos que no definen una
+            checkpoints: Almacenamiento de checkpoints donde guardar cada paso
+                terminado (para reanudar el flujo)
+            completed: Resultados de pasos que no se vuelven a ejecutar al
+                reanudar un flujo; cuentan como terminados para sus dependientes
 
         Returns:
             FlowResponse: Resultado de la ejecución
+
+        Raises:
+            ValueError: Si las dependencias son inválidas o forman un ciclo
         """
-        flow_id = str(uuid.uuid4())
-        start_time = datetime.now()
+        dependencies = resolve_dependencies(flow_steps)
+        cycle = find_cycle(dependencies)
+        if cycle:
+            raise ValueError(
+                f"Ciclo de dependencias entre pasos: {' -> '.join(map(str, cycle))}"
+            )
+        max_concurrency = max(1, max_concurrency or settings.FLOW_MAX_CONCURRENCY)
+
+        if flow is None:
+            flow = self.create_flow(flow_steps, environment)
+        flow_id = flow.flow_id
+        start_time = flow.start_time
 
         logger.info(f"Iniciando flujo {flow_id} en entorno {environment}")
 
-        results: List[StepResult] = []
-        successful_steps = 0
+        results: Dict[int, StepResult] = dict(completed or {})
+        successful_steps = len(results)
         failed_steps = 0
+        skipped_steps = 0
+        # Pasos fallidos u omitidos cuyos dependientes no deben ejecutarse
+        blocked: Dict[int, str] = {}
+
+        # Pasos pendientes en orden de número de paso
+        pending = sorted(
+            (step for step in flow_steps if step.step not in results),
+            key=lambda x: x.step,
+        )
+        running: Dict[asyncio.Task, FlowStep] = {}
 
-        # Ordenar pasos por número de paso
-        sorted_steps = sorted(flow_steps, key=lambda x: x.step)
-
-        for step in sorted_steps:
-            logger.info(f"Ejecutando paso {step.step}: {step.name} ({step.type})")
-
-            step_result = await self._execute_step(step, environment)
-            results.append(step_result)
-
-            if step_result.status == "success":
-                successful_steps += 1
-            elif step_result.status == "error":
-                failed_steps += 1
-                # Si un paso falla, decidir si continuar o parar
-                # Por ahora, continuamos ejecutando los siguientes pasos
-                logger.warning(f"Paso {step.step} falló, pero continuando con el flujo")
+        try:
+            while pending or running:
+                # Iniciar los pasos cuyas dependencias ya terminaron
+                for step in list(pending):
+                    if len(running) >= max_concurrency:
+                        break
+                    if all(d in results for d in dependencies[step.step]):
+                        pending.remove(step)
+                        task = asyncio.create_task(
+                            self._run_step(
+                                step, environment, flow_id, store, checkpoints
+                            )
+                        )
+                        running[task] = step
+
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    step = running.pop(task)
+                    step_result = task.result()
+                    results[step.step] = step_result
+
+                    if step_result.status == "success":
+                        successful_steps += 1
+                    elif step_result.status == "error":
+                        failed_steps += 1
+                        self._apply_failure_policy(
+                            step, step.on_failure or on_failure, pending, blocked
+                        )
+
+                # Omitir los pendientes detenidos o que dependen de un paso bloqueado
+                for skipped in self._pending_to_skip(pending, dependencies, blocked):
+                    pending.remove(skipped)
+                    step_result = StepResult(
+                        step=skipped.step,
+                        type=skipped.type,
+                        name=skipped.name,
+                        status="skipped",
+                        output=blocked[skipped.step],
+                    )
+                    results[skipped.step] = step_result
+                    skipped_steps += 1
+                    if store:
+                        await store.save_step(flow_id, step_result)
+                    if checkpoints:
+                        await checkpoints.save_step(flow_id, step_result)
+        finally:
+            # Si el flujo se cancela, cancelar también los pasos en curso
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
 
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
@@ -76,32 +223,205 @@ class FlowExecutor:
         # Crear resumen de errores si los hay
         error_summary = None
         if failed_steps > 0:
-            errors = [r.error for r in results if r.error]
+            errors = [r.error for r in results.values() if r.error]
             error_summary = f"{failed_steps} pasos fallaron: {'; '.join(errors)}"
+            if skipped_steps:
+                error_summary += f" ({skipped_steps} pasos omitidos)"
 
         logger.info(f"Flujo {flow_id} completado con estado: {status}")
 
-        return FlowResponse(
-            flow_id=flow_id,
-            environment=environment,
-            status=status,
-            start_time=start_time,
-            end_time=end_time,
-            duration_seconds=duration,
-            total_steps=len(flow_steps),
-            successful_steps=successful_steps,
-            failed_steps=failed_steps,
-            results=results,
-            error_summary=error_summary,
+        result = flow.model_copy(
+            update={
+                "status": status,
+                "end_time": end_time,
+                "duration_seconds": duration,
+                "successful_steps": successful_steps,
+                "failed_steps": failed_steps,
+                "skipped_steps": skipped_steps,
+                "results": [results[step] for step in sorted(results)],
+                "error_summary": error_summary,
+            }
+        )
+        if store:
+            await store.save_flow(result)
+        return result
+
+    @staticmethod
+    def _apply_failure_policy(
+        step: FlowStep,
+        policy: FailurePolicy,
+        pending: List[FlowStep],
+        blocked: Dict[int, str],
+    ) -> None:
+        """
+        Bloquea los pasos que no deben ejecutarse tras la falla de un paso
+
+        Args:
+            step: Paso que falló
+            policy: Política a aplicar
+            pending: Pasos pendientes
+            blocked: {paso: motivo} de los pasos bloqueados (se actualiza)
+        """
+        if policy == FailurePolicy.STOP:
+            logger.warning(f"Paso {step.step} falló, deteniendo el flujo")
+            reason = f"Flujo detenido por la falla del paso {step.step}"
+            blocked.update({p.step: reason for p in pending})
+        elif policy == FailurePolicy.SKIP_DEPENDENTS:
+            logger.warning(f"Paso {step.step} falló, omitiendo sus dependientes")
+            blocked[step.step] = f"Depende del paso {step.step} que falló"
+        else:
+            logger.warning(f"Paso {step.step} falló, pero continuando con el flujo")
+
+    @staticmethod
+    def _pending_to_skip(
+        pending: List[FlowStep],
+        dependencies: Dict[int, List[int]],
+        blocked: Dict[int, str],
+    ) -> List[FlowStep]:
+        """
+        Obtiene los pasos pendientes que ya no deben ejecutarse
+
+        Un paso se omite si quedó bloqueado (flujo detenido) o si depende de
+        un paso bloqueado; la omisión se propaga a sus propios dependientes.
+
+        Args:
+            pending: Pasos pendientes
+            dependencies: Dependencias de cada paso
+            blocked: {paso: motivo} de los pasos bloqueados; se actualiza con
+                el motivo de cada paso omitido
+
+        Returns:
+            Pasos pendientes a omitir, en orden de número de paso
+        """
+        to_skip = {step.step for step in pending if step.step in blocked}
+        changed = True
+        while changed:
+            changed = False
+            for step in pending:
+                if step.step in to_skip:
+                    continue
+                origin = next(
+                    (d for d in dependencies[step.step] if d in blocked), None
+                )
+                if origin is not None:
+                    blocked[step.step] = blocked[origin]
+                    to_skip.add(step.step)
+                    changed = True
+        return [step for step in pending if step.step in to_skip]
+
+    async def _run_step(
+        self,
+        step: FlowStep,
+        environment: str,
+        flow_id: str,
+        store: Optional[FlowStore] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+    ) -> StepResult:
+        """
+        Ejecuta un paso publicando su avance en el almacenamiento
+
+        Args:
+            step: Paso a ejecutar
+            environment: Entorno de ejecución
+            flow_id: ID del flujo
+            store: Almacenamiento donde publicar el avance (opcional)
+            checkpoints: Almacenamiento de checkpoints (opcional)
+
+        Returns:
+            StepResult: Resultado del paso
+        """
+        logger.info(f"Ejecutando paso {step.step}: {step.name} ({step.type})")
+
+        running = StepResult(
+            step=step.step,
+            type=step.type,
+            name=step.name,
+            status="running",
+            start_time=datetime.now(),
+        )
+        output = OutputBuffer(
+            settings.SCRIPT_OUTPUT_MAX_CHARS,
+            on_line=lambda line: logger.info(f"[paso {step.step}] {line}"),
         )
+        progress = None
+        if store:
+            await store.save_step(flow_id, running)
+            progress = asyncio.create_task(
+                self._publish_progress(flow_id, store, running, output)
+            )
+
+        try:
+            step_result = await self._execute_step(step, environment, output)
+        except asyncio.CancelledError:
+            # Se registra el paso como cancelado antes de propagar la cancelación
+            end_time = datetime.now()
+            cancelled = running.model_copy(
+                update={
+                    "status": "cancelled",
+                    "end_time": end_time,
+                    "duration_seconds": (end_time - running.start_time).total_seconds(),
+                    "output": output.text() or None,
+                    "error": "Paso cancelado",
+                }
+            )
+            if store:
+                await store.save_step(flow_id, cancelled)
+            if checkpoints:
+                await checkpoints.save_step(flow_id, cancelled)
+            raise
+        finally:
+            if progress:
+                progress.cancel()
+                await asyncio.gather(progress, return_exceptions=True)
+        if store:
+            await store.save_step(flow_id, step_result)
+        if checkpoints:
+            await checkpoints.save_step(flow_id, step_result)
+        return step_result
+
+    @staticmethod
+    async def _publish_progress(
+        flow_id: str, store: FlowStore, running: StepResult, output: OutputBuffer
+    ) -> None:
+        """
+        Publica periódicamente la salida parcial de un paso en ejecución
 
-    async def _execute_step(self, step: FlowStep, environment: str) -> StepResult:
+        Args:
+            flow_id: ID del flujo
+            store: Almacenamiento donde publicar el avance
+            running: Resultado del paso en estado "running"
+            output: Buffer con la salida del paso
+        """
+        published = 0
+        while True:
+            await asyncio.sleep(settings.FLOW_PROGRESS_INTERVAL)
+            if output.lines == published:
+                continue
+            published = output.lines
+            await store.save_step(
+                flow_id,
+                running.model_copy(
+                    update={
+                        "output": output.text(),
+                        "metadata": {"output_lines": published},
+                    }
+                ),
+            )
+
+    async def _execute_step(
+        self,
+        step: FlowStep,
+        environment: str,
+        output: Optional[OutputBuffer] = None,
+    ) -> StepResult:
         """
         Ejecuta un paso individual del flujo
 
         Args:
             step: Paso a ejecutar
             environment: Entorno de ejecución
+            output: Buffer donde se acumula la salida de los scripts línea por
+                línea (None = uno nuevo)
 
         Returns:
             StepResult: Resultado del paso
@@ -116,15 +436,20 @@ class FlowExecutor:
             start_time=start_time,
         )
 
+        if output is None:
+            output = OutputBuffer(settings.SCRIPT_OUTPUT_MAX_CHARS)
+        metadata: Dict[str, Any] = {}
         try:
             if step.type == StepType.SCRIPT:
-                output = await self._execute_script(step, environment)
-                step_result.output = output
+                step_result.output = await self._execute_script(
+                    step, environment, metadata, output
+                )
                 step_result.status = "success"
 
             elif step.type == StepType.PROCEDURE:
-                output = await self._execute_procedure(step, environment)
-                step_result.output = output
+                step_result.output = await self._execute_procedure(
+                    step, environment, metadata, output
+                )
                 step_result.status = "success"
 
             else:
@@ -133,73 +458,321 @@ class FlowExecutor:
         except Exception as e:
             logger.error(f"Error ejecutando paso {step.step}: {str(e)}")
             step_result.status = "error"
+            step_result.error = str(e)
+            if output.lines:
+                # Salida parcial del script hasta la falla
+                step_result.output = output.text()
 
         end_time = datetime.now()
         step_result.end_time = end_time
         step_result.duration_seconds = (end_time - start_time).total_seconds()
+        step_result.metadata = metadata or None
 
         return step_result
 
-    async def _execute_script(self, step: FlowStep, environment: str) -> str:
+    @staticmethod
+    def _script_args(step: FlowStep) -> List[str]:
+        """Convierte los parámetros del paso en argumentos --clave valor"""
+        args = []
+        for key, value in (step.parameters or {}).items():
+            args.extend([f"--{key}", str(value)])
+        return args
+
+    async def _get_worker_pool(self) -> ScriptWorkerPool:
+        """Obtiene (y arranca la primera vez) el grupo de workers de scripts"""
+        if self.worker_pool is None:
+            self.worker_pool = ScriptWorkerPool(size=settings.SCRIPT_WORKERS)
+        await self.worker_pool.start()
+        return self.worker_pool
+
+    async def _execute_script(
+        self,
+        step: FlowStep,
+        environment: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        output: Optional[OutputBuffer] = None,
+    ) -> str:
         """
         Ejecuta un script de Python
 
+        En modo "worker" el script corre en un proceso persistente con las
+        librerías precargadas; si los workers no están disponibles se usa un
+        subproceso nuevo, como en el modo "subprocess".
+
+        La salida se lee línea por línea mientras el script corre y se
+        conserva solo el inicio y el final (``SCRIPT_OUTPUT_MAX_CHARS``), así
+        la memoria no depende de cuánto imprima el script.
+
+        El script recibe en ``FLOW_RESULT_FILE`` la ruta de un archivo donde
+        puede escribir sus métricas en JSON (ver ``MetricasPaso``); esas
+        métricas se agregan a ``metadata``.
+
         Args:
             step: Paso con información del script
             environment: Entorno de ejecución
+            metadata: Diccionario donde registrar el modo de ejecución y sus
+                tiempos (opcional)
+            output: Buffer donde acumular la salida estándar (opcional)
 
         Returns:
-            str: Output del script
+            str: Output del script (inicio y final si es muy extensa)
         """
         script_path = self.scripts_path / environment / step.name
 
         if not script_path.exists():
             raise FileNotFoundError(f"Script no encontrado: {script_path}")
 
-        # Preparar comando
-        cmd = ["python", str(script_path)]
+        args = self._script_args(step)
+        timeout = step.timeout or settings.SCRIPT_TIMEOUT
+        metadata = {} if metadata is None else metadata
+        if output is None:
+            output = OutputBuffer(settings.SCRIPT_OUTPUT_MAX_CHARS)
+        errors = OutputBuffer(
+            settings.SCRIPT_OUTPUT_MAX_CHARS,
+            on_line=lambda line: logger.warning(f"[paso {step.step}] {line}"),
+        )
 
-        # Agregar parámetros si los hay
-        if step.parameters:
-            for key, value in step.parameters.items():
-                cmd.extend([f"--{key}", str(value)])
+        mode = step.execution or ScriptExecutionMode(settings.SCRIPT_EXECUTION_MODE)
+        pool = None
+        if mode == ScriptExecutionMode.WORKER:
+            try:
+                pool = await self._get_worker_pool()
+            except Exception as e:
+                logger.warning(
+                    f"Workers de scripts no disponibles, usando subproceso: {e}"
+                )
+
+        # Archivo donde el script puede dejar sus métricas en JSON
+        fd, result_file = tempfile.mkstemp(prefix="flow-result-", suffix=".json")
+        os.close(fd)
+        env = {RESULT_FILE_ENV: result_file}
+        try:
+            if pool is not None:
+                returncode, run_metadata = await self._execute_script_worker(
+                    pool,
+                    step,
+                    str(script_path),
+                    args,
+                    environment,
+                    timeout,
+                    output,
+                    errors,
+                    env,
+                )
+            else:
+                returncode, run_metadata = await self._execute_script_subprocess(
+                    step,
+                    str(script_path),
+                    args,
+                    environment,
+                    timeout,
+                    output,
+                    errors,
+                    env,
+                )
+            script_metrics = self._read_result_file(result_file, step)
+        finally:
+            os.unlink(result_file)
+        output.close()
+        errors.close()
+        metadata.update(script_metrics)
+        metadata.update(run_metadata, output_lines=output.lines)
+        if output.omitted_lines:
+            metadata["omitted_output_lines"] = output.omitted_lines
+        if returncode != 0:
+            error_msg = errors.text() or "Error desconocido"
+            raise RuntimeError(f"Script falló con código {returncode}: {error_msg}")
+        return output.text()
+
+    async def _execute_script_worker(
+        self,
+        pool: ScriptWorkerPool,
+        step: FlowStep,
+        script_path: str,
+        args: List[str],
+        environment: str,
+        timeout: float,
+        output: OutputBuffer,
+        errors: OutputBuffer,
+        env: Dict[str, str],
+    ) -> Tuple[int, Dict[str, Any]]:
+        """Ejecuta el script en el grupo de workers; devuelve código y metadatos"""
+        logger.debug(f"Ejecutando en worker: {script_path} {' '.join(args)}")
+        buffers = {"stdout": output, "stderr": errors}
+        try:
+            result = await pool.run(
+                script_path,
+                args,
+                environment,
+                timeout=timeout,
+                max_output_chars=settings.SCRIPT_OUTPUT_MAX_CHARS,
+                on_line=lambda name, line: buffers[name].feed(line + "\n"),
+                env=env,
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Script {step.name} excedió el timeout de {timeout}s")
 
-        # Configurar timeout
-        timeout = step.timeout or settings.SCRIPT_TIMEOUT
+        return result["returncode"], {
+            "execution_mode": ScriptExecutionMode.WORKER.value,
+            "overhead_seconds": round(result["overhead_seconds"], 4),
+        }
+
+    async def _execute_script_subprocess(
+        self,
+        step: FlowStep,
+        script_path: str,
+        args: List[str],
+        environment: str,
+        timeout: float,
+        output: OutputBuffer,
+        errors: OutputBuffer,
+        env: Dict[str, str],
+    ) -> Tuple[int, Dict[str, Any]]:
+        """Ejecuta el script en un subproceso nuevo; devuelve código y metadatos"""
+        cmd = ["python", script_path, *args]
 
         logger.debug(f"Ejecutando comando: {' '.join(cmd)}")
 
         # Ejecutar script
+        start = time.perf_counter()
         process = await asyncio.create_subprocess_exec(
             *cmd,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
-            env={**dict(os.environ), "ENVIRONMENT": environment},
+            env={
+                **dict(os.environ),
+                **env,
+                "ENVIRONMENT": environment,
+                # Los scripts importan ``app.*`` (p. ej. las métricas del paso)
+                "PYTHONPATH": os.pathsep.join(
+                    filter(None, [str(PROJECT_ROOT), os.environ.get("PYTHONPATH")])
+                ),
+            },
+            # Grupo de procesos propio para terminar también los procesos hijos
+            start_new_session=os.name == "posix",
         )
 
         try:
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(), timeout=timeout
+            await asyncio.wait_for(
+                asyncio.gather(
+                    self._read_stream(process.stdout, output),
+                    self._read_stream(process.stderr, errors),
+                    process.wait(),
+                ),
+                timeout=timeout,
             )
         except asyncio.TimeoutError:
-            process.kill()
+            await self._terminate_process(process)
             raise TimeoutError(f"Script {step.name} excedió el timeout de {timeout}s")
+        except asyncio.CancelledError:
+            # El flujo se canceló: no dejar el script ni sus hijos huérfanos
+            await self._terminate_process(process)
+            raise
+
+        return process.returncode, {
+            "execution_mode": ScriptExecutionMode.SUBPROCESS.value,
+            "process_seconds": round(time.perf_counter() - start, 4),
+        }
+
+    @staticmethod
+    async def _terminate_process(process: asyncio.subprocess.Process) -> None:
+        """
+        Termina el script y sus procesos hijos
 
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Error desconocido"
-            raise RuntimeError(
-                f"Script falló con código {process.returncode}: {error_msg}"
-            )
+        Envía SIGTERM al grupo de procesos del script y, si no termina en
+        SCRIPT_KILL_GRACE segundos, SIGKILL. Espera a que el proceso termine
+        para no dejar procesos zombie.
 
-        return stdout.decode()
+        Args:
+            process: Proceso del script (iniciado en su propio grupo)
+        """
+
+        def send(sig: int) -> None:
+            with contextlib.suppress(ProcessLookupError):
+                if os.name == "posix":
+                    os.killpg(process.pid, sig)
+                elif sig == signal.SIGTERM:
+                    process.terminate()
+                else:
+                    process.kill()
+
+        send(signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), timeout=settings.SCRIPT_KILL_GRACE)
+        except asyncio.TimeoutError:
+            logger.warning(f"El script {process.pid} no terminó con SIGTERM")
+        # Hijos que ignoraron SIGTERM o siguen vivos tras salir el script
+        send(getattr(signal, "SIGKILL", signal.SIGTERM))
+        await process.wait()
 
-    async def _execute_procedure(self, step: FlowStep, environment: str) -> str:
+    @staticmethod
+    def _read_result_file(path: str, step: FlowStep) -> Dict[str, Any]:
+        """
+        Lee las métricas que el script escribió en su archivo de resultado
+
+        Args:
+            path: Ruta del archivo (vacío si el script no escribió métricas)
+            step: Paso que generó el archivo
+
+        Returns:
+            Métricas del script (p. ej. rows_read, rows_written,
+            phase_seconds, peak_memory_mb) o ``result_error`` si el archivo
+            no es un objeto JSON válido
+        """
+        size = os.path.getsize(path)
+        if size == 0:
+            return {}
+        if size > RESULT_FILE_MAX_BYTES:
+            error = f"archivo de resultado demasiado grande ({size} bytes)"
+        else:
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except ValueError as e:
+                error = f"archivo de resultado inválido: {e}"
+            else:
+                if isinstance(data, dict):
+                    return data
+                error = "el archivo de resultado no es un objeto JSON"
+        logger.warning(f"Paso {step.step} ({step.name}): {error}")
+        return {"result_error": error}
+
+    @staticmethod
+    async def _read_stream(stream: asyncio.StreamReader, buffer: OutputBuffer) -> None:
+        """Lee la salida de un subproceso por bloques y la pasa al buffer"""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            chunk = await stream.read(64 * 1024)
+            if not chunk:
+                break
+            buffer.feed(decoder.decode(chunk))
+        buffer.feed(decoder.decode(b"", final=True))
+
+    async def close(self) -> None:
+        """Detiene los workers de scripts (si se iniciaron)"""
+        if self.worker_pool is not None:
+            await self.worker_pool.shutdown()
+            self.worker_pool = None
+
+    async def _execute_procedure(
+        self,
+        step: FlowStep,
+        environment: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        output: Optional[OutputBuffer] = None,
+    ) -> str:
         """
         Ejecuta un stored procedure en BigQuery
 
+        Los cambios de estado del job (PENDING, RUNNING, DONE) se escriben
+        como líneas en ``output`` mientras el paso corre, así aparecen en el
+        avance del flujo, y quedan en ``metadata["job_events"]``.
+
         Args:
             step: Paso con información del procedimiento
             environment: Entorno de ejecución
+            metadata: Diccionario donde registrar los eventos del job (opcional)
+            output: Buffer de salida del paso (opcional)
 
         Returns:
             str: Resultado del procedimiento
@@ -207,6 +780,15 @@ class FlowExecutor:
         logger.info(
             f"Ejecutando stored procedure en BigQuery: {step.name} en {environment}"
         )
+        metadata = {} if metadata is None else metadata
+
+        def on_event(event: Dict[str, Any]) -> None:
+            metadata.setdefault("job_events", []).append(event)
+            if output is not None:
+                output.feed(
+                    f"[{event['elapsed_seconds']:.1f}s] Job {event['job_id']}: "
+                    f"{event['state']}\n"
+                )
 
         try:
             # Ejecutar procedimiento usando el servicio de BigQuery
@@ -214,6 +796,8 @@ class FlowExecutor:
                 procedure_name=step.name,
                 environment=environment,
                 parameters=step.parameters,
+                on_event=on_event,
+                preview_rows=step.preview_rows,
             )
 
             # Formatear resultado para logging
@@ -228,11 +812,14 @@ class FlowExecutor:
 
             if result.get("total_rows", 0) > 0:
                 output_lines.append(f"Filas devueltas: {result['total_rows']}")
-                # Agregar primeras filas como muestra (máximo 5)
-                for i, row in enumerate(result.get("results", [])[:5]):
+                # Agregar las filas de muestra (preview_rows)
+                preview = result.get("results", [])
+                for i, row in enumerate(preview):
                     output_lines.append(f"  Fila {i + 1}: {row}")
-                if result["total_rows"] > 5:
-                    output_lines.append(f"  ... y {result['total_rows'] - 5} filas más")
+                if result["total_rows"] > len(preview):
+                    output_lines.append(
+                        f"  ... y {result['total_rows'] - len(preview)} filas más"
+                    )
 
             return "\n".join(output_lines)
 
@@ -264,6 +851,18 @@ class FlowExecutor:
                 except Exception as e:
                     errors.append(f"Paso {step_dict.get('step', '?')}: {str(e)}")
 
+            if not errors:
+                # Validar que las dependencias existan y no formen ciclos
+                try:
+                    cycle = find_cycle(resolve_dependencies(validated_steps))
+                    if cycle:
+                        errors.append(
+                            "Ciclo de dependencias entre pasos: "
+                            f"{' -> '.join(map(str, cycle))}"
+                        )
+                except ValueError as e:
+                    errors.append(str(e))
+
             if not errors:
                 # Validar que los scripts y procedimientos existen
                 for step in validated_steps:
@@ -0,0 +1,293 @@
+"""
+Ejecución de flujos en segundo plano
+
+Los endpoints de ejecución registran el flujo y responden de inmediato con
+su ``flow_id``; el flujo corre en una tarea de asyncio administrada por el
+``FlowRunner`` y su avance se consulta en el ``FlowStore``. Cada paso
+terminado queda en el ``CheckpointStore`` para poder reanudar el flujo.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from loguru import logger
+
+from ..models.flow import (
+    FailurePolicy,
+    FlowResponse,
+    FlowStep,
+    StepResult,
+    resolve_dependencies,
+)
+from .checkpoint_store import CheckpointStore, FlowCheckpoint, InMemoryCheckpointStore
+from .flow_executor import FlowExecutor
+from .flow_store import FlowStore, InMemoryFlowStore
+
+
+class FlowRunner:
+    """Administra las tareas de los flujos en ejecución"""
+
+    def __init__(
+        self,
+        executor: FlowExecutor,
+        store: Optional[FlowStore] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+    ):
+        self.executor = executor
+        self.store = store or InMemoryFlowStore()
+        self.checkpoints = checkpoints or InMemoryCheckpointStore()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Flujos cuya cancelación pidió un usuario (no un apagado de la API)
+        self._cancelling: Set[str] = set()
+
+    async def submit(
+        self,
+        flow_steps: List[FlowStep],
+        environment: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        on_failure: FailurePolicy = FailurePolicy.CONTINUE,
+    ) -> FlowResponse:
+        """
+        Registra un flujo y lo ejecuta en segundo plano
+
+        Args:
+            flow_steps: Lista de pasos a ejecutar
+            environment: Entorno de ejecución (dev/prd)
+            metadata: Metadatos del flujo
+            on_failure: Política del flujo cuando un paso falla
+
+        Returns:
+            FlowResponse: Estado inicial del flujo (pasos pendientes)
+        """
+        flow = self.executor.create_flow(flow_steps, environment, metadata)
+        await self.checkpoints.save_definition(
+            FlowCheckpoint(
+                flow_id=flow.flow_id,
+                environment=environment,
+                on_failure=on_failure,
+                steps=flow_steps,
+                metadata=metadata,
+            )
+        )
+        await self._start(flow, flow_steps, on_failure)
+
+        logger.info(f"Flujo {flow.flow_id} registrado en {environment}")
+        return flow
+
+    async def resume(
+        self, flow_id: str, include_downstream: bool = False
+    ) -> Optional[FlowResponse]:
+        """
+        Reanuda un flujo reutilizando los pasos que terminaron con éxito
+
+        Se vuelven a ejecutar los pasos fallidos, omitidos o que no
+        terminaron; el flujo conserva su flow_id.
+
+        Args:
+            flow_id: ID del flujo
+            include_downstream: Volver a ejecutar también los pasos exitosos
+                que dependen (directa o indirectamente) de un paso a reanudar
+
+        Returns:
+            FlowResponse: Estado inicial del flujo reanudado, o None si el
+            flujo no tiene checkpoint
+
+        Raises:
+            RuntimeError: Si el flujo sigue en ejecución
+            ValueError: Si no hay pasos por reanudar
+        """
+        if self.is_running(flow_id):
+            raise RuntimeError(f"El flujo {flow_id} sigue en ejecución")
+        checkpoint = await self.checkpoints.load(flow_id)
+        if checkpoint is None:
+            return None
+
+        completed = {
+            step: result
+            for step, result in checkpoint.results.items()
+            if result.status == "success"
+        }
+        if include_downstream:
+            dependencies = resolve_dependencies(checkpoint.steps)
+            changed = True
+            while changed:
+                changed = False
+                for step in list(completed):
+                    if any(d not in completed for d in dependencies[step]):
+                        del completed[step]
+                        changed = True
+        if len(completed) == len(checkpoint.steps):
+            raise ValueError(f"El flujo {flow_id} no tiene pasos por reanudar")
+
+        flow = self.executor.create_flow(
+            checkpoint.steps, checkpoint.environment, checkpoint.metadata
+        )
+        flow = flow.model_copy(
+            update={
+                "flow_id": flow_id,
+                "results": [completed.get(r.step, r) for r in flow.results],
+            }
+        )
+        await self._start(flow, checkpoint.steps, checkpoint.on_failure, completed)
+
+        logger.info(
+            f"Flujo {flow_id} reanudado: {len(checkpoint.steps) - len(completed)} "
+            f"pasos por ejecutar, {len(completed)} reutilizados"
+        )
+        return flow
+
+    async def _start(
+        self,
+        flow: FlowResponse,
+        flow_steps: List[FlowStep],
+        on_failure: FailurePolicy,
+        completed: Optional[Dict[int, StepResult]] = None,
+    ) -> None:
+        """Publica el estado inicial y lanza la tarea del flujo"""
+        await self.store.save_flow(flow)
+        task = asyncio.create_task(
+            self._run(flow, flow_steps, on_failure, completed),
+            name=f"flow-{flow.flow_id}",
+        )
+        self._tasks[flow.flow_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(flow.flow_id, None))
+
+    async def _run(
+        self,
+        flow: FlowResponse,
+        flow_steps: List[FlowStep],
+        on_failure: FailurePolicy,
+        completed: Optional[Dict[int, StepResult]] = None,
+    ) -> None:
+        """Ejecuta el flujo y registra el error si la ejecución se interrumpe"""
+        try:
+            await self.executor.execute_flow(
+                flow_steps,
+                flow.environment,
+                flow=flow,
+                store=self.store,
+                on_failure=on_failure,
+                checkpoints=self.checkpoints,
+                completed=completed,
+            )
+        except asyncio.CancelledError:
+            if flow.flow_id in self._cancelling:
+                self._cancelling.discard(flow.flow_id)
+                await self._mark_cancelled(flow)
+                return
+            await self._mark_failed(flow, "Ejecución interrumpida al detener la API")
+            raise
+        except Exception as e:
+            logger.error(f"Error ejecutando flujo {flow.flow_id}: {str(e)}")
+            await self._mark_failed(flow, f"Error en ejecución: {str(e)}")
+
+    async def _mark_failed(self, flow: FlowResponse, error_summary: str) -> None:
+        end_time = datetime.now()
+        actual = await self.store.get_flow(flow.flow_id) or flow
+        await self.store.save_flow(
+            actual.model_copy(
+                update={
+                    "status": "error",
+                    "end_time": end_time,
+                    "duration_seconds": (end_time - flow.start_time).total_seconds(),
+                    "error_summary": error_summary,
+                }
+            )
+        )
+
+    async def _mark_cancelled(self, flow: FlowResponse) -> None:
+        """Registra el flujo y sus pasos sin terminar como cancelados"""
+        end_time = datetime.now()
+        actual = await self.store.get_flow(flow.flow_id) or flow
+        results = [
+            (
+                r.model_copy(update={"status": "cancelled"})
+                if r.status in ("pending", "running")
+                else r
+            )
+            for r in actual.results
+        ]
+        for result, before in zip(results, actual.results):
+            if result is not before:
+                await self.store.save_step(flow.flow_id, result)
+        statuses = [r.status for r in results]
+        await self.store.save_flow(
+            actual.model_copy(
+                update={
+                    "status": "cancelled",
+                    "end_time": end_time,
+                    "duration_seconds": (end_time - flow.start_time).total_seconds(),
+                    "successful_steps": statuses.count("success"),
+                    "failed_steps": statuses.count("error"),
+                    "skipped_steps": statuses.count("skipped"),
+                    "results": results,
+                    "error_summary": (
+                        f"Flujo cancelado ({statuses.count('cancelled')} pasos "
+                        "cancelados)"
+                    ),
+                }
+            )
+        )
+        logger.warning(f"Flujo {flow.flow_id} cancelado")
+
+    async def cancel(self, flow_id: str) -> Optional[FlowResponse]:
+        """
+        Cancela un flujo en ejecución
+
+        Los scripts en curso se terminan junto con sus procesos hijos y los
+        jobs de BigQuery en curso se cancelan; los pasos sin terminar quedan
+        con estado "cancelled". Los pasos exitosos conservan su checkpoint,
+        por lo que el flujo se puede reanudar.
+
+        Args:
+            flow_id: ID del flujo
+
+        Returns:
+            FlowResponse: Estado final del flujo, o None si no existe
+
+        Raises:
+            RuntimeError: Si el flujo no está en ejecución en esta instancia
+        """
+        task = self._tasks.get(flow_id)
+        if task is None:
+            if await self.store.get_flow(flow_id) is None:
+                return None
+            raise RuntimeError(f"El flujo {flow_id} no está en ejecución")
+
+        self._cancelling.add(flow_id)
+        cancelled = task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        if flow_id in self._cancelling:
+            self._cancelling.discard(flow_id)
+            if cancelled:
+                # La tarea se canceló antes de empezar a ejecutar el flujo
+                await self._mark_cancelled(await self.store.get_flow(flow_id))
+        return await self.store.get_flow(flow_id)
+
+    def is_running(self, flow_id: str) -> bool:
+        """Indica si el flujo tiene una tarea en curso en esta instancia"""
+        return flow_id in self._tasks
+
+    async def wait(self, flow_id: str) -> None:
+        """Espera a que termine la tarea del flujo (si está en curso)"""
+        task = self._tasks.get(flow_id)
+        if task:
+            await asyncio.shield(task)
+
+    async def get_flow(self, flow_id: str) -> Optional[FlowResponse]:
+        """Estado actual del flujo (None si no existe)"""
+        return await self.store.get_flow(flow_id)
+
+    async def get_steps(self, flow_id: str) -> Optional[List[StepResult]]:
+        """Avance de los pasos del flujo (None si el flujo no existe)"""
+        return await self.store.get_steps(flow_id)
+
+    async def shutdown(self) -> None:
+        """Cancela los flujos en curso y espera a que registren su estado"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            logger.warning(f"Cancelando {len(tasks)} flujos en ejecución")
+            await asyncio.gather(*tasks, return_exceptions=True)
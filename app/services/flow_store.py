@@ -0,0 +1,226 @@
+"""
+Almacenamiento del estado de los flujos
+
+El ``FlowRunner`` ejecuta los flujos en segundo plano y publica aquí el
+estado general (``FlowResponse``) y el avance de cada paso (``StepResult``)
+para que los endpoints de consulta lo devuelvan mientras el flujo corre.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import text
+
+from ..models.flow import FlowResponse, StepResult
+
+if TYPE_CHECKING:
+    # El motor asíncrono de SQLAlchemy solo se necesita con FLOW_STORE="sql"
+    from ..utils.database import DatabaseManager
+
+
+class FlowStore(ABC):
+    """Interfaz para guardar y consultar el estado de los flujos"""
+
+    async def initialize(self) -> None:
+        """Prepara el almacenamiento (tablas, conexiones, ...)"""
+
+    @abstractmethod
+    async def save_flow(self, flow: FlowResponse) -> None:
+        """
+        Guarda (inserta o reemplaza) el estado general de un flujo
+
+        Args:
+            flow: Estado del flujo; sus ``results`` también se guardan
+        """
+
+    @abstractmethod
+    async def save_step(self, flow_id: str, result: StepResult) -> None:
+        """
+        Guarda (inserta o reemplaza) el resultado de un paso
+
+        Args:
+            flow_id: ID del flujo
+            result: Resultado actual del paso
+        """
+
+    @abstractmethod
+    async def get_flow(self, flow_id: str) -> Optional[FlowResponse]:
+        """
+        Obtiene el estado de un flujo con los resultados de sus pasos
+
+        Args:
+            flow_id: ID del flujo
+
+        Returns:
+            FlowResponse o None si el flujo no existe
+        """
+
+    @abstractmethod
+    async def get_steps(self, flow_id: str) -> Optional[List[StepResult]]:
+        """
+        Obtiene los resultados de los pasos de un flujo ordenados por paso
+
+        Args:
+            flow_id: ID del flujo
+
+        Returns:
+            Lista de StepResult o None si el flujo no existe
+        """
+
+
+class InMemoryFlowStore(FlowStore):
+    """Estado de los flujos en memoria (se pierde al reiniciar la instancia)"""
+
+    def __init__(self):
+        self._flows: Dict[str, FlowResponse] = {}
+        self._steps: Dict[str, Dict[int, StepResult]] = {}
+
+    async def save_flow(self, flow: FlowResponse) -> None:
+        self._flows[flow.flow_id] = flow.model_copy(deep=True, update={"results": []})
+        pasos = self._steps.setdefault(flow.flow_id, {})
+        for result in flow.results:
+            pasos[result.step] = result.model_copy(deep=True)
+
+    async def save_step(self, flow_id: str, result: StepResult) -> None:
+        self._steps.setdefault(flow_id, {})[result.step] = result.model_copy(deep=True)
+
+    async def get_flow(self, flow_id: str) -> Optional[FlowResponse]:
+        flow = self._flows.get(flow_id)
+        if flow is None:
+            return None
+        return flow.model_copy(
+            deep=True, update={"results": await self.get_steps(flow_id)}
+        )
+
+    async def get_steps(self, flow_id: str) -> Optional[List[StepResult]]:
+        if flow_id not in self._flows:
+            return None
+        pasos = self._steps.get(flow_id, {})
+        return [pasos[step].model_copy(deep=True) for step in sorted(pasos)]
+
+
+class SQLFlowStore(FlowStore):
+    """
+    Estado de los flujos en la base de datos de ``DatabaseManager``
+
+    Usa dos tablas (flujos y pasos) con el modelo serializado en JSON; el
+    SQL es compatible con PostgreSQL y SQLite.
+    """
+
+    FLOWS_TABLE = "flow_runs"
+    STEPS_TABLE = "flow_step_results"
+
+    def __init__(self, db: "DatabaseManager"):
+        self.db = db
+
+    def _engine(self):
+        if not self.db.engine:
+            raise RuntimeError("Base de datos no inicializada")
+        return self.db.engine
+
+    async def initialize(self) -> None:
+        async with self._engine().begin() as conn:
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {self.FLOWS_TABLE} ("
+                    "flow_id VARCHAR(64) PRIMARY KEY, "
+                    "environment VARCHAR(16) NOT NULL, "
+                    "status VARCHAR(32) NOT NULL, "
+                    "data TEXT NOT NULL)"
+                )
+            )
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {self.STEPS_TABLE} ("
+                    "flow_id VARCHAR(64) NOT NULL, "
+                    "step INTEGER NOT NULL, "
+                    "status VARCHAR(32) NOT NULL, "
+                    "data TEXT NOT NULL, "
+                    "PRIMARY KEY (flow_id, step))"
+                )
+            )
+        logger.info("Tablas de estado de flujos inicializadas")
+
+    async def _upsert_steps(self, conn, flow_id: str, results: List[StepResult]):
+        if not results:
+            return
+        await conn.execute(
+            text(
+                f"INSERT INTO {self.STEPS_TABLE} (flow_id, step, status, data) "
+                "VALUES (:flow_id, :step, :status, :data) "
+                "ON CONFLICT (flow_id, step) DO UPDATE SET "
+                "status = excluded.status, data = excluded.data"
+            ),
+            [
+                {
+                    "flow_id": flow_id,
+                    "step": result.step,
+                    "status": result.status,
+                    "data": result.model_dump_json(),
+                }
+                for result in results
+            ],
+        )
+
+    async def save_flow(self, flow: FlowResponse) -> None:
+        data = flow.model_dump(mode="json", exclude={"results"})
+        async with self._engine().begin() as conn:
+            await conn.execute(
+                text(
+                    f"INSERT INTO {self.FLOWS_TABLE} "
+                    "(flow_id, environment, status, data) "
+                    "VALUES (:flow_id, :environment, :status, :data) "
+                    "ON CONFLICT (flow_id) DO UPDATE SET "
+                    "status = excluded.status, data = excluded.data"
+                ),
+                {
+                    "flow_id": flow.flow_id,
+                    "environment": flow.environment,
+                    "status": flow.status,
+                    "data": json.dumps(data),
+                },
+            )
+            await self._upsert_steps(conn, flow.flow_id, flow.results)
+
+    async def save_step(self, flow_id: str, result: StepResult) -> None:
+        async with self._engine().begin() as conn:
+            await self._upsert_steps(conn, flow_id, [result])
+
+    async def get_flow(self, flow_id: str) -> Optional[FlowResponse]:
+        async with self._engine().connect() as conn:
+            row = (
+                await conn.execute(
+                    text(
+                        f"SELECT data FROM {self.FLOWS_TABLE} WHERE flow_id = :flow_id"
+                    ),
+                    {"flow_id": flow_id},
+                )
+            ).first()
+            if row is None:
+                return None
+            steps = await self._select_steps(conn, flow_id)
+        return FlowResponse(**{**json.loads(row.data), "results": steps})
+
+    async def get_steps(self, flow_id: str) -> Optional[List[StepResult]]:
+        async with self._engine().connect() as conn:
+            existe = (
+                await conn.execute(
+                    text(f"SELECT 1 FROM {self.FLOWS_TABLE} WHERE flow_id = :flow_id"),
+                    {"flow_id": flow_id},
+                )
+            ).first()
+            if existe is None:
+                return None
+            return await self._select_steps(conn, flow_id)
+
+    async def _select_steps(self, conn, flow_id: str) -> List[StepResult]:
+        rows = await conn.execute(
+            text(
+                f"SELECT data FROM {self.STEPS_TABLE} "
+                "WHERE flow_id = :flow_id ORDER BY step"
+            ),
+            {"flow_id": flow_id},
+        )
+        return [StepResult.model_validate_json(row.data) for row in rows]
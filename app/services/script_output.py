@@ -0,0 +1,116 @@
+"""
+Salida de los scripts con memoria acotada
+
+Los scripts de optimización configuran ``pd.options.display.max_rows = None``,
+por lo que un ``print`` de un DataFrame puede generar millones de líneas. La
+salida se procesa línea por línea y solo se conservan las primeras y las
+últimas líneas hasta un máximo de caracteres; las intermedias se descartan
+contando cuántas fueron.
+"""
+
+import io
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+OnLine = Callable[[str], None]
+
+
+class OutputBuffer:
+    """
+    Buffer de salida que conserva el inicio y el final hasta ``max_chars``
+
+    La mitad del espacio se usa para las primeras líneas y la otra mitad
+    como buffer circular de las últimas. Las líneas más largas que la mitad
+    del espacio se recortan (aunque lleguen en varios bloques).
+
+    Args:
+        max_chars: Máximo de caracteres conservados
+        on_line: Función llamada con cada línea completa (p. ej. el logger)
+    """
+
+    def __init__(self, max_chars: int = 100_000, on_line: Optional[OnLine] = None):
+        self.max_chars = max(2, max_chars)
+        self.on_line = on_line
+        self._half = self.max_chars // 2
+        self._head: List[str] = []
+        self._head_chars = 0
+        self._tail: Deque[str] = deque()
+        self._tail_chars = 0
+        self._partial = ""
+        self._discarding = False
+        self.lines = 0
+        self.omitted_lines = 0
+
+    def feed(self, text: str) -> None:
+        """Agrega texto; las líneas se procesan al recibir su salto de línea"""
+        if self._discarding:
+            end = text.find("\n")
+            if end < 0:
+                return
+            text, self._discarding = text[end + 1 :], False
+        self._partial += text
+        *complete, self._partial = self._partial.split("\n")
+        for line in complete:
+            self._add_line(line)
+        if len(self._partial) > self._half:
+            # Línea sin fin: se registra recortada y se descarta el resto
+            self._add_line(self._partial)
+            self._partial, self._discarding = "", True
+
+    def close(self) -> None:
+        """Procesa la última línea si no terminó en salto de línea"""
+        if self._partial:
+            line, self._partial = self._partial, ""
+            self._add_line(line)
+
+    def _add_line(self, line: str) -> None:
+        line = line.rstrip("\r")
+        self.lines += 1
+        if self.on_line is not None:
+            self.on_line(line)
+
+        size = len(line) + 1
+        if size > self._half:
+            line = line[: self._half - 2] + "…"
+            size = self._half
+        if not self._tail and self._head_chars + size <= self._half:
+            self._head.append(line)
+            self._head_chars += size
+            return
+
+        self._tail.append(line)
+        self._tail_chars += size
+        while self._tail_chars > self._half:
+            self._tail_chars -= len(self._tail.popleft()) + 1
+            self.omitted_lines += 1
+
+    @property
+    def last_line(self) -> Optional[str]:
+        """Última línea completa recibida"""
+        if self._tail:
+            return self._tail[-1]
+        return self._head[-1] if self._head else None
+
+    def text(self) -> str:
+        """Salida conservada, con una marca donde se omitieron líneas"""
+        lines = list(self._head)
+        if self.omitted_lines:
+            lines.append(f"... [{self.omitted_lines} líneas omitidas] ...")
+        lines.extend(self._tail)
+        if self._partial:
+            lines.append(self._partial)
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class OutputStream(io.TextIOBase):
+    """Flujo de texto que escribe en un ``OutputBuffer`` (para ``sys.stdout``)"""
+
+    def __init__(self, output: OutputBuffer):
+        self.output = output
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self.output.feed(text)
+        return len(text)
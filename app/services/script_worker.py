@@ -0,0 +1,342 @@
+"""
+Procesos de trabajo persistentes para los pasos de tipo script
+
+En el modo "subprocess" cada paso lanza ``python <script>``: paga el arranque
+del intérprete, la importación de pandas/numpy/scipy/google-cloud-bigquery y
+la autenticación de un ``bigquery.Client()`` nuevo. En el modo "worker" los
+scripts se ejecutan con ``runpy`` dentro de procesos de larga duración que ya
+importaron esas librerías y comparten un cliente de BigQuery.
+
+Cada proceso ejecuta un script a la vez; si un paso excede su timeout o se
+cancela, se termina solo ese proceso y se reemplaza por uno nuevo.
+"""
+
+import asyncio
+import contextlib
+import functools
+import importlib
+import multiprocessing
+import os
+import runpy
+import signal
+import sys
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from ..bigquery_client import get_client
+from .script_output import OutputBuffer, OutputStream
+
+PRELOAD_MODULES = ("pandas", "numpy", "scipy.optimize", "google.cloud.bigquery")
+
+
+def _shared_bigquery_client(client_class):
+    """
+    Envuelve ``bigquery.Client`` para reutilizar el cliente sin argumentos
+
+    Los scripts que todavía crean su cliente con ``bigquery.Client()`` reciben
+    el mismo cliente que ``get_client()``, ya autenticado. Las llamadas con
+    argumentos crean un cliente nuevo como de costumbre.
+    """
+
+    @functools.wraps(client_class)
+    def client(*args, **kwargs):
+        if args or kwargs:
+            return client_class(*args, **kwargs)
+        return get_client()
+
+    return client
+
+
+def _preload(modules: Sequence[str]) -> List[str]:
+    """Importa los módulos indicados; devuelve los que no se pudieron importar"""
+    failed = []
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            failed.append(module)
+    bigquery = sys.modules.get("google.cloud.bigquery")
+    if bigquery is not None:
+        bigquery.Client = _shared_bigquery_client(bigquery.Client)
+    return failed
+
+
+def run_script(
+    script_path: str,
+    args: List[str],
+    environment: str,
+    max_output_chars: int = 100_000,
+    on_line: Optional[Callable[[str, str], None]] = None,
+    env: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Ejecuta un script como ``__main__`` en el proceso actual
+
+    Reproduce la ejecución de ``python <script> <args>``: argumentos en
+    ``sys.argv``, carpeta del script en ``sys.path`` y ``ENVIRONMENT`` en el
+    entorno. La salida estándar y de errores se captura línea por línea en
+    buffers acotados (ver ``OutputBuffer``).
+
+    Args:
+        script_path: Ruta del script
+        args: Argumentos de línea de comandos
+        environment: Entorno de ejecución (dev/prd)
+        max_output_chars: Máximo de caracteres conservados por salida
+        env: Variables de entorno adicionales durante el script
+        on_line: Función llamada con ("stdout"/"stderr", línea) por cada línea
+
+    Returns:
+        Diccionario con returncode, stdout, stderr, output_lines y run_seconds
+    """
+    buffers = {
+        name: OutputBuffer(
+            max_output_chars,
+            on_line=functools.partial(on_line, name) if on_line else None,
+        )
+        for name in ("stdout", "stderr")
+    }
+    variables = {**(env or {}), "ENVIRONMENT": environment}
+    saved_argv, saved_path = sys.argv, list(sys.path)
+    saved_env = {name: os.environ.get(name) for name in variables}
+    sys.argv = [script_path, *args]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script_path)))
+    os.environ.update(variables)
+
+    returncode = 0
+    start = time.perf_counter()
+    try:
+        with (
+            contextlib.redirect_stdout(OutputStream(buffers["stdout"])),
+            contextlib.redirect_stderr(OutputStream(buffers["stderr"])),
+        ):
+            try:
+                runpy.run_path(script_path, run_name="__main__")
+            except SystemExit as e:
+                if isinstance(e.code, int):
+                    returncode = e.code
+                elif e.code is not None:
+                    print(e.code, file=sys.stderr)
+                    returncode = 1
+            except BaseException:
+                traceback.print_exc()
+                returncode = 1
+    finally:
+        sys.argv, sys.path[:] = saved_argv, saved_path
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        for buffer in buffers.values():
+            buffer.close()
+
+    return {
+        "returncode": returncode,
+        "stdout": buffers["stdout"].text(),
+        "stderr": buffers["stderr"].text(),
+        "output_lines": buffers["stdout"].lines,
+        "run_seconds": time.perf_counter() - start,
+    }
+
+
+def _worker_main(conn, preload: Sequence[str]) -> None:
+    """Bucle del proceso de trabajo: precarga y ejecuta scripts uno por uno"""
+    if hasattr(os, "setsid"):
+        # Grupo de procesos propio para terminar también los hijos del script
+        os.setsid()
+    start = time.perf_counter()
+    failed = _preload(preload)
+    conn.send({"preload_seconds": time.perf_counter() - start, "failed": failed})
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        if request.pop("stream", False):
+            # Cada línea se envía al proceso principal mientras el script corre
+            request["on_line"] = lambda name, line: conn.send(("line", name, line))
+        conn.send(("result", run_script(**request)))
+
+
+class ScriptWorker:
+    """Proceso de trabajo con un canal para enviar scripts y recibir resultados"""
+
+    def __init__(self, context, preload: Sequence[str]):
+        self._conn, child = context.Pipe()
+        # No es daemon: los scripts pueden lanzar sus propios procesos
+        self.process = context.Process(
+            target=_worker_main, args=(child, tuple(preload)), name="script-worker"
+        )
+        self.process.start()
+        child.close()
+        ready = self._conn.recv()
+        self.preload_seconds: float = ready["preload_seconds"]
+        if ready["failed"]:
+            logger.warning(f"Worker sin precargar: {', '.join(ready['failed'])}")
+
+    def run(
+        self,
+        request: Dict[str, Any],
+        on_line: Optional[Callable[[str, str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Envía un script al proceso y espera su resultado (bloqueante)
+
+        Args:
+            request: Argumentos de ``run_script``
+            on_line: Función llamada con ("stdout"/"stderr", línea) por cada
+                línea que el script escribe
+
+        Returns:
+            Resultado de ``run_script``
+        """
+        self._conn.send({**request, "stream": on_line is not None})
+        while True:
+            kind, *payload = self._conn.recv()
+            if kind == "result":
+                return payload[0]
+            on_line(*payload)
+
+    def kill(self) -> None:
+        """Termina el proceso y sus hijos inmediatamente"""
+        with contextlib.suppress(ProcessLookupError):
+            if hasattr(os, "killpg"):
+                os.killpg(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.kill()
+        self.process.join()
+        self._conn.close()
+
+    def stop(self) -> None:
+        """Pide al proceso que termine después del script en curso"""
+        with contextlib.suppress(OSError):
+            self._conn.send(None)
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+
+
+class ScriptWorkerPool:
+    """Grupo de procesos de trabajo con las librerías pesadas precargadas"""
+
+    def __init__(
+        self,
+        size: int = 2,
+        preload: Sequence[str] = PRELOAD_MODULES,
+        start_method: str = "spawn",
+    ):
+        self.size = max(1, size)
+        self.preload = tuple(preload)
+        self._context = multiprocessing.get_context(start_method)
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[ScriptWorker] = []
+        self._lock = asyncio.Lock()
+        self.stats = {"runs": 0, "restarts": 0, "overhead_seconds": 0.0}
+
+    async def start(self) -> None:
+        """Crea los procesos de trabajo (si no se han creado)"""
+        async with self._lock:
+            if self._idle is not None:
+                return
+            workers = await asyncio.gather(
+                *(asyncio.to_thread(self._spawn) for _ in range(self.size))
+            )
+            self._idle = asyncio.Queue()
+            for worker in workers:
+                self._idle.put_nowait(worker)
+            logger.info(
+                f"{self.size} workers de scripts listos (precarga "
+                f"{max(w.preload_seconds for w in workers):.1f}s)"
+            )
+
+    def _spawn(self) -> ScriptWorker:
+        worker = ScriptWorker(self._context, self.preload)
+        self._workers.append(worker)
+        return worker
+
+    async def run(
+        self,
+        script_path: str,
+        args: List[str],
+        environment: str,
+        timeout: Optional[float] = None,
+        max_output_chars: int = 100_000,
+        on_line: Optional[Callable[[str, str], None]] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta un script en un worker libre
+
+        Args:
+            script_path: Ruta del script
+            args: Argumentos de línea de comandos
+            environment: Entorno de ejecución (dev/prd)
+            timeout: Tiempo máximo en segundos
+            max_output_chars: Máximo de caracteres conservados por salida
+            on_line: Función llamada en el event loop con ("stdout"/"stderr",
+                línea) por cada línea que el script escribe
+            env: Variables de entorno adicionales durante el script
+
+        Returns:
+            Resultado de ``run_script`` más overhead_seconds (tiempo del paso
+            fuera del script: espera, envío y recepción)
+
+        Raises:
+            asyncio.TimeoutError: Si el script excede el timeout (el worker se
+                termina y se reemplaza)
+        """
+        await self.start()
+        worker = await self._idle.get()
+        start = time.perf_counter()
+        request = {
+            "script_path": script_path,
+            "args": args,
+            "environment": environment,
+            "max_output_chars": max_output_chars,
+            "env": env,
+        }
+        forward: Optional[Callable[[str, str], None]] = None
+        if on_line is not None:
+            loop = asyncio.get_running_loop()
+
+            def _forward(name: str, line: str) -> None:
+                loop.call_soon_threadsafe(on_line, name, line)
+
+            forward = _forward
+
+        try:
+            result = await asyncio.wait_for(
+                asyncio.to_thread(worker.run, request, forward), timeout=timeout
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Terminar el script en curso reemplazando el proceso
+            await self._replace(worker)
+            raise
+        except (EOFError, OSError) as e:
+            await self._replace(worker)
+            raise RuntimeError(f"El worker terminó inesperadamente: {e!r}") from e
+        self._idle.put_nowait(worker)
+
+        result["overhead_seconds"] = time.perf_counter() - start - result["run_seconds"]
+        self.stats["runs"] += 1
+        self.stats["overhead_seconds"] += result["overhead_seconds"]
+        return result
+
+    async def _replace(self, worker: ScriptWorker) -> None:
+        await asyncio.to_thread(worker.kill)
+        self._workers.remove(worker)
+        self.stats["restarts"] += 1
+        replacement = await asyncio.to_thread(self._spawn)
+        if self._idle is not None:
+            self._idle.put_nowait(replacement)
+
+    async def shutdown(self) -> None:
+        """Detiene todos los procesos de trabajo"""
+        workers, self._workers = self._workers, []
+        self._idle = None
+        await asyncio.gather(*(asyncio.to_thread(w.stop) for w in workers))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Benchmark: cliente de BigQuery nuevo por llamada vs cliente reutilizado
+
+Un servidor HTTP local responde la API de BigQuery (``datasets.list``) y un
+endpoint de token, así que no se usa la red ni credenciales reales. Con un
+cliente nuevo cada llamada paga la construcción del cliente, la obtención del
+token y una conexión TCP nueva; el cliente reutilizado conserva el token y la
+conexión abierta en su pool.
+
+Uso:
+    python benchmarks/bench_bigquery_client.py --llamadas 200
+"""
+
+import argparse
+import datetime
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from google.auth import credentials as ga_credentials
+
+from app.bigquery_client import build_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Sin Nagle la conexión reutilizada no espera el ACK retrasado de TCP
+    disable_nagle_algorithm = True
+    conexiones = 0
+
+    def setup(self):
+        super().setup()
+        type(self).conexiones += 1
+
+    def do_GET(self):
+        cuerpo = b'{"access_token": "local", "expires_in": 3600}'
+        if "/datasets" in self.path:
+            cuerpo = b'{"kind": "bigquery#datasetList", "datasets": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class _CredencialesLocales(ga_credentials.Credentials):
+    """Credenciales que obtienen su token del servidor local"""
+
+    def __init__(self, url: str):
+        super().__init__()
+        self.url = url
+
+    def refresh(self, request):
+        request(url=f"{self.url}/token", method="GET")
+        self.token = "local"
+        self.expiry = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+
+
+def medir(url: str, llamadas: int, reutilizar: bool) -> list:
+    """Hace ``llamadas`` consultas a la API y devuelve el tiempo de cada una"""
+
+    def nuevo():
+        return build_client(
+            project="proyecto-local",
+            credentials=_CredencialesLocales(url),
+            client_options={"api_endpoint": url},
+        )
+
+    compartido = nuevo() if reutilizar else None
+    tiempos = []
+    for _ in range(llamadas):
+        inicio = time.perf_counter()
+        client = compartido or nuevo()
+        list(client.list_datasets())
+        if not reutilizar:
+            client.close()
+        tiempos.append(time.perf_counter() - inicio)
+    if compartido:
+        compartido.close()
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cliente de BigQuery")
+    parser.add_argument("--llamadas", type=int, default=200)
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    try:
+        _Handler.conexiones = 0
+        nuevo = medir(url, args.llamadas, reutilizar=False)
+        conexiones_nuevo = _Handler.conexiones
+        _Handler.conexiones = 0
+        reutilizado = medir(url, args.llamadas, reutilizar=True)
+        conexiones_reutilizado = _Handler.conexiones
+    finally:
+        servidor.shutdown()
+
+    resultado = {
+        "llamadas": args.llamadas,
+        "nuevo_mediana_ms": round(statistics.median(nuevo) * 1000, 3),
+        "reutilizado_mediana_ms": round(statistics.median(reutilizado) * 1000, 3),
+        "conexiones_nuevo": conexiones_nuevo,
+        "conexiones_reutilizado": conexiones_reutilizado,
+        "aceleracion": round(
+            statistics.median(nuevo) / statistics.median(reutilizado), 1
+        ),
+    }
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main()
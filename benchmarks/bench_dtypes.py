@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Benchmark: tipos por defecto vs tipos compactos (app/processing/schemas.py)
+
+Genera una tabla semanal con claves como cadenas de Python (lo que devuelve
+``to_dataframe()``) y la misma tabla con los tipos declarados para
+``tabla_prep_optimizacion_semanal``. Mide la memoria y el tiempo del merge
+con ``df_metodo`` por material/zona/canal y de un groupby por las claves,
+como en ``seleccionar_modelo`` y ``optimizar_por_modelo``.
+
+Uso:
+    python benchmarks/bench_dtypes.py --filas 1000000 --repeticiones 3
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.processing.model_selection import CLAVES
+from app.processing.schemas import (
+    aplicar_tipos,
+    reporte_memoria,
+    tipos_de,
+    unificar_categorias,
+)
+
+EXTERNAS = [
+    columna
+    for columna, tipo in tipos_de("tabla_prep_optimizacion_semanal").items()
+    if tipo == "float32"
+]
+
+
+def generar_datos(filas: int, semilla: int = 0):
+    """Tabla de optimización (claves como objetos) y su df_metodo"""
+    rng = np.random.default_rng(semilla)
+    materiales = max(filas // 100, 1)
+    df = pd.DataFrame(
+        {
+            "id_material": [
+                f"{100000 + m}" for m in rng.integers(0, materiales, filas)
+            ],
+            "id_zona": [f"Z{z}" for z in rng.integers(0, 40, filas)],
+            "id_canal_venta": rng.choice(["PU", "MM", "MA", "DI", "TR"], filas),
+            "grupo_articulo": rng.choice([f"GRUPO {g}" for g in range(30)], filas),
+            "precio_unitario_promedio": rng.uniform(10, 500, filas),
+            "coste_unitario": rng.uniform(5, 400, filas),
+            "unidades_sum_kgv": rng.uniform(1, 1000, filas),
+            **{columna: rng.normal(0, 1, filas) for columna in EXTERNAS},
+        }
+    )
+    # Como to_dataframe(): cadenas como objetos de Python
+    df = df.astype({c: object for c in [*CLAVES, "grupo_articulo"]})
+    df_metodo = df[CLAVES].drop_duplicates().reset_index(drop=True)
+    df_metodo["modelo"] = rng.choice(["aproximada", "exacta"], len(df_metodo))
+    return df, df_metodo
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mejor tiempo de ``repeticiones`` ejecuciones, en segundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def operaciones(df: pd.DataFrame, df_metodo: pd.DataFrame, repeticiones: int):
+    merge = medir(lambda: df.merge(df_metodo, on=CLAVES, how="inner"), repeticiones)
+    groupby = medir(
+        lambda: df.groupby(CLAVES, observed=True, sort=False)[
+            "precio_unitario_promedio"
+        ].max(),
+        repeticiones,
+    )
+    return {"merge_segundos": round(merge, 4), "groupby_segundos": round(groupby, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de tipos compactos")
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    df, df_metodo = generar_datos(args.filas)
+    tipos = tipos_de("tabla_prep_optimizacion_semanal", df.columns)
+    inicio = time.perf_counter()
+    compacto, metodo_compacto = unificar_categorias(
+        [aplicar_tipos(df, tipos), aplicar_tipos(df_metodo, tipos)], CLAVES
+    )
+    conversion = time.perf_counter() - inicio
+
+    antes = operaciones(df, df_metodo, args.repeticiones)
+    despues = operaciones(compacto, metodo_compacto, args.repeticiones)
+    resultado = {
+        "filas": args.filas,
+        "memoria": reporte_memoria(df, compacto),
+        "conversion_segundos": round(conversion, 3),
+        "tipos_por_defecto": antes,
+        "tipos_compactos": despues,
+        "aceleracion_merge": round(
+            antes["merge_segundos"] / despues["merge_segundos"], 1
+        ),
+        "aceleracion_groupby": round(
+            antes["groupby_segundos"] / despues["groupby_segundos"], 1
+        ),
+    }
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Benchmark: motor vectorizado vs ciclo SLSQP por fila (optimizacion_v3.py)
+
+Uso:
+    python benchmarks/bench_price_solver.py --filas 2000 --tolerancia 1e-3
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.processing.price_solver import (
+    MODELOS,
+    calcular_coef_k,
+    calcular_efecto_externo,
+    comparar_resultados,
+    resolver_lote,
+    resolver_slsqp,
+)
+
+
+def generar_datos(filas: int, semilla: int = 0) -> pd.DataFrame:
+    """Genera una tabla de optimización sintética con valores realistas"""
+    rng = np.random.default_rng(semilla)
+    precio = rng.uniform(10, 500, filas)
+    rango = rng.choice([0.01, 0.02, 0.03, 0.04, 0.05, 0.06, 0.08], filas)
+    df = pd.DataFrame(
+        {
+            "id_material": rng.integers(1000, 9999, filas).astype(str),
+            "id_zona": rng.choice(["Z1", "Z2", "Z3"], filas),
+            "id_canal_venta": rng.choice(["PU", "MM", "MA", "DI"], filas),
+            "precio_unitario_promedio": precio,
+            "coste_unitario": precio * rng.uniform(0.5, 0.95, filas),
+            "unidades_sum_kgv": rng.uniform(1, 5000, filas),
+            "elasticidad_promedio_historico": rng.uniform(-3.0, -0.05, filas),
+            "precio_min": precio * (1 - rango),
+            "precio_max": precio * (1 + rango),
+        }
+    )
+    for col in [
+        "elasticidad_tasa_ocupacion",
+        "elasticidad_tipo_cambio",
+        "elasticidad_inpc",
+        "elasticidad_pib",
+    ]:
+        df[col] = rng.uniform(-1.5, 1.5, filas)
+    for col in [
+        "porc_var_tasa_ocupacion",
+        "porc_var_tipo_cambio",
+        "porc_var_inpc_nacional",
+        "porc_var_pib",
+    ]:
+        df[col] = rng.uniform(-3, 3, filas)
+    for actual, base in [
+        ("tasa_ocupacion_avg_actual", "tasa_ocupacion_avg"),
+        ("tipo_cambio_avg_actual", "tipo_cambio_avg"),
+        ("inpc_nacional_actual", "inpc_nacional"),
+        ("pib_millones_actual", "pib_millones"),
+    ]:
+        df[base] = rng.uniform(50, 150, filas)
+        df[actual] = df[base] * rng.uniform(0.97, 1.03, filas)
+    df["coef_k"] = calcular_coef_k(df["elasticidad_promedio_historico"])
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del optimizador de precios")
+    parser.add_argument("--filas", type=int, default=2000)
+    parser.add_argument("--filas-lote", type=int, default=200_000)
+    parser.add_argument("--tolerancia", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    resultados = {}
+    for modelo in MODELOS:
+        df = generar_datos(args.filas)
+        df["efecto_externo"] = calcular_efecto_externo(df, modelo)
+
+        inicio = time.perf_counter()
+        ref = resolver_slsqp(df, modelo)
+        t_slsqp = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        lote = resolver_lote(df, modelo)
+        t_lote = time.perf_counter() - inicio
+
+        df_grande = generar_datos(args.filas_lote, semilla=1)
+        df_grande["efecto_externo"] = calcular_efecto_externo(df_grande, modelo)
+        inicio = time.perf_counter()
+        resolver_lote(df_grande, modelo)
+        t_grande = time.perf_counter() - inicio
+
+        resultados[modelo] = {
+            "slsqp_filas_por_segundo": round(args.filas / t_slsqp, 1),
+            "lote_filas_por_segundo": round(args.filas / t_lote, 1),
+            "lote_filas_por_segundo_grande": round(args.filas_lote / t_grande, 1),
+            "aceleracion": round(t_slsqp / t_lote, 1),
+            "comparacion": comparar_resultados(lote, ref, args.tolerancia),
+        }
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Benchmark: propagación de precios con kernel vs ciclo iterrows()
+(unificacion_precios_variacion.py)
+
+El ciclo original se mide sobre una muestra y se extrapola en filas/segundo;
+el kernel se mide sobre la tabla completa.
+
+Uso:
+    python benchmarks/bench_propagation.py --filas 3000000 --filas-ciclo 50000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.processing.propagation import propagar_valor
+
+CLAVES = ["id_material", "id_zona", "id_canal_venta"]
+
+
+def generar_datos(filas: int, semanas: int = 104, semilla: int = 0) -> pd.DataFrame:
+    """Genera precios semanales por material/zona/canal con cambios pequeños"""
+    rng = np.random.default_rng(semilla)
+    grupos = max(filas // semanas, 1)
+    filas = grupos * semanas
+    variacion = rng.choice([0.0, 0.002, -0.004, 0.008, 0.05, -0.03], filas)
+    precio = (
+        rng.uniform(10, 500, grupos).repeat(semanas)
+        * np.cumprod(1 + variacion.reshape(grupos, semanas), axis=1).ravel()
+    )
+    grupo = np.arange(grupos)
+    df = pd.DataFrame(
+        {
+            "id_material": (grupo // 8 + 100000).astype(str).repeat(semanas),
+            "id_zona": np.array(["Z1", "Z2"])[grupo // 4 % 2].repeat(semanas),
+            "id_canal_venta": np.array(["PU", "MM", "MA", "DI"])[grupo % 4].repeat(
+                semanas
+            ),
+            "fecha_semana": np.tile(
+                pd.date_range("2022-01-03", periods=semanas, freq="7D"), grupos
+            ),
+            "precio_unitario_promedio": precio,
+        }
+    )
+    return df.sample(frac=1, random_state=semilla, ignore_index=True)
+
+
+def ciclo_iterrows(df_p: pd.DataFrame) -> list:
+    """Versión compacta del ciclo original (sin el caso de la primera fila)"""
+    llave = None
+    anterior = float("nan")
+    precios = []
+    for _, row in df_p.iterrows():
+        actual = (row["id_material"], row["id_zona"], row["id_canal_venta"])
+        precio = row["precio_unitario_promedio"]
+        if actual != llave or not abs(precio - anterior) / anterior < 0.01:
+            llave = actual
+            anterior = precio
+        precios.append(anterior)
+    return precios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de propagación de precios")
+    parser.add_argument("--filas", type=int, default=3_000_000)
+    parser.add_argument("--filas-ciclo", type=int, default=50_000)
+    args = parser.parse_args()
+
+    df = generar_datos(args.filas)
+
+    muestra = df.head(args.filas_ciclo).sort_values(by=[*CLAVES, "fecha_semana"])
+    inicio = time.perf_counter()
+    ciclo_iterrows(muestra)
+    t_ciclo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    propagar_valor(
+        df,
+        claves=CLAVES,
+        orden=["fecha_semana"],
+        valor="precio_unitario_promedio",
+        ancla_de="fecha_semana",
+    )
+    t_kernel = time.perf_counter() - inicio
+
+    ciclo = len(muestra) / t_ciclo
+    kernel = len(df) / t_kernel
+    print(
+        json.dumps(
+            {
+                "filas": len(df),
+                "kernel_segundos": round(t_kernel, 2),
+                "kernel_filas_por_segundo": round(kernel, 1),
+                "iterrows_filas_por_segundo": round(ciclo, 1),
+                "iterrows_segundos_estimados": round(len(df) / ciclo, 1),
+                "aceleracion": round(kernel / ciclo, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
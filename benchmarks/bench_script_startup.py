@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Benchmark: costo fijo por paso de script, subproceso nuevo vs worker persistente
+
+El script de prueba solo importa las librerías que usan los scripts reales
+(pandas, numpy, scipy, google-cloud-bigquery), así que el tiempo medido es el
+arranque del intérprete y las importaciones que se pagan en cada paso.
+
+Uso:
+    python benchmarks/bench_script_startup.py --pasos 10 --workers 2
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.models.flow import FlowStep
+from app.services.flow_executor import FlowExecutor
+from app.services.script_worker import ScriptWorkerPool
+
+SCRIPT = """
+import numpy as np
+import pandas as pd
+import scipy.optimize
+from google.cloud import bigquery
+
+print(len(pd.DataFrame({"x": np.arange(10)})))
+"""
+
+
+async def medir(executor: FlowExecutor, modo: str, pasos: int) -> list:
+    """Ejecuta el script de prueba ``pasos`` veces y devuelve los tiempos"""
+    step = FlowStep(step=1, type="script", name="importa.py", execution=modo)
+    tiempos = []
+    for _ in range(pasos):
+        inicio = time.perf_counter()
+        await executor._execute_script(step, "dev")
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+async def main_async(args) -> dict:
+    with tempfile.TemporaryDirectory() as carpeta:
+        (Path(carpeta) / "dev").mkdir()
+        (Path(carpeta) / "dev" / "importa.py").write_text(SCRIPT)
+        executor = FlowExecutor()
+        executor.scripts_path = Path(carpeta)
+        executor.worker_pool = ScriptWorkerPool(size=args.workers)
+
+        inicio = time.perf_counter()
+        await executor.worker_pool.start()
+        arranque_workers = time.perf_counter() - inicio
+        try:
+            subproceso = await medir(executor, "subprocess", args.pasos)
+            worker = await medir(executor, "worker", args.pasos)
+        finally:
+            await executor.close()
+
+    return {
+        "pasos": args.pasos,
+        "arranque_workers_segundos": round(arranque_workers, 3),
+        "subproceso_mediana_segundos": round(statistics.median(subproceso), 4),
+        "worker_mediana_segundos": round(statistics.median(worker), 4),
+        "aceleracion": round(statistics.median(subproceso) / statistics.median(worker)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del arranque de scripts")
+    parser.add_argument("--pasos", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Benchmark: suavizado por groupby vs recorrido material × zona × canal
+(suavizado_de_elasticidades.py), escalando el número de materiales
+
+El recorrido original filtra la tabla completa por cada combinación, por lo
+que su costo crece con materiales × filas; el groupby crece con las filas.
+
+Uso:
+    python benchmarks/bench_smoothing.py --materiales 50 100 200 2000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.processing.smoothing import en_rango, suavizar_elasticidades
+
+ZONAS = ["Z1", "Z2", "Z3", "Z4"]
+CANALES = ["PU", "MM", "MA", "DI"]
+
+
+def generar_datos(materiales: int, semanas: int = 52, semilla: int = 0) -> pd.DataFrame:
+    """Genera elasticidades semanales; ~60% de las combinaciones existen"""
+    rng = np.random.default_rng(semilla)
+    combinaciones = pd.MultiIndex.from_product(
+        [[str(100000 + m) for m in range(materiales)], ZONAS, CANALES],
+        names=["id_material", "id_zona", "id_canal_venta"],
+    ).to_frame(index=False)
+    combinaciones = combinaciones[rng.random(len(combinaciones)) < 0.6]
+    df = combinaciones.loc[combinaciones.index.repeat(semanas)].reset_index(drop=True)
+    df["fecha_semana"] = np.tile(
+        pd.date_range("2023-01-02", periods=semanas, freq="7D"), len(combinaciones)
+    )
+    df["elasticidad_semana"] = rng.normal(-0.5, 2.5, len(df))
+    return df.sample(frac=1, random_state=semilla, ignore_index=True)
+
+
+def recorrido_cartesiano(df: pd.DataFrame, lim_elast_neg: float = -3) -> list:
+    """Versión compacta del recorrido original con tres filtros por combinación"""
+    list_suav = []
+    for m in df.id_material.unique().tolist():
+        for z in df.id_zona.unique().tolist():
+            for c in df.id_canal_venta.unique().tolist():
+                df_ev = df[
+                    (df["id_material"] == m)
+                    & (df["id_zona"] == z)
+                    & (df["id_canal_venta"] == c)
+                ][["fecha_semana", "elasticidad_semana"]]
+                if len(df_ev) > 0:
+                    s = df_ev.sort_values(by="fecha_semana")["elasticidad_semana"]
+                    elas_prom = s.mean()
+                    if en_rango(elas_prom, lim_elast_neg).item() == "False":
+                        s.rolling(window=3).mean().dropna().mean()
+                        s.ewm(alpha=0.3, adjust=False).mean().mean()
+                    list_suav.append([m, z, c, elas_prom])
+    return list_suav
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del suavizado")
+    parser.add_argument(
+        "--materiales", type=int, nargs="+", default=[50, 100, 200, 2000]
+    )
+    parser.add_argument(
+        "--max-materiales-recorrido",
+        type=int,
+        default=200,
+        help="No medir el recorrido original por encima de este número",
+    )
+    args = parser.parse_args()
+
+    resultados = []
+    for materiales in args.materiales:
+        df = generar_datos(materiales)
+
+        inicio = time.perf_counter()
+        suavizar_elasticidades(df)
+        t_groupby = time.perf_counter() - inicio
+
+        fila = {
+            "materiales": materiales,
+            "filas": len(df),
+            "groupby_segundos": round(t_groupby, 3),
+        }
+        if materiales <= args.max_materiales_recorrido:
+            inicio = time.perf_counter()
+            recorrido_cartesiano(df)
+            t_recorrido = time.perf_counter() - inicio
+            fila["recorrido_segundos"] = round(t_recorrido, 3)
+            fila["aceleracion"] = round(t_recorrido / t_groupby, 1)
+        resultados.append(fila)
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
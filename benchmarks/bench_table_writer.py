@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Benchmark: escritura de tablas como Parquet (app/processing/table_writer.py)
+
+Genera una tabla con la forma de ``tabla_optimizacion_semanal`` (claves
+categóricas, precios, elasticidades float32, fecha) y la escribe con
+``EscritorLocal`` en un directorio temporal para cada compresión. Como
+referencia mide ``df.to_parquet`` de pandas en un solo archivo, que es la
+serialización que hace ``load_table_from_dataframe`` antes de subir.
+
+Uso:
+    python benchmarks/bench_table_writer.py --filas 1000000 --fragmento 250000
+"""
+
+import argparse
+import datetime
+import io
+import json
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.processing.table_writer import COMPRESIONES, EscritorLocal
+
+
+def generar_datos(filas: int, semilla: int = 0) -> pd.DataFrame:
+    """Tabla de salida de la optimización con tipos compactos"""
+    rng = np.random.default_rng(semilla)
+    materiales = max(filas // 100, 1)
+    semanas = [
+        datetime.date(2024, 1, 1) + datetime.timedelta(weeks=s) for s in range(52)
+    ]
+    return pd.DataFrame(
+        {
+            "fecha_semana": rng.choice(np.array(semanas, dtype=object), filas),
+            "id_material": pd.Categorical(
+                [f"{100000 + m}" for m in rng.integers(0, materiales, filas)]
+            ),
+            "id_zona": pd.Categorical([f"Z{z}" for z in rng.integers(0, 40, filas)]),
+            "id_canal_venta": pd.Categorical(
+                rng.choice(["PU", "MM", "MA", "DI", "TR"], filas)
+            ),
+            "precio_unitario_promedio": rng.uniform(10, 500, filas),
+            "coste_unitario": rng.uniform(5, 400, filas),
+            "precio_sugerido": rng.uniform(10, 500, filas),
+            "ganancia": rng.normal(1000, 300, filas),
+            "elasticidad_promedio_historico": rng.uniform(-3, 0, filas).astype(
+                "float32"
+            ),
+            "modelo": pd.Categorical(rng.choice(["aproximada", "exacta"], filas)),
+        }
+    )
+
+
+def medir(funcion, repeticiones: int):
+    """Mejor tiempo de ``repeticiones`` ejecuciones y el último resultado"""
+    mejor, resultado = float("inf"), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def fila(filas: int, segundos: float, bytes_: int, **extra):
+    return {
+        **extra,
+        "segundos": round(segundos, 3),
+        "filas_por_segundo": int(filas / segundos),
+        "mb": round(bytes_ / 1024**2, 2),
+        "mb_por_segundo": round(bytes_ / 1024**2 / segundos, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escritura Parquet")
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--fragmento", type=int, default=250_000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    df = generar_datos(args.filas)
+    resultados = []
+
+    def pandas_un_archivo():
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        return buffer.tell()
+
+    segundos, bytes_ = medir(pandas_un_archivo, args.repeticiones)
+    resultados.append(
+        fila(args.filas, segundos, bytes_, metodo="df.to_parquet", compresion="snappy")
+    )
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for compresion in COMPRESIONES:
+            escritor = EscritorLocal(
+                directorio, filas_por_fragmento=args.fragmento, compresion=compresion
+            )
+            segundos, reporte = medir(
+                lambda: escritor.escribir(df, "staging.tabla_optimizacion_semanal"),
+                args.repeticiones,
+            )
+            resultados.append(
+                fila(
+                    args.filas,
+                    segundos,
+                    reporte["bytes"],
+                    metodo="EscritorLocal",
+                    compresion=compresion,
+                    fragmentos=reporte["fragmentos"],
+                )
+            )
+
+    print(json.dumps({"filas": args.filas, "resultados": resultados}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Genera los lotes de Arrow de ``tests/fixtures`` sin conexión a BigQuery
+
+Los archivos tienen los tipos de Arrow que devuelve la Storage Read API para
+``staging.tabla_prep_optimizacion_semanal`` (DATE -> date32, NUMERIC ->
+decimal128(38, 9), INT64 con nulos) con valores sintéticos. Para grabar
+datos reales:
+
+    from app.bigquery_client import get_client
+    from app.processing.query_reader import filas_consulta, guardar_lotes, lotes_arrow
+
+    client = get_client()
+    filas = filas_consulta(client, "SELECT * FROM ... LIMIT 500")
+    guardar_lotes(lotes_arrow(client, filas), "tests/fixtures/archivo.arrow")
+
+Uso:
+    python tests/fixtures/generar_fixtures.py
+"""
+
+import datetime
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+from app.processing.query_reader import guardar_lotes
+
+CARPETA = Path(__file__).parent
+
+ESQUEMA = pa.schema(
+    [
+        ("fecha_semana", pa.date32()),
+        ("id_material", pa.string()),
+        ("id_zona", pa.string()),
+        ("id_canal_venta", pa.string()),
+        ("grupo_articulo", pa.string()),
+        ("precio_unitario_promedio", pa.decimal128(38, 9)),
+        ("coste_unitario", pa.decimal128(38, 9)),
+        ("venta_unidades", pa.int64()),
+        ("elasticidad_promedio_historico", pa.float64()),
+        ("es_promocion", pa.bool_()),
+    ]
+)
+
+
+def lotes_prep_optimizacion(filas: int = 600, por_lote: int = 250):
+    """Lotes sintéticos con el esquema de tabla_prep_optimizacion_semanal"""
+    rng = np.random.default_rng(7)
+    inicio = datetime.date(2023, 1, 2)
+    for desde in range(0, filas, por_lote):
+        n = min(por_lote, filas - desde)
+        i = np.arange(desde, desde + n)
+        precios = np.round(rng.uniform(10, 500, n), 2)
+        yield pa.record_batch(
+            [
+                pa.array([inicio + datetime.timedelta(weeks=int(k % 52)) for k in i]),
+                pa.array([f"MAT{k % 40:05d}" for k in i]),
+                pa.array([f"Z{k % 5}" for k in i]),
+                pa.array(["TR" if k % 3 else "MA" for k in i]),
+                pa.array([f"GA{k % 4}" for k in i]),
+                pa.array([Decimal(f"{p:.2f}") for p in precios], pa.decimal128(38, 9)),
+                pa.array(
+                    [Decimal(f"{p * 0.7:.2f}") for p in precios], pa.decimal128(38, 9)
+                ),
+                pa.array([None if k % 17 == 0 else int(k % 90) for k in i], pa.int64()),
+                pa.array(rng.normal(-1.2, 0.4, n)),
+                pa.array([bool(k % 11 == 0) for k in i]),
+            ],
+            schema=ESQUEMA,
+        )
+
+
+if __name__ == "__main__":
+    ruta = CARPETA / "prep_optimizacion_semanal.arrow"
+    print(f"{guardar_lotes(lotes_prep_optimizacion(), ruta)} filas en {ruta}")
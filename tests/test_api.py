@@ -37,27 +37,31 @@ def test_dev_execute_flow():
         ]
     }
 
-    response = client.post("/dev/execute", json=flow_data)
-    assert response.status_code == 200
+    # El lifespan detiene los flujos en segundo plano al cerrar el cliente
+    with TestClient(app) as client:
+        response = client.post("/dev/execute", json=flow_data)
+        assert response.status_code == 202
 
-    data = response.json()
-    assert "flow_id" in data
-    assert data["environment"] == "dev"
-    assert data["total_steps"] == 2
-    assert "results" in data
+        data = response.json()
+        assert "flow_id" in data
+        assert data["environment"] == "dev"
+        assert data["status"] == "running"
+        assert data["total_steps"] == 2
+        assert "results" in data
 
 
 def test_prd_execute_flow():
     """Test del endpoint de ejecución en PRD"""
     flow_data = {"flow": [{"step": 1, "type": "script", "name": "suavizado.py"}]}
 
-    response = client.post("/prd/execute", json=flow_data)
-    assert response.status_code == 200
+    with TestClient(app) as client:
+        response = client.post("/prd/execute", json=flow_data)
+        assert response.status_code == 202
 
-    data = response.json()
-    assert "flow_id" in data
-    assert data["environment"] == "prd"
-    assert data["total_steps"] == 1
+        data = response.json()
+        assert "flow_id" in data
+        assert data["environment"] == "prd"
+        assert data["total_steps"] == 1
 
 
 def test_invalid_flow():
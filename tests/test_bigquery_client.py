@@ -0,0 +1,72 @@
+"""
+Tests para los clientes de BigQuery compartidos
+"""
+
+import threading
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+from app import bigquery_client
+from app.bigquery_client import get_client
+from app.config import settings
+from app.services.script_worker import _shared_bigquery_client
+
+
+@pytest.fixture(autouse=True)
+def credenciales_locales(monkeypatch):
+    """Application Default Credentials falsas y caché vacía"""
+    llamadas = []
+
+    def default(scopes=None):
+        llamadas.append(scopes)
+        return AnonymousCredentials(), "proyecto-adc"
+
+    monkeypatch.setattr("google.auth.default", default)
+    monkeypatch.setattr(bigquery_client, "_clients", {})
+    return llamadas
+
+
+def test_un_cliente_por_combinacion(credenciales_locales, monkeypatch):
+    """Se reutiliza el cliente por (proyecto, ubicación, credenciales)"""
+    monkeypatch.setattr(settings, "BIGQUERY_HTTP_POOL_SIZE", 7)
+
+    cliente = get_client()
+    assert get_client() is cliente
+    assert cliente.project == "proyecto-adc"
+    assert get_client(location="US") is not cliente
+    assert get_client(project="otro") is get_client(project="otro")
+    assert len(credenciales_locales) == 3
+
+    adaptador = cliente._http.get_adapter("https://bigquery.googleapis.com")
+    assert adaptador._pool_maxsize == 7
+
+
+def test_concurrencia_crea_un_solo_cliente(credenciales_locales):
+    """Hilos que piden el cliente a la vez comparten el mismo"""
+    clientes = []
+    hilos = [
+        threading.Thread(target=lambda: clientes.append(get_client())) for _ in range(8)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len({id(c) for c in clientes}) == 1
+    assert len(credenciales_locales) == 1
+
+
+def test_worker_comparte_bigquery_client():
+    """En los workers ``bigquery.Client()`` devuelve el cliente compartido"""
+    creados = []
+
+    class _Cliente:
+        def __init__(self, *args, **kwargs):
+            creados.append(kwargs)
+
+    envuelto = _shared_bigquery_client(_Cliente)
+
+    assert envuelto() is get_client()
+    assert isinstance(envuelto(project="p"), _Cliente)
+    assert creados == [{"project": "p"}]
@@ -0,0 +1,186 @@
+"""
+Tests para el envío y la consulta asíncrona de jobs de BigQuery
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.config import settings
+from app.models.flow import FlowStep
+from app.services.bigquery_service import BigQueryService
+from app.services.flow_executor import FlowExecutor
+
+
+class _Filas(list):
+    @property
+    def total_rows(self):
+        return len(self)
+
+
+class _JobFalso:
+    """Job que pasa de PENDING a RUNNING y a DONE según el tiempo transcurrido"""
+
+    def __init__(self, duracion, filas=()):
+        self.job_id = f"job-{id(self)}"
+        self.inicio = time.monotonic()
+        self.duracion = duracion
+        self.filas = _Filas(filas)
+        self.state = "PENDING"
+        self.reloads = 0
+        self.num_dml_affected_rows = None
+        self.started = self.ended = None
+        self.hilos = set()
+
+    def reload(self):
+        self.reloads += 1
+        self.hilos.add(threading.current_thread().name)
+        transcurrido = time.monotonic() - self.inicio
+        if transcurrido >= self.duracion:
+            self.state = "DONE"
+        elif transcurrido >= self.duracion / 3:
+            self.state = "RUNNING"
+
+    def result(self, max_results=None):
+        assert self.state == "DONE", "result() no debe esperar a que el job termine"
+        return self.filas
+
+    def cancel(self):
+        return True
+
+
+class _ClienteFalso:
+    def __init__(self, duracion, filas=()):
+        self.duracion = duracion
+        self.filas = filas
+        self.jobs = []
+
+    def query(self, query, job_config=None):
+        self.jobs.append(_JobFalso(self.duracion, self.filas))
+        return self.jobs[-1]
+
+
+@pytest.fixture
+def poll_rapido(monkeypatch):
+    monkeypatch.setattr(settings, "BIGQUERY_POLL_INITIAL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "BIGQUERY_POLL_MAX_SECONDS", 0.04)
+    monkeypatch.setattr(settings, "BIGQUERY_THREADS", 2)
+
+
+@pytest.mark.asyncio
+async def test_eventos_de_estado_y_espera_creciente(poll_rapido):
+    """Se reporta cada cambio de estado y las consultas se espacian"""
+    servicio = BigQueryService()
+    servicio.client = _ClienteFalso(duracion=0.3, filas=[{"a": 1}])
+    eventos = []
+
+    filas = await servicio.run_query("SELECT 1")
+    job = servicio.client.jobs[0]
+    await servicio.wait_job(job, on_event=eventos.append)
+
+    assert filas == [{"a": 1}]
+    assert [e["state"] for e in eventos] == ["DONE"]
+    # Con espera fija de 0.01s serían ~30 consultas
+    assert job.reloads < 15
+    assert all(h.startswith("bigquery") for h in job.hilos)
+
+    servicio.client = _ClienteFalso(duracion=0.3)
+    job = await servicio._call(servicio._start_query, "SELECT 1")
+    await servicio.wait_job(job, on_event=eventos.append)
+    assert [e["state"] for e in eventos[1:]] == ["PENDING", "RUNNING", "DONE"]
+    assert eventos[-1]["elapsed_seconds"] >= 0.25
+
+
+@pytest.mark.asyncio
+async def test_jobs_concurrentes_no_ocupan_hilos(poll_rapido):
+    """Muchos jobs en curso no agotan el pool de hilos (2 hilos, 20 jobs)"""
+    servicio = BigQueryService()
+    servicio.client = _ClienteFalso(duracion=0.3)
+
+    inicio = time.monotonic()
+    await asyncio.gather(*(servicio.run_query("SELECT 1") for _ in range(20)))
+
+    # Esperando en hilos tomaría 20 * 0.3 / 2 = 3 segundos
+    assert time.monotonic() - inicio < 1.5
+
+
+@pytest.mark.asyncio
+async def test_paso_procedimiento_publica_eventos(poll_rapido, monkeypatch):
+    """Los eventos del job quedan en la salida y en el metadata del paso"""
+    servicio = BigQueryService()
+    servicio.client = _ClienteFalso(duracion=0.2)
+    monkeypatch.setattr("app.services.flow_executor.bigquery_service", servicio)
+    executor = FlowExecutor()
+
+    result = await executor._execute_step(
+        FlowStep(step=1, type="procedure", name="elasticidad"), "dev"
+    )
+
+    assert result.status == "success"
+    estados = [e["state"] for e in result.metadata["job_events"]]
+    assert estados == ["PENDING", "RUNNING", "DONE"]
+    assert result.output.startswith("Procedimiento ejecutado exitosamente")
+
+
+class _FilasPaginadas:
+    """RowIterator falso: total en metadatos y filas descargadas bajo demanda"""
+
+    def __init__(self, total, max_results, llamadas):
+        self.total_rows = total
+        self.max_results = max_results
+        self.llamadas = llamadas
+
+    def __iter__(self):
+        limite = self.total_rows if self.max_results is None else self.max_results
+        for i in range(min(limite, self.total_rows)):
+            self.llamadas["filas_descargadas"] += 1
+            yield {"id_material": i}
+
+
+class _JobGrande:
+    def __init__(self, llamadas):
+        self.job_id = "job-grande"
+        self.state = "DONE"
+        self.num_dml_affected_rows = None
+        self.started = self.ended = None
+        self.llamadas = llamadas
+
+    def result(self, max_results=None):
+        self.llamadas["result"] += 1
+        return _FilasPaginadas(1_000_000, max_results, self.llamadas)
+
+
+class _ClienteContador:
+    def __init__(self):
+        self.llamadas = {"query": 0, "result": 0, "filas_descargadas": 0}
+
+    def query(self, query, job_config=None):
+        self.llamadas["query"] += 1
+        return _JobGrande(self.llamadas)
+
+
+@pytest.mark.parametrize("preview_rows, esperadas", [(None, 5), (2, 2), (0, 0)])
+@pytest.mark.asyncio
+async def test_vista_previa_acotada(poll_rapido, monkeypatch, preview_rows, esperadas):
+    """Una sola llamada a result() y solo se descargan las filas de muestra"""
+    servicio = BigQueryService()
+    servicio.client = _ClienteContador()
+    monkeypatch.setattr("app.services.flow_executor.bigquery_service", servicio)
+    executor = FlowExecutor()
+
+    result = await executor._execute_step(
+        FlowStep(step=1, type="procedure", name="grande", preview_rows=preview_rows),
+        "dev",
+    )
+
+    assert result.status == "success"
+    assert servicio.client.llamadas == {
+        "query": 1,
+        "result": 1,
+        "filas_descargadas": esperadas,
+    }
+    assert "Filas devueltas: 1000000" in result.output
+    assert result.output.count("  Fila ") == esperadas
+    assert f"... y {1_000_000 - esperadas} filas más" in result.output
@@ -0,0 +1,88 @@
+"""
+Tests para la resolución de rangos de precio por grupo y canal
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from app.processing.bounds import agregar_limites, cargar_rangos
+
+
+def _rango_original(df_rangos, row):
+    """Regla original fila por fila de optimizacion_v3.py"""
+    k = {"PU": 1, "MM": 2, "MA": 3, "DI": 4}.get(row["id_canal_venta"], 1)
+    return df_rangos[df_rangos["grupo_articulo"] == row["grupo_articulo"]].iat[0, k]
+
+
+def test_agregar_limites_igual_a_regla_original():
+    """Los límites vectorizados coinciden con el filtrado por fila, incluido 'PU' por defecto"""
+    df_rangos = cargar_rangos()
+    df = pd.DataFrame(
+        {
+            "grupo_articulo": ["RES", "LÁCTEOS", "AVES", "VÍSCERAS Y OTROS", "RES"],
+            "id_canal_venta": ["PU", "MM", "MA", "DI", "XX"],
+            "precio_unitario_promedio": [100.0, 20.5, 55.0, 12.3, 80.0],
+        }
+    )
+
+    agregar_limites(df, df_rangos)
+
+    for _, row in df.iterrows():
+        rango = _rango_original(df_rangos, row)
+        assert row["precio_min"] == (1.0 - rango) * row["precio_unitario_promedio"]
+        assert row["precio_max"] == (1.0 + rango) * row["precio_unitario_promedio"]
+
+
+def test_agregar_limites_grupo_desconocido():
+    """Un grupo sin rango produce un error explícito"""
+    df = pd.DataFrame(
+        {
+            "grupo_articulo": ["NUEVO"],
+            "id_canal_venta": ["PU"],
+            "precio_unitario_promedio": [10.0],
+        }
+    )
+    with pytest.raises(ValueError, match="NUEVO"):
+        agregar_limites(df)
+
+
+def test_cargar_rangos_desde_json(tmp_path):
+    """La matriz se puede leer desde un archivo JSON externo"""
+    ruta = tmp_path / "rangos.json"
+    ruta.write_text(
+        json.dumps({"RES": {"PU": 0.1, "MM": 0.2, "MA": 0.3, "DI": 0.4}}),
+        encoding="utf-8",
+    )
+
+    df_rangos = cargar_rangos(str(ruta))
+
+    assert df_rangos.to_dict("records") == [
+        {"grupo_articulo": "RES", "PU": 0.1, "MM": 0.2, "MA": 0.3, "DI": 0.4}
+    ]
+    # Se lee una vez por proceso y cada llamada recibe su propia copia
+    df_rangos.loc[0, "PU"] = 0.9
+    ruta.unlink()
+    assert cargar_rangos(str(ruta)).loc[0, "PU"] == 0.1
+
+
+def test_agregar_limites_grupo_repetido():
+    """Con un grupo repetido en la matriz se usa la primera fila"""
+    df_rangos = pd.DataFrame(
+        [["RES", 0.1, 0.2, 0.3, 0.4], ["RES", 0.5, 0.6, 0.7, 0.8]],
+        columns=["grupo_articulo", "PU", "MM", "MA", "DI"],
+    )
+    df = pd.DataFrame(
+        {
+            "grupo_articulo": ["RES", "RES"],
+            "id_canal_venta": ["PU", "DI"],
+            "precio_unitario_promedio": [100.0, 100.0],
+        }
+    )
+
+    agregar_limites(df, df_rangos)
+
+    for _, row in df.iterrows():
+        rango = _rango_original(df_rangos, row)
+        assert row["precio_max"] == (1.0 + rango) * row["precio_unitario_promedio"]
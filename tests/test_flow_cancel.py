@@ -0,0 +1,158 @@
+"""
+Tests para la cancelación de flujos y el manejo de timeouts
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.models.flow import FlowStep
+from app.services.bigquery_service import bigquery_service
+from app.services.flow_executor import FlowExecutor
+from app.services.flow_runner import FlowRunner
+
+# Lanza un proceso hijo, registra su PID y espera
+DORMIDO = """
+import subprocess, sys, time
+from pathlib import Path
+hijo = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+(Path(__file__).parent / "pids.txt").write_text(f"{hijo.pid}\\n")
+print("durmiendo", flush=True)
+time.sleep(60)
+"""
+
+
+class _JobFalso:
+    """Job de BigQuery que sigue en ejecución hasta que se cancela"""
+
+    def __init__(self):
+        self.job_id = "job-falso"
+        self.state = "RUNNING"
+        self.cancelado = threading.Event()
+        self.iniciado = threading.Event()
+
+    def reload(self):
+        self.iniciado.set()
+
+    def result(self):
+        raise AssertionError("result() solo se consulta cuando el job termina")
+
+    def cancel(self):
+        self.cancelado.set()
+        return True
+
+
+class _ClienteFalso:
+    def __init__(self):
+        self.jobs = []
+
+    def query(self, query, job_config=None):
+        self.jobs.append(_JobFalso())
+        return self.jobs[-1]
+
+
+@pytest.fixture
+def cliente_falso(monkeypatch):
+    cliente = _ClienteFalso()
+    monkeypatch.setattr(bigquery_service, "client", cliente)
+    return cliente
+
+
+@pytest.fixture
+def scripts(tmp_path):
+    (tmp_path / "dev").mkdir()
+    (tmp_path / "dev" / "dormido.py").write_text(DORMIDO)
+    (tmp_path / "dev" / "final.py").write_text("print('final')\n")
+    return tmp_path
+
+
+def _vivo(pid):
+    """Indica si el proceso sigue vivo un segundo después (la señal es asíncrona)"""
+    for _ in range(20):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # Un proceso zombie ya terminó aunque siga en la tabla de procesos
+                if f.read().split()[2] == "Z":
+                    return False
+        except FileNotFoundError:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+async def _esperar(condicion, intentos=200):
+    for _ in range(intentos):
+        if await condicion():
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError("La condición no se cumplió a tiempo")
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="Requiere /proc (Linux)")
+@pytest.mark.asyncio
+async def test_cancelar_flujo(scripts, cliente_falso):
+    """Termina el script con sus hijos, cancela el job y marca los pasos"""
+    executor = FlowExecutor()
+    executor.scripts_path = scripts
+    runner = FlowRunner(executor)
+    pasos = [
+        FlowStep(step=1, type="script", name="dormido.py", depends_on=[]),
+        FlowStep(step=2, type="procedure", name="lento", depends_on=[]),
+        FlowStep(step=3, type="script", name="final.py", depends_on=[1, 2]),
+    ]
+    flow = await runner.submit(pasos, "dev")
+
+    async def en_curso():
+        pasos = await runner.get_steps(flow.flow_id)
+        return (scripts / "dev" / "pids.txt").exists() and pasos[0].output
+
+    await _esperar(en_curso)
+    await asyncio.to_thread(cliente_falso.jobs[0].iniciado.wait, 5)
+    hijo = int((scripts / "dev" / "pids.txt").read_text())
+
+    final = await runner.cancel(flow.flow_id)
+
+    assert final.status == "cancelled"
+    assert [r.status for r in final.results] == ["cancelled"] * 3
+    assert final.results[0].output == "durmiendo\n"
+    assert final.error_summary == "Flujo cancelado (3 pasos cancelados)"
+    assert cliente_falso.jobs[0].cancelado.is_set()
+    assert not _vivo(hijo)
+    assert not runner.is_running(flow.flow_id)
+    with pytest.raises(RuntimeError):
+        await runner.cancel(flow.flow_id)
+    assert await runner.cancel("no-existe") is None
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="Requiere /proc (Linux)")
+@pytest.mark.asyncio
+async def test_timeout_termina_hijos_y_cancela_job(scripts, cliente_falso, monkeypatch):
+    """Un timeout termina el grupo del script y cancela el job de BigQuery"""
+    monkeypatch.setattr(settings, "PROCEDURE_TIMEOUT", 0.3)
+    executor = FlowExecutor()
+    executor.scripts_path = scripts
+    pasos = [
+        FlowStep(step=1, type="script", name="dormido.py", timeout=2),
+        FlowStep(step=2, type="procedure", name="lento"),
+    ]
+
+    flow = await executor.execute_flow(pasos, "dev")
+
+    script, procedimiento = flow.results
+    assert script.status == "error" and "timeout" in script.error
+    assert not _vivo(int((scripts / "dev" / "pids.txt").read_text()))
+    assert procedimiento.status == "error" and "cancelado" in procedimiento.error
+    assert cliente_falso.jobs[0].cancelado.is_set()
+
+
+def test_api_cancel_errores():
+    """Flujo inexistente: 404"""
+    with TestClient(app) as client:
+        response = client.post("/flows/no-existe/cancel")
+    assert response.status_code == 404
@@ -0,0 +1,148 @@
+"""
+Tests para los checkpoints y la reanudación de flujos
+"""
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.flow import FailurePolicy, FlowStep, StepResult
+from app.services.checkpoint_store import (
+    FlowCheckpoint,
+    InMemoryCheckpointStore,
+    SQLiteCheckpointStore,
+)
+from app.services.flow_executor import FlowExecutor
+from app.services.flow_runner import FlowRunner
+
+# Cada script registra su ejecución; "falla.py" falla hasta que exista "arreglado"
+SCRIPT = """
+from pathlib import Path
+carpeta = Path(__file__).parent
+with open(carpeta / "ejecuciones.txt", "a") as f:
+    f.write(Path(__file__).name + "\\n")
+if Path(__file__).name == "falla.py" and not (carpeta / "arreglado").exists():
+    raise SystemExit("datos incompletos")
+print("listo")
+"""
+
+
+@pytest.fixture
+def scripts(tmp_path):
+    (tmp_path / "dev").mkdir()
+    for nombre in ["uno.py", "falla.py", "tres.py", "cuatro.py"]:
+        (tmp_path / "dev" / nombre).write_text(SCRIPT)
+    return tmp_path
+
+
+def _ejecuciones(scripts):
+    return (scripts / "dev" / "ejecuciones.txt").read_text().split()
+
+
+def _runner(scripts, checkpoints=None):
+    executor = FlowExecutor()
+    executor.scripts_path = scripts
+    return FlowRunner(executor, checkpoints=checkpoints)
+
+
+def _paso(step, name, depends_on=None):
+    return FlowStep(step=step, type="script", name=name, depends_on=depends_on)
+
+
+@pytest.mark.parametrize("tipo", ["memoria", "sqlite"])
+@pytest.mark.asyncio
+async def test_checkpoint_store(tipo, tmp_path):
+    """Guarda la definición y el último resultado de cada paso"""
+    if tipo == "memoria":
+        store = InMemoryCheckpointStore()
+    else:
+        store = SQLiteCheckpointStore(str(tmp_path / "checkpoints" / "flujos.db"))
+    pasos = [_paso(1, "uno.py"), _paso(2, "falla.py", depends_on=[])]
+    await store.save_definition(
+        FlowCheckpoint(
+            flow_id="f1",
+            environment="dev",
+            on_failure=FailurePolicy.STOP,
+            steps=pasos,
+        )
+    )
+    for status in ["error", "success"]:
+        await store.save_step(
+            "f1",
+            StepResult(
+                step=2,
+                type="script",
+                name="falla.py",
+                status=status,
+                start_time=datetime(2024, 1, 1),
+            ),
+        )
+
+    checkpoint = await store.load("f1")
+
+    assert checkpoint.on_failure == FailurePolicy.STOP
+    assert checkpoint.steps == pasos
+    assert list(checkpoint.results) == [2]
+    assert checkpoint.results[2].status == "success"
+    assert await store.load("otro") is None
+
+
+@pytest.mark.asyncio
+async def test_reanudar_desde_el_paso_fallido(scripts, tmp_path):
+    """Solo se ejecutan los pasos fallidos/omitidos; los exitosos se reutilizan"""
+    checkpoints = SQLiteCheckpointStore(str(tmp_path / "checkpoints.db"))
+    runner = _runner(scripts, checkpoints)
+    pasos = [_paso(1, "uno.py"), _paso(2, "falla.py"), _paso(3, "tres.py")]
+
+    flow = await runner.submit(pasos, "dev", on_failure=FailurePolicy.STOP)
+    await runner.wait(flow.flow_id)
+    primero = await runner.get_flow(flow.flow_id)
+    assert [r.status for r in primero.results] == ["success", "error", "skipped"]
+
+    (scripts / "dev" / "arreglado").touch()
+    # Un runner nuevo (p. ej. otra instancia) reanuda desde el checkpoint en disco
+    runner = _runner(scripts, SQLiteCheckpointStore(str(tmp_path / "checkpoints.db")))
+    reanudado = await runner.resume(flow.flow_id)
+    assert reanudado.flow_id == flow.flow_id
+    assert [r.status for r in reanudado.results] == ["success", "pending", "pending"]
+    await runner.wait(flow.flow_id)
+
+    final = await runner.get_flow(flow.flow_id)
+    assert final.status == "success"
+    assert final.successful_steps == 3
+    assert final.results[0] == primero.results[0]
+    assert _ejecuciones(scripts) == ["uno.py", "falla.py", "falla.py", "tres.py"]
+
+    with pytest.raises(ValueError):
+        await runner.resume(flow.flow_id)
+
+
+@pytest.mark.asyncio
+async def test_reanudar_incluyendo_dependientes(scripts):
+    """include_downstream vuelve a ejecutar los dependientes exitosos"""
+    runner = _runner(scripts)
+    pasos = [
+        _paso(1, "uno.py", depends_on=[]),
+        _paso(2, "falla.py", depends_on=[]),
+        _paso(3, "tres.py", depends_on=[2]),
+        _paso(4, "cuatro.py", depends_on=[3]),
+    ]
+    flow = await runner.submit(pasos, "dev")
+    await runner.wait(flow.flow_id)
+    (scripts / "dev" / "arreglado").touch()
+    (scripts / "dev" / "ejecuciones.txt").unlink()
+
+    await runner.resume(flow.flow_id, include_downstream=True)
+    await runner.wait(flow.flow_id)
+
+    assert (await runner.get_flow(flow.flow_id)).status == "success"
+    assert _ejecuciones(scripts) == ["falla.py", "tres.py", "cuatro.py"]
+
+
+def test_api_resume_errores():
+    """Flujo inexistente: 404"""
+    with TestClient(app) as client:
+        response = client.post("/flows/no-existe/resume")
+    assert response.status_code == 404
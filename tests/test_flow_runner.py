@@ -0,0 +1,134 @@
+"""
+Tests para la ejecución de flujos en segundo plano y su almacenamiento
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app, flow_executor
+from app.models.flow import FlowStep
+from app.services.flow_executor import FlowExecutor
+from app.services.flow_runner import FlowRunner
+from app.services.flow_store import InMemoryFlowStore, SQLFlowStore
+
+
+@pytest.fixture
+def scripts(tmp_path):
+    """Directorio de scripts con un paso lento, uno rápido y uno que falla"""
+    (tmp_path / "dev").mkdir()
+    (tmp_path / "dev" / "lento.py").write_text(
+        "import time\ntime.sleep(0.5)\nprint('lento listo')\n"
+    )
+    (tmp_path / "dev" / "rapido.py").write_text("print('rapido listo')\n")
+    (tmp_path / "dev" / "falla.py").write_text("raise SystemExit('sin datos')\n")
+    return tmp_path
+
+
+def _pasos(*nombres):
+    return [
+        FlowStep(step=i, type="script", name=nombre)
+        for i, nombre in enumerate(nombres, start=1)
+    ]
+
+
+async def _verificar_store(store):
+    """Guarda un flujo, actualiza un paso y lo consulta de vuelta"""
+    flow = FlowExecutor().create_flow(_pasos("lento.py", "rapido.py"), "dev")
+    await store.save_flow(flow)
+
+    paso = flow.results[0].model_copy(update={"status": "success", "output": "ok"})
+    await store.save_step(flow.flow_id, paso)
+
+    guardado = await store.get_flow(flow.flow_id)
+    assert guardado.status == "running"
+    assert [r.status for r in guardado.results] == ["success", "pending"]
+    assert (await store.get_steps(flow.flow_id))[0].output == "ok"
+
+    await store.save_flow(guardado.model_copy(update={"status": "success"}))
+    assert (await store.get_flow(flow.flow_id)).status == "success"
+    assert await store.get_flow("no-existe") is None
+    assert await store.get_steps("no-existe") is None
+
+
+@pytest.mark.asyncio
+async def test_in_memory_flow_store():
+    """El store en memoria guarda copias y reemplaza pasos por número"""
+    await _verificar_store(InMemoryFlowStore())
+
+
+@pytest.mark.asyncio
+async def test_sql_flow_store(tmp_path, monkeypatch):
+    """El store SQL funciona sobre el DatabaseManager (SQLite como sustituto)"""
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("greenlet")
+    from app.utils.database import DatabaseManager, settings
+
+    monkeypatch.setattr(
+        settings, "DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'flows.db'}"
+    )
+    db = DatabaseManager()
+    await db.initialize()
+    store = SQLFlowStore(db)
+    await store.initialize()
+    try:
+        await _verificar_store(store)
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_flow_runner_publica_avance(scripts):
+    """El runner responde de inmediato y publica el avance de cada paso"""
+    executor = FlowExecutor()
+    executor.scripts_path = scripts
+    runner = FlowRunner(executor)
+
+    flow = await runner.submit(_pasos("lento.py", "falla.py", "rapido.py"), "dev")
+
+    assert flow.status == "running"
+    assert runner.is_running(flow.flow_id)
+    assert [r.status for r in flow.results] == ["pending"] * 3
+
+    await runner.wait(flow.flow_id)
+
+    final = await runner.get_flow(flow.flow_id)
+    assert final.status == "partial_success"
+    assert [r.status for r in final.results] == ["success", "error", "success"]
+    assert "sin datos" in final.results[1].error
+    assert final.results[0].output.strip() == "lento listo"
+    assert not runner.is_running(flow.flow_id)
+
+
+def test_api_consulta_flujo_en_segundo_plano(scripts, monkeypatch):
+    """POST responde 202 y GET /flows/{id} muestra el avance hasta terminar"""
+    monkeypatch.setattr(flow_executor, "scripts_path", scripts)
+    flow_data = {
+        "flow": [
+            {"step": 1, "type": "script", "name": "lento.py"},
+            {"step": 2, "type": "script", "name": "rapido.py"},
+        ]
+    }
+
+    with TestClient(app) as client:
+        response = client.post("/dev/execute", json=flow_data)
+        assert response.status_code == 202
+        flow_id = response.json()["flow_id"]
+
+        pasos = client.get(f"/flows/{flow_id}/steps").json()
+        assert [p["status"] for p in pasos] == ["running", "pending"]
+
+        limite = time.monotonic() + 10
+        while client.get(f"/flows/{flow_id}").json()["status"] == "running":
+            assert time.monotonic() < limite
+            time.sleep(0.05)
+
+        data = client.get(f"/flows/{flow_id}").json()
+        assert data["status"] == "success"
+        assert [r["output"].strip() for r in data["results"]] == [
+            "lento listo",
+            "rapido listo",
+        ]
+        assert client.get("/flows/no-existe").status_code == 404
+        assert client.get("/flows/no-existe/steps").status_code == 404
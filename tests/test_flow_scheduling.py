@@ -0,0 +1,183 @@
+"""
+Tests para la programación de pasos por dependencias (DAG)
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.flow import (
+    FailurePolicy,
+    FlowStep,
+    StepResult,
+    find_cycle,
+    resolve_dependencies,
+)
+from app.services.flow_executor import FlowExecutor
+
+client = TestClient(app)
+
+
+def _paso(step, depends_on=None, on_failure=None):
+    return FlowStep(
+        step=step,
+        type="procedure",
+        name=f"p{step}",
+        depends_on=depends_on,
+        on_failure=on_failure,
+    )
+
+
+class _EjecutorFalso(FlowExecutor):
+    """Ejecutor que simula cada paso y registra el orden y la concurrencia"""
+
+    def __init__(self, duracion=0.05, fallan=()):
+        super().__init__()
+        self.duracion = duracion
+        self.fallan = set(fallan)
+        self.activos = 0
+        self.max_activos = 0
+        self.inicios = []
+        self.fines = []
+
+    async def _execute_step(self, step, environment, output=None):
+        self.inicios.append(step.step)
+        self.activos += 1
+        self.max_activos = max(self.max_activos, self.activos)
+        await asyncio.sleep(self.duracion)
+        self.activos -= 1
+        self.fines.append(step.step)
+        return StepResult(
+            step=step.step,
+            type=step.type,
+            name=step.name,
+            status="error" if step.step in self.fallan else "success",
+            start_time=datetime.now(),
+            error=f"falla p{step.step}" if step.step in self.fallan else None,
+        )
+
+
+def _flujo_semanal():
+    """Unificación, cuatro indicadores externos independientes y consolidación"""
+    return [
+        _paso(1),
+        _paso(2, [1]),
+        _paso(3, [1]),
+        _paso(4, [1]),
+        _paso(5, [1]),
+        _paso(6, [2, 3, 4, 5]),
+    ]
+
+
+def test_resolve_dependencies_por_defecto_secuencial():
+    """Sin depends_on cada paso depende del anterior; [] es un paso raíz"""
+    assert resolve_dependencies([_paso(2), _paso(1), _paso(3, [])]) == {
+        1: [],
+        2: [1],
+        3: [],
+    }
+    with pytest.raises(ValueError, match="inexistentes"):
+        resolve_dependencies([_paso(1), _paso(2, [7])])
+    with pytest.raises(ValueError, match="sí mismo"):
+        resolve_dependencies([_paso(1, [1])])
+
+
+def test_find_cycle():
+    """Detecta ciclos y devuelve el recorrido del ciclo"""
+    assert find_cycle({1: [], 2: [1], 3: [1, 2]}) is None
+    assert find_cycle({1: [3], 2: [1], 3: [2]}) == [1, 3, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_pasos_independientes_en_paralelo():
+    """Los indicadores corren a la vez y la consolidación espera a todos"""
+    executor = _EjecutorFalso()
+
+    flow = await executor.execute_flow(_flujo_semanal(), "dev", max_concurrency=4)
+
+    assert flow.status == "success"
+    assert [r.step for r in flow.results] == [1, 2, 3, 4, 5, 6]
+    assert executor.max_activos == 4
+    assert executor.inicios[0] == 1 and executor.inicios[-1] == 6
+    assert set(executor.fines[1:5]) == {2, 3, 4, 5}
+
+
+@pytest.mark.asyncio
+async def test_concurrencia_maxima_y_secuencial_por_defecto():
+    """Se respeta el máximo de concurrencia y sin dependencias no hay paralelismo"""
+    executor = _EjecutorFalso(duracion=0.01)
+    await executor.execute_flow(_flujo_semanal(), "dev", max_concurrency=2)
+    assert executor.max_activos == 2
+
+    executor = _EjecutorFalso(duracion=0.01)
+    await executor.execute_flow([_paso(i) for i in range(1, 5)], "dev")
+    assert executor.max_activos == 1
+    assert executor.inicios == [1, 2, 3, 4]
+
+
+def test_validate_y_execute_rechazan_ciclos():
+    """/flows/validate reporta el ciclo y /dev/execute lo rechaza con 422"""
+    flow = [
+        {"step": 1, "type": "procedure", "name": "a", "depends_on": [3]},
+        {"step": 2, "type": "procedure", "name": "b", "depends_on": [1]},
+        {"step": 3, "type": "procedure", "name": "c", "depends_on": [2]},
+    ]
+
+    response = client.post("/flows/validate", json={"flow": flow})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["valid"] is False
+    assert data["errors"] == ["Ciclo de dependencias entre pasos: 1 -> 3 -> 2 -> 1"]
+
+    assert client.post("/dev/execute", json={"flow": flow}).status_code == 422
+
+
+def _estados(flow):
+    return {r.step: r.status for r in flow.results}
+
+
+@pytest.mark.asyncio
+async def test_politica_continue_ejecuta_todo():
+    """Con continue (por defecto) los dependientes del paso fallido se ejecutan"""
+    executor = _EjecutorFalso(duracion=0, fallan={3})
+
+    flow = await executor.execute_flow(_flujo_semanal(), "dev")
+
+    assert _estados(flow) == {i: "error" if i == 3 else "success" for i in range(1, 7)}
+    assert flow.status == "partial_success" and flow.skipped_steps == 0
+
+
+@pytest.mark.asyncio
+async def test_politica_skip_dependents_omite_la_rama():
+    """Se omiten los dependientes directos e indirectos; las otras ramas siguen"""
+    executor = _EjecutorFalso(duracion=0, fallan={3})
+    pasos = _flujo_semanal() + [_paso(7, [6]), _paso(8, [2])]
+
+    flow = await executor.execute_flow(
+        pasos, "dev", on_failure=FailurePolicy.SKIP_DEPENDENTS
+    )
+
+    estados = _estados(flow)
+    assert estados[3] == "error"
+    assert estados[6] == estados[7] == "skipped"
+    assert estados[2] == estados[4] == estados[5] == estados[8] == "success"
+    assert 6 not in executor.inicios and 7 not in executor.inicios
+    assert flow.results[6].output == "Depende del paso 3 que falló"
+    assert flow.skipped_steps == 2 and flow.failed_steps == 1
+
+
+@pytest.mark.asyncio
+async def test_politica_stop_por_paso():
+    """La política del paso tiene prioridad y stop no inicia más pasos"""
+    executor = _EjecutorFalso(duracion=0, fallan={1, 2})
+    pasos = [_paso(1), _paso(2, on_failure=FailurePolicy.STOP), _paso(3), _paso(4)]
+
+    flow = await executor.execute_flow(pasos, "dev")
+
+    assert _estados(flow) == {1: "error", 2: "error", 3: "skipped", 4: "skipped"}
+    assert executor.inicios == [1, 2]
+    assert flow.status == "error"
+    assert flow.error_summary.endswith("(2 pasos omitidos)")
@@ -0,0 +1,137 @@
+"""
+Tests para el registro de indicadores externos
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from google.cloud import bigquery
+
+from app.processing.indicators import (
+    INDICADORES,
+    Indicador,
+    ejecutar_indicadores,
+    procesar_indicador,
+)
+
+
+def _tasa_ocupacion() -> pd.DataFrame:
+    """Tasa de ocupación trimestral por entidad, desordenada"""
+    rng = np.random.default_rng(11)
+    filas = []
+    for entidad in ["Jalisco", "Nuevo León", "Yucatán"]:
+        tasa = 55.0
+        for periodo in range(2019, 2024):
+            for trimestre in range(1, 5):
+                tasa *= 1 + rng.choice([0.0, 0.004, -0.003, 0.02, -0.025])
+                filas.append([periodo, trimestre, entidad, tasa])
+    df = pd.DataFrame(
+        filas, columns=["Periodo", "Trimestre", "Entidad_Federativa", "tasa_ocupacion"]
+    )
+    return df.sample(frac=1, random_state=2)
+
+
+def _ciclo_tasa(df_t: pd.DataFrame) -> list:
+    """Ciclo iterrows() original para la tasa de ocupación (sin el valor lag)"""
+    ent = ""
+    tasas = []
+    for _, row in df_t.iterrows():
+        if ent != row["Entidad_Federativa"]:
+            ent = row["Entidad_Federativa"]
+            tasa_anterior = row["tasa_ocupacion"]
+        elif not abs(row["tasa_ocupacion"] - tasa_anterior) / tasa_anterior < 0.01:
+            tasa_anterior = row["tasa_ocupacion"]
+        tasas.append(tasa_anterior)
+    return tasas
+
+
+def _indicador(nombre: str) -> Indicador:
+    return next(i for i in INDICADORES if i.nombre == nombre)
+
+
+def test_procesar_indicador_tasa_ocupacion():
+    """La tasa se propaga por entidad y se depuran los valores repetidos"""
+    df = _tasa_ocupacion()
+
+    esperado = df.sort_values(by=["Entidad_Federativa", "Periodo", "Trimestre"])
+    esperado["tasa_ocupacion"] = _ciclo_tasa(esperado)
+    esperado = esperado[
+        ["Entidad_Federativa", "Periodo", "Trimestre", "tasa_ocupacion"]
+    ].drop_duplicates(subset=["Entidad_Federativa", "tasa_ocupacion"], keep="first")
+
+    resultado = procesar_indicador(df, _indicador("tasa_ocupacion"))
+
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+
+class _ClienteFalso:
+    """Cliente BigQuery mínimo que registra cargas y el hilo de cada consulta"""
+
+    def __init__(self):
+        self.cargas = {}
+        self.hilos = set()
+        self._barrera = threading.Barrier(len(INDICADORES), timeout=5)
+
+    def query(self, query):
+        self.hilos.add(threading.get_ident())
+        # Todas las consultas deben estar en curso a la vez
+        self._barrera.wait()
+        if "tasa_neta_ocupacion" in query:
+            return _Resultado(_tasa_ocupacion())
+        columna = "tipo_cambio_dia" if "tipo_cambio" in query else "inpc_avg"
+        fechas = pd.date_range("2024-01-01", periods=30)
+        valores = 20 * np.cumprod(np.full(30, 1.003))
+        return _Resultado(pd.DataFrame({"fecha": fechas, columna: valores}))
+
+    def load_table_from_file(self, archivo, table_id, size, job_config):
+        self.cargas[table_id] = pd.read_parquet(archivo)
+        return _Resultado(None)
+
+
+class _Resultado:
+    """Job y RowIterator mínimos sobre un DataFrame"""
+
+    def __init__(self, df):
+        self.df = df
+
+    def result(self):
+        return self
+
+    @property
+    def schema(self):
+        return [bigquery.SchemaField(c, "STRING") for c in self.df.columns]
+
+    def to_arrow_iterable(self, bqstorage_client=None):
+        yield from pa.Table.from_pandas(self.df, preserve_index=False).to_batches()
+
+
+def test_ejecutar_indicadores_concurrente():
+    """Los indicadores se consultan en paralelo y se escriben en su tabla"""
+    cliente = _ClienteFalso()
+
+    filas = ejecutar_indicadores(cliente, proyecto="proyecto")
+
+    assert len(cliente.hilos) == len(INDICADORES)
+    assert set(cliente.cargas) == {f"proyecto.{i.tabla_destino}" for i in INDICADORES}
+    assert filas == {
+        nombre: len(cliente.cargas[f"proyecto.{_indicador(nombre).tabla_destino}"])
+        for nombre in filas
+    }
+    # Variaciones de 0.3% diarias: el valor se mantiene hasta superar el 1%
+    tipo_cambio = cliente.cargas["proyecto.staging.variaciones_tipo_cambio_filtrado"]
+    assert list(tipo_cambio.columns) == ["fecha", "tipo_cambio_dia"]
+    assert tipo_cambio["tipo_cambio_dia"].is_monotonic_increasing
+
+
+def test_ejecutar_indicadores_propaga_errores():
+    """Un error en un indicador se reporta al terminar"""
+
+    class _ClienteConError(_ClienteFalso):
+        def query(self, query):
+            raise RuntimeError("consulta fallida")
+
+    with pytest.raises(RuntimeError, match="consulta fallida"):
+        ejecutar_indicadores(_ClienteConError(), proyecto="proyecto")
@@ -0,0 +1,94 @@
+"""
+Tests para la selección de modelo y la optimización en una sola pasada
+"""
+
+import pandas as pd
+
+from app.processing.model_selection import optimizar_por_modelo, seleccionar_modelo
+from app.processing.price_solver import calcular_efecto_externo, resolver_lote
+from tests.test_price_solver import _tabla_sintetica
+
+CLAVES = ["id_material", "id_zona", "id_canal_venta"]
+
+
+def _flujo_anterior(df, df_metodo):
+    """Resuelve ambos modelos para todas las filas y filtra con merge interno"""
+    salidas = []
+    for modelo in ["aproximada", "exacta"]:
+        res = resolver_lote(df.assign(efecto_externo=df[f"efecto_{modelo}"]), modelo)
+        res["test_porc_dif_precio"] = (
+            100 * (res["precio_sugerido"] - res["precio_actual"]) / res["precio_actual"]
+        )
+        res["test_porc_dif_ganancia"] = (
+            100
+            * (res["ganancia_nueva"] - res["ganancia_actual"])
+            / res["ganancia_actual"]
+        )
+        res["modelo"] = modelo
+        salidas.append(res)
+    df_unificado = pd.concat(salidas, ignore_index=True)
+    return df_unificado.merge(
+        df_metodo[CLAVES + ["modelo"]], on=CLAVES + ["modelo"], how="inner"
+    )
+
+
+def test_seleccionar_modelo():
+    """Criterios de elasticidad y precio; si difieren se usa exacta"""
+    df_check = pd.DataFrame(
+        {
+            "id_material": ["1", "2", "3"],
+            "id_zona": "Z1",
+            "id_canal_venta": "PU",
+            "elasticidad_promedio_historico_count": [20, None, 1],
+            "elasticidad_promedio_historico": [-0.5, -0.5, -0.5],
+        }
+    )
+    df_cambio = pd.DataFrame(
+        {
+            "id_material": ["1", "2", "3"],
+            "id_zona": "Z1",
+            "id_canal_venta": "PU",
+            "precio_unitario_promedio": [10.0, 10.0, 11.0],
+            "precio_unitario_promedio_anterior": [10.0, 10.0, 10.0],
+        }
+    )
+
+    df_metodo = seleccionar_modelo(df_check, df_cambio)
+
+    assert df_metodo["modelo"].tolist() == ["exacta", "aproximada", "exacta"]
+
+
+def test_optimizar_por_modelo_igual_al_flujo_anterior():
+    """Misma salida (orden y duplicados incluidos) resolviendo un solo modelo"""
+    df = _tabla_sintetica(filas=40)
+    df["efecto_aproximada"] = calcular_efecto_externo(df, "aproximada")
+    df["efecto_exacta"] = calcular_efecto_externo(df, "exacta")
+    df_metodo = pd.DataFrame(
+        {
+            "id_material": ["0", "1", "1", "5", "7", "7", "99"],
+            "id_zona": "Z1",
+            "id_canal_venta": df.set_index("id_material")
+            .reindex(["0", "1", "1", "5", "7", "7", "0"])["id_canal_venta"]
+            .tolist(),
+            "modelo": [
+                "exacta",
+                "aproximada",
+                "exacta",
+                "aproximada",
+                "exacta",
+                "exacta",
+                "exacta",
+            ],
+        }
+    )
+
+    df_salida, resumen = optimizar_por_modelo(
+        df,
+        df_metodo,
+        resolver_lote,
+        efectos={"aproximada": "efecto_aproximada", "exacta": "efecto_exacta"},
+    )
+
+    pd.testing.assert_frame_equal(df_salida, _flujo_anterior(df, df_metodo))
+    assert resumen["resoluciones"] == {"aproximada": 2, "exacta": 3}
+    assert resumen["resoluciones_evitadas"] == 2 * len(df) - 5
@@ -0,0 +1,29 @@
+"""
+Tests para la ejecución por fragmentos en varios procesos
+"""
+
+import pandas as pd
+
+from app.processing.parallel import dividir_fragmentos, ejecutar_por_fragmentos
+from app.processing.price_solver import resolver_lote
+from tests.test_price_solver import _tabla_sintetica
+
+
+def test_dividir_fragmentos_conserva_filas_y_orden():
+    """Los fragmentos cubren todas las filas en el orden original"""
+    df = pd.DataFrame({"x": range(10)})
+    fragmentos = dividir_fragmentos(df, 4)
+
+    assert len(fragmentos) == 4
+    assert pd.concat(fragmentos)["x"].tolist() == list(range(10))
+    assert len(dividir_fragmentos(df.head(2), 8)) == 2
+
+
+def test_ejecucion_en_paralelo_igual_a_secuencial():
+    """El resultado con varios procesos es idéntico al de un solo proceso"""
+    df = _tabla_sintetica(filas=97)
+
+    secuencial = ejecutar_por_fragmentos(resolver_lote, df, "exacta", workers=1)
+    paralelo = ejecutar_por_fragmentos(resolver_lote, df, "exacta", workers=3)
+
+    pd.testing.assert_frame_equal(secuencial, paralelo)
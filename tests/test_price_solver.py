@@ -0,0 +1,96 @@
+"""
+Tests para el motor vectorizado de optimización de precios
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.processing.price_solver import (
+    COLUMNAS_SALIDA,
+    MODELOS,
+    calcular_coef_k,
+    calcular_efecto_externo,
+    comparar_resultados,
+    resolver_lote,
+    resolver_slsqp,
+)
+
+
+def _tabla_sintetica(filas: int = 150, semilla: int = 7) -> pd.DataFrame:
+    """Tabla de optimización mínima con columnas externas"""
+    rng = np.random.default_rng(semilla)
+    precio = rng.uniform(10, 300, filas)
+    rango = rng.choice([0.02, 0.04, 0.06], filas)
+    df = pd.DataFrame(
+        {
+            "id_material": [str(i) for i in range(filas)],
+            "id_zona": "Z1",
+            "id_canal_venta": rng.choice(["PU", "MM"], filas),
+            "precio_unitario_promedio": precio,
+            "coste_unitario": precio * rng.uniform(0.5, 0.9, filas),
+            "unidades_sum_kgv": rng.uniform(1, 1000, filas),
+            "elasticidad_promedio_historico": rng.uniform(-2.5, -0.1, filas),
+            "precio_min": precio * (1 - rango),
+            "precio_max": precio * (1 + rango),
+        }
+    )
+    for elast, var, actual, base in [
+        (
+            "elasticidad_tasa_ocupacion",
+            "porc_var_tasa_ocupacion",
+            "tasa_ocupacion_avg_actual",
+            "tasa_ocupacion_avg",
+        ),
+        (
+            "elasticidad_tipo_cambio",
+            "porc_var_tipo_cambio",
+            "tipo_cambio_avg_actual",
+            "tipo_cambio_avg",
+        ),
+        (
+            "elasticidad_inpc",
+            "porc_var_inpc_nacional",
+            "inpc_nacional_actual",
+            "inpc_nacional",
+        ),
+        ("elasticidad_pib", "porc_var_pib", "pib_millones_actual", "pib_millones"),
+    ]:
+        df[elast] = rng.uniform(-1, 1, filas)
+        df[var] = rng.uniform(-2, 2, filas)
+        df[base] = rng.uniform(50, 150, filas)
+        df[actual] = df[base] * rng.uniform(0.98, 1.02, filas)
+    df["coef_k"] = calcular_coef_k(df["elasticidad_promedio_historico"])
+    return df
+
+
+@pytest.mark.parametrize("modelo", MODELOS)
+def test_resolver_lote_coincide_con_slsqp(modelo):
+    """El motor vectorizado iguala o mejora a SLSQP dentro de la tolerancia"""
+    df = _tabla_sintetica()
+    df["efecto_externo"] = calcular_efecto_externo(df, modelo)
+
+    lote = resolver_lote(df, modelo)
+    referencia = resolver_slsqp(df, modelo)
+
+    assert list(lote.columns) == COLUMNAS_SALIDA
+    assert lote["id_material"].tolist() == df["id_material"].tolist()
+    resumen = comparar_resultados(lote, referencia, tolerancia=1e-4)
+    assert resumen["dentro_de_tolerancia"], resumen
+
+
+def test_resolver_lote_respeta_limites_y_coste():
+    """El precio sugerido queda dentro del rango y sobre el coste"""
+    df = _tabla_sintetica()
+    lote = resolver_lote(df, "exacta")
+
+    precio = lote["precio_sugerido"].to_numpy()
+    assert np.all(precio >= df["precio_min"].to_numpy() - 1e-9)
+    assert np.all(precio <= df["precio_max"].to_numpy() + 1e-9)
+    assert np.all(precio >= df["coste_unitario"].to_numpy() + 0.01 - 1e-9)
+
+
+def test_resolver_lote_modelo_invalido():
+    """Un modelo desconocido produce ValueError"""
+    with pytest.raises(ValueError):
+        resolver_lote(_tabla_sintetica(5), "otro")
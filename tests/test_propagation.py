@@ -0,0 +1,120 @@
+"""
+Tests para la propagación de valores por grupo
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.processing.propagation import posiciones_ancla, propagar_valor
+
+CLAVES = ["id_material", "id_zona", "id_canal_venta"]
+
+
+def _ciclo_original(df_p: pd.DataFrame):
+    """Ciclo con iterrows() que usaba unificacion_precios_variacion.py"""
+    mat = ""
+    zona = ""
+    can = ""
+    precios = []
+    fechas = []
+    for index, row in df_p.iterrows():
+        if mat == "":
+            mat = row["id_material"]
+            zona = row["id_zona"]
+            can = row["id_canal_venta"]
+            precio_anterior = row["precio_unitario_promedio_anterior"]
+            fecha_anterior = row["fecha_semana_anterior"]
+        if (
+            mat == row["id_material"]
+            and zona == row["id_zona"]
+            and can == row["id_canal_venta"]
+        ):
+            if precio_anterior is not None:
+                if (
+                    abs(row["precio_unitario_promedio"] - precio_anterior)
+                    / precio_anterior
+                    < 0.01
+                ):
+                    precios.append(precio_anterior)
+                    fechas.append(fecha_anterior)
+                else:
+                    precio_anterior = row["precio_unitario_promedio"]
+                    fecha_anterior = row["fecha_semana"]
+                    precios.append(row["precio_unitario_promedio"])
+                    fechas.append(row["fecha_semana"])
+            else:
+                precio_anterior = row["precio_unitario_promedio"]
+                fecha_anterior = row["fecha_semana"]
+                precios.append(row["precio_unitario_promedio"])
+                fechas.append(row["fecha_semana"])
+        else:
+            mat = row["id_material"]
+            zona = row["id_zona"]
+            can = row["id_canal_venta"]
+            precio_anterior = row["precio_unitario_promedio"]
+            fecha_anterior = row["fecha_semana"]
+            precios.append(row["precio_unitario_promedio"])
+            fechas.append(row["fecha_semana"])
+    return precios, fechas
+
+
+def _tabla_precios(filas: int = 600, semilla: int = 3) -> pd.DataFrame:
+    """Tabla semanal con variaciones pequeñas, saltos y nulos"""
+    rng = np.random.default_rng(semilla)
+    precio = 100 * np.cumprod(1 + rng.choice([0.0, 0.004, -0.006, 0.03], filas))
+    precio[rng.choice(filas, 8, replace=False)] = np.nan
+    df = pd.DataFrame(
+        {
+            "id_material": rng.choice(["100", "200", "300"], filas),
+            "id_zona": rng.choice(["Z1", "Z2"], filas),
+            "id_canal_venta": rng.choice(["PU", "MM"], filas),
+            "fecha_semana": pd.Timestamp("2023-01-02")
+            + pd.to_timedelta(rng.permutation(filas) * 7, unit="D"),
+            "precio_unitario_promedio": precio,
+        }
+    )
+    df = df.sort_values(by=[*CLAVES, "fecha_semana"])
+    grupos = df.groupby(CLAVES)
+    df["precio_unitario_promedio_anterior"] = grupos["precio_unitario_promedio"].shift()
+    df["fecha_semana_anterior"] = grupos["fecha_semana"].shift()
+    return df.sample(frac=1, random_state=semilla)
+
+
+def test_propagar_valor_identico_al_ciclo_original():
+    """El kernel reproduce exactamente precios y fechas del ciclo iterrows()"""
+    df = _tabla_precios()
+
+    esperado = df.sort_values(by=[*CLAVES, "fecha_semana"])
+    precios, fechas = _ciclo_original(esperado)
+    esperado["precio_promedio_adaptado"] = precios
+    esperado["fecha_semana_adaptado"] = fechas
+
+    resultado = propagar_valor(
+        df,
+        claves=CLAVES,
+        orden=["fecha_semana"],
+        valor="precio_unitario_promedio",
+        columna_valor="precio_promedio_adaptado",
+        ancla_de="fecha_semana",
+        columna_ancla="fecha_semana_adaptado",
+    )
+
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+
+def test_propagar_valor_sin_claves_y_nombres_por_defecto():
+    """Sin claves se trata toda la tabla como una sola serie"""
+    df = pd.DataFrame({"fecha": [3, 1, 2, 4], "tipo_cambio": [20.1, 20.0, 20.05, 21.0]})
+    resultado = propagar_valor(df, claves=[], orden=["fecha"], valor="tipo_cambio")
+
+    assert resultado["fecha"].tolist() == [1, 2, 3, 4]
+    assert resultado["tipo_cambio_propagado"].tolist() == [20.0, 20.0, 20.0, 21.0]
+    assert "tipo_cambio" in df and "tipo_cambio_propagado" not in df
+
+
+def test_posiciones_ancla_reinicia_en_nulos_y_ceros():
+    """Un ancla nula o en cero no se conserva (el ciclo original fallaba en cero)"""
+    valores = np.array([0.0, 0.0, np.nan, 5.0, 5.01])
+    inicio = np.array([True, False, False, False, False])
+
+    assert posiciones_ancla(valores, inicio).tolist() == [0, 1, 2, 3, 3]
@@ -0,0 +1,143 @@
+"""
+Tests para la propagación en SQL (emulada con SQLite contra el camino de pandas)
+"""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from app.processing.propagation import propagar_valor
+from app.processing.propagation_sql import sql_filas_por_grupo, sql_propagacion
+from tests.test_propagation import CLAVES, _tabla_precios
+
+ORDEN = ["fecha_semana", *CLAVES]
+
+
+def _camino_pandas(df: pd.DataFrame) -> pd.DataFrame:
+    """Mismo resultado que escribe unificacion_precios_variacion.py con pandas"""
+    df_p = propagar_valor(
+        df,
+        claves=CLAVES,
+        orden=["fecha_semana"],
+        valor="precio_unitario_promedio",
+        columna_valor="precio_promedio_adaptado",
+        ancla_de="fecha_semana",
+        columna_ancla="fecha_semana_adaptado",
+    )
+    df_p["precio_unitario_promedio"] = df_p["precio_promedio_adaptado"]
+    return df_p.drop(columns=["precio_promedio_adaptado", "semana"])
+
+
+def _camino_sqlite(df: pd.DataFrame) -> pd.DataFrame:
+    """Ejecuta el SQL generado en SQLite y lee la tabla destino"""
+    with sqlite3.connect(":memory:") as conexion:
+        df.assign(fecha_semana=df["fecha_semana"].dt.strftime("%Y-%m-%d")).to_sql(
+            "origen", conexion, index=False
+        )
+        conexion.executescript(
+            sql_propagacion(
+                origen="origen",
+                destino="destino",
+                claves=CLAVES,
+                orden=["fecha_semana"],
+                valor="precio_unitario_promedio",
+                ancla_de="fecha_semana",
+                columna_ancla="fecha_semana_adaptado",
+                excluir=["semana"],
+                columnas=list(df.columns),
+                dialecto="sqlite",
+            )
+        )
+        resultado = pd.read_sql("SELECT * FROM destino", conexion)
+    for columna in ["fecha_semana", "fecha_semana_adaptado"]:
+        resultado[columna] = pd.to_datetime(resultado[columna])
+    return resultado
+
+
+def test_sql_propagacion_coincide_con_pandas():
+    """La consulta recursiva produce la misma tabla que el camino de pandas"""
+    df = _tabla_precios(filas=300)
+    df = df[[*CLAVES, "fecha_semana", "precio_unitario_promedio"]]
+    df.insert(4, "semana", df["fecha_semana"].dt.isocalendar().week.astype(int))
+    # Cada fila con una clave nula es su propio grupo, aunque las demás
+    # claves coincidan y el precio varíe menos del umbral
+    nulas = pd.DataFrame(
+        {
+            "id_material": [None, None, None, "100"],
+            "id_zona": ["Z1", "Z1", "Z1", None],
+            "id_canal_venta": ["PU", "PU", "PU", "MM"],
+            "fecha_semana": pd.to_datetime(
+                ["2030-01-07", "2030-01-14", "2030-01-21", "2030-01-07"]
+            ),
+            "semana": [2, 3, 3, 2],
+            "precio_unitario_promedio": [10.00, 10.05, 10.08, 10.0],
+        }
+    )
+    df = pd.concat([df, nulas], ignore_index=True)
+
+    esperado = _camino_pandas(df).sort_values(ORDEN, ignore_index=True)
+    resultado = _camino_sqlite(df).sort_values(ORDEN, ignore_index=True)
+
+    assert list(resultado.columns) == list(esperado.columns)
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False)
+    sin_material = resultado[resultado["id_material"].isna()]
+    assert sin_material["precio_unitario_promedio"].tolist() == [10.00, 10.05, 10.08]
+
+
+def test_sql_filas_por_grupo_omite_claves_nulas():
+    """El grupo más grande se cuenta sin las filas con claves nulas"""
+    df = pd.DataFrame(
+        {
+            "id_material": ["100", "100", "100", None, None, None, "200"],
+            "id_zona": ["Z1", "Z1", "Z2", "Z1", "Z1", "Z1", "Z1"],
+            "id_canal_venta": ["PU"] * 7,
+        }
+    )
+    with sqlite3.connect(":memory:") as conexion:
+        df.to_sql("origen", conexion, index=False)
+        por_grupo = conexion.execute(
+            sql_filas_por_grupo("origen", CLAVES, dialecto="sqlite")
+        ).fetchone()[0]
+        total = conexion.execute(
+            sql_filas_por_grupo("origen", [], dialecto="sqlite")
+        ).fetchone()[0]
+
+    assert por_grupo == 2
+    assert total == 7
+
+
+def test_sql_propagacion_bigquery_usa_except_replace():
+    """Sin lista de columnas, BigQuery reemplaza el valor con SELECT * EXCEPT/REPLACE"""
+    sql = sql_propagacion(
+        origen="staging.origen",
+        destino="proyecto.staging.destino",
+        claves=CLAVES,
+        orden=["fecha_semana"],
+        valor="precio_unitario_promedio",
+        excluir=["semana"],
+    )
+
+    # La numeración se materializa una vez y la recursión lee la tabla temporal
+    numerar, crear = sql.split(";\n\n")
+    assert numerar.startswith("CREATE TEMP TABLE _numerado AS")
+    assert "ORDER BY fecha_semana, FARM_FINGERPRINT(TO_JSON_STRING(t))" in numerar
+    assert "IS NOT DISTINCT FROM" not in crear
+    assert "ON n._grupo = p._grupo AND n._fila = p._fila + 1" in crear
+    assert crear.startswith("CREATE OR REPLACE TABLE `proyecto.staging.destino` AS")
+    assert "ROW_NUMBER" not in crear and "staging.origen" not in crear
+    assert "SAFE_DIVIDE" in sql
+    assert (
+        "EXCEPT (_grupo, _fila, semana) REPLACE (p._valor_ancla AS precio_unitario_promedio)"
+        in sql
+    )
+
+
+def test_sql_propagacion_valida_dialecto_y_columnas():
+    """Dialecto desconocido o sqlite sin columnas producen ValueError"""
+    with pytest.raises(ValueError):
+        sql_propagacion("a", "b", [], ["fecha"], "valor", dialecto="postgres")
+    with pytest.raises(ValueError):
+        sql_propagacion("a", "b", [], ["fecha"], "valor", dialecto="sqlite")
+    with pytest.raises(ValueError):
+        sql_propagacion("staging.a`; DROP TABLE x; --", "b", [], ["fecha"], "valor")
@@ -0,0 +1,137 @@
+"""
+Tests para las consultas de lectura con proyección y filtros
+"""
+
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.processing.bounds import agregar_limites
+from app.processing.model_selection import CLAVES
+from app.processing.price_solver import (
+    COLUMNAS_ENTRADA,
+    calcular_coef_k,
+    calcular_efecto_externo,
+    resolver_lote,
+)
+from app.processing.query_builder import literal, sql_lectura
+from app.processing.query_reader import a_dataframe, cargar_lotes
+from tests.test_price_solver import _tabla_sintetica
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def conexion():
+    """Tabla de la fixture de Arrow cargada en SQLite"""
+    df = a_dataframe(cargar_lotes(FIXTURES / "prep_optimizacion_semanal.arrow"))
+    df["fecha_semana"] = df["fecha_semana"].astype(str)
+    for columna in ("precio_unitario_promedio", "coste_unitario"):
+        df[columna] = df[columna].astype(float)
+    conexion = sqlite3.connect(":memory:")
+    df.to_sql("tabla_prep_optimizacion_semanal", conexion, index=False)
+    yield conexion, df
+    conexion.close()
+
+
+def test_sql_lectura_coincide_con_filtro_en_pandas(conexion):
+    """La consulta generada devuelve lo mismo que leer todo y filtrar en pandas"""
+    conexion, df = conexion
+    columnas = [*CLAVES, "precio_unitario_promedio", "venta_unidades"]
+    query = sql_lectura(
+        "tabla_prep_optimizacion_semanal",
+        columnas=columnas,
+        filtros=[
+            ("fecha_semana", ">=", "2023-03-01"),
+            ("id_canal_venta", "!=", "MA"),
+            ("venta_unidades", "IS NOT NULL"),
+            ("id_zona", "IN", ["Z1", "Z3"]),
+            ("precio_unitario_promedio", "<=", 400),
+        ],
+        dialecto="sqlite",
+    )
+
+    obtenido = pd.read_sql(query, conexion)
+    esperado = df[
+        (df["fecha_semana"] >= "2023-03-01")
+        & (df["id_canal_venta"] != "MA")
+        & df["venta_unidades"].notna()
+        & df["id_zona"].isin(["Z1", "Z3"])
+        & (df["precio_unitario_promedio"] <= 400)
+    ][columnas]
+
+    assert 0 < len(obtenido) < len(df)
+    assert list(obtenido.columns) == columnas
+    pd.testing.assert_frame_equal(
+        obtenido.reset_index(drop=True),
+        esperado.reset_index(drop=True),
+        check_dtype=False,
+    )
+
+    distintos = pd.read_sql(
+        sql_lectura(
+            "tabla_prep_optimizacion_semanal",
+            columnas=["id_zona"],
+            distinct=True,
+            dialecto="sqlite",
+        ),
+        conexion,
+    )
+    assert sorted(distintos["id_zona"]) == ["Z0", "Z1", "Z2", "Z3", "Z4"]
+
+
+def test_sql_lectura_bigquery():
+    """Formato para BigQuery: tabla citada, expresiones y literales escapados"""
+    query = sql_lectura(
+        "staging.test_variaciones",
+        columnas=["id_material", "precio"],
+        expresiones={"precio_anterior": "LAG(precio) OVER (ORDER BY fecha_semana)"},
+        filtros=[("id_canal_venta", "!=", "CO"), ("nombre", "=", "D'Angelo")],
+    )
+
+    assert query == (
+        "SELECT\n"
+        "    id_material,\n"
+        "    precio,\n"
+        "    LAG(precio) OVER (ORDER BY fecha_semana) AS precio_anterior\n"
+        "FROM `staging.test_variaciones`\n"
+        "WHERE id_canal_venta != 'CO'\n"
+        "    AND nombre = 'D\\'Angelo'"
+    )
+    assert sql_lectura("staging.t") == "SELECT\n    *\nFROM `staging.t`"
+    assert literal(True) == "TRUE"
+    assert literal(pd.Timestamp("2023-01-02").date()) == "DATE '2023-01-02'"
+
+
+@pytest.mark.parametrize(
+    "argumentos",
+    [
+        {"columnas": ["id; DROP TABLE x"]},
+        {"columnas": ["a", "a"]},
+        {"filtros": [("a", "LIKE", "x%")]},
+        {"filtros": [("a", "=", None)]},
+        {"filtros": [("a", "IN", [])]},
+        {"filtros": [("a", "IS NULL", 1)]},
+        {"dialecto": "postgres"},
+    ],
+)
+def test_sql_lectura_rechaza_entradas_invalidas(argumentos):
+    with pytest.raises(ValueError):
+        sql_lectura("staging.t", **argumentos)
+
+
+def test_proyeccion_de_optimizacion_es_suficiente():
+    """Las columnas que lee optimizacion_v3 alcanzan para todo el cálculo"""
+    completo = _tabla_sintetica(filas=40)
+    completo["grupo_articulo"] = "LÁCTEOS"
+    df = completo[[*CLAVES, "grupo_articulo", *COLUMNAS_ENTRADA]].copy()
+
+    df["coef_k"] = calcular_coef_k(df["elasticidad_promedio_historico"])
+    df["efecto_externo"] = calcular_efecto_externo(df, "exacta")
+    df = agregar_limites(df)
+    resultado = resolver_lote(df, "exacta")
+
+    assert len(resultado) == 40
+    assert resultado["precio_sugerido"].notna().all()
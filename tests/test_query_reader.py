@@ -0,0 +1,134 @@
+"""
+Tests para la lectura de resultados de BigQuery como lotes de Arrow
+
+Los resultados vienen de lotes grabados en ``tests/fixtures`` (ver
+``generar_fixtures.py``); no se usa la red.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from google.cloud import bigquery
+
+from app.processing import query_reader
+from app.processing.query_reader import cargar_lotes, leer_consulta
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class _FilasGrabadas:
+    """RowIterator que entrega lotes grabados y registra cómo se leyó"""
+
+    def __init__(self, lotes, lecturas, columnas=None):
+        self.lotes = lotes
+        self.lecturas = lecturas
+        self.columnas = columnas
+        self.schema = [
+            bigquery.SchemaField(campo.name, "STRING") for campo in lotes[0].schema
+        ]
+
+    def to_arrow_iterable(self, bqstorage_client=None):
+        self.lecturas.append({"storage": bqstorage_client, "columnas": self.columnas})
+        for lote in self.lotes:
+            yield lote.select(self.columnas) if self.columnas else lote
+
+
+class _Job:
+    def __init__(self, filas, destination):
+        self.filas = filas
+        self.destination = destination
+
+    def result(self):
+        return self.filas
+
+
+class _ClienteGrabado:
+    def __init__(self, archivo, destination="proyecto.dataset.anon"):
+        self.lotes = cargar_lotes(FIXTURES / archivo)
+        self.destination = destination
+        self.lecturas = []
+
+    def query(self, query):
+        return _Job(_FilasGrabadas(self.lotes, self.lecturas), self.destination)
+
+    def list_rows(self, table, selected_fields=None):
+        assert table == self.destination
+        columnas = [campo.name for campo in selected_fields]
+        return _FilasGrabadas(self.lotes, self.lecturas, columnas)
+
+
+@pytest.fixture
+def client():
+    return _ClienteGrabado("prep_optimizacion_semanal.arrow")
+
+
+def test_lectura_completa_con_tipos_nulables(client):
+    """Los lotes se unen y enteros/booleanos quedan como tipos nulables"""
+    df = leer_consulta(client, "SELECT * FROM tabla_prep_optimizacion_semanal")
+
+    assert len(client.lotes) > 1
+    assert len(df) == 600
+    assert str(df["venta_unidades"].dtype) == "Int64"
+    assert df["venta_unidades"].isna().sum() == 36
+    assert str(df["es_promocion"].dtype) == "boolean"
+    assert df["elasticidad_promedio_historico"].dtype == "float64"
+    assert client.lecturas == [{"storage": None, "columnas": None}]
+
+
+def test_proyeccion_y_tipos(client):
+    """Solo se leen las columnas pedidas y se convierten a los tipos indicados"""
+    columnas = ["id_material", "id_zona", "precio_unitario_promedio", "venta_unidades"]
+    df = leer_consulta(
+        client,
+        "SELECT * FROM tabla_prep_optimizacion_semanal",
+        columnas=columnas,
+        tipos={
+            "id_zona": "category",
+            "precio_unitario_promedio": "float64",
+            "venta_unidades": "Int32",
+        },
+    )
+
+    assert client.lecturas[0]["columnas"] == columnas
+    assert list(df.columns) == columnas
+    assert isinstance(df["id_zona"].dtype, pd.CategoricalDtype)
+    assert sorted(df["id_zona"].cat.categories) == ["Z0", "Z1", "Z2", "Z3", "Z4"]
+    assert df["precio_unitario_promedio"].dtype == "float64"
+    assert str(df["venta_unidades"].dtype) == "Int32"
+
+    completo = leer_consulta(client, "SELECT *")
+    assert df["precio_unitario_promedio"].tolist() == pytest.approx(
+        completo["precio_unitario_promedio"].astype(float).tolist()
+    )
+    assert (
+        df.memory_usage(deep=True).sum()
+        < completo[columnas].memory_usage(deep=True).sum()
+    )
+
+
+def test_storage_y_respaldo_rest(client, monkeypatch):
+    """Se usa la Storage Read API si está disponible; si no, REST"""
+    storage = object()
+    monkeypatch.setattr(query_reader, "cliente_storage", lambda c: storage)
+
+    leer_consulta(client, "SELECT *")
+    leer_consulta(client, "SELECT *", storage=False)
+
+    assert [lectura["storage"] for lectura in client.lecturas] == [storage, None]
+
+
+def test_errores_y_resultado_vacio(client):
+    """Columnas inexistentes fallan; un resultado vacío conserva las columnas"""
+    with pytest.raises(ValueError, match="no_existe"):
+        leer_consulta(client, "SELECT *", columnas=["id_material", "no_existe"])
+
+    client.lotes = [client.lotes[0].slice(0, 0)]
+    df = leer_consulta(client, "SELECT *", columnas=["id_zona"])
+    assert df.empty and list(df.columns) == ["id_zona"]
+
+    # Sin tabla destino (por ejemplo un CALL) la proyección se hace en cada lote
+    client.destination = None
+    client.lotes = cargar_lotes(FIXTURES / "prep_optimizacion_semanal.arrow")
+    df = leer_consulta(client, "SELECT *", columnas=["id_zona", "id_material"])
+    assert list(df.columns) == ["id_zona", "id_material"]
@@ -0,0 +1,127 @@
+"""
+Tests para la caché del catálogo de rutinas de BigQuery
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services.bigquery_service import BigQueryService, bigquery_service
+from app.services.flow_executor import FlowExecutor
+
+RUTINAS = {
+    "elasticidad_historica_kgv_semanal_v1": "PROCEDURE",
+    "elasticidad_tipo_cambio_semanal": "PROCEDURE",
+    "prep_tabla_dashboard_semanal": "PROCEDURE",
+    "normalizar_sku": "SCALAR FUNCTION",
+}
+
+
+class _Filas(list):
+    @property
+    def total_rows(self):
+        return len(self)
+
+
+class _Job:
+    def __init__(self, filas):
+        self.job_id = "job-rutinas"
+        self.state = "DONE"
+        self.filas = filas
+
+    def result(self, max_results=None):
+        return self.filas
+
+
+class _ClienteRutinas:
+    def __init__(self, rutinas):
+        self.rutinas = dict(rutinas)
+        self.consultas = []
+
+    def query(self, query, job_config=None):
+        self.consultas.append(query)
+        return _Job(
+            _Filas(
+                SimpleNamespace(routine_name=nombre, routine_type=tipo)
+                for nombre, tipo in self.rutinas.items()
+            )
+        )
+
+
+@pytest.fixture
+def servicio(monkeypatch):
+    servicio = BigQueryService()
+    servicio.client = _ClienteRutinas(RUTINAS)
+    monkeypatch.setattr("app.services.flow_executor.bigquery_service", servicio)
+    return servicio
+
+
+@pytest.mark.asyncio
+async def test_validacion_con_una_consulta(servicio):
+    """Validar un flujo de 13 pasos consulta ROUTINES una sola vez"""
+    nombres = list(RUTINAS)[:3] + ["no_existe"]
+    flujo = [
+        {"step": i, "type": "procedure", "name": nombres[i % len(nombres)]}
+        for i in range(1, 14)
+    ]
+
+    resultado = await FlowExecutor().validate_flow(flujo)
+
+    assert len(servicio.client.consultas) == 1
+    assert "INFORMATION_SCHEMA.ROUTINES" in servicio.client.consultas[0]
+    assert resultado["valid"]
+    assert (
+        resultado["warnings"]
+        == ["Procedimiento no_existe no encontrado en BigQuery"] * 3
+    )
+
+    # El listado sale de la misma caché y solo incluye procedimientos
+    procedimientos = await servicio.list_procedures("dev")
+    assert procedimientos == sorted(list(RUTINAS)[:3])
+    assert len(servicio.client.consultas) == 1
+
+
+@pytest.mark.asyncio
+async def test_vigencia_e_invalidacion(servicio, monkeypatch):
+    """La caché vence con el TTL, por entorno, y se puede descartar"""
+    await asyncio.gather(
+        *(servicio.validate_procedure_exists("x", "dev") for _ in range(5))
+    )
+    assert len(servicio.client.consultas) == 1
+
+    servicio.client.rutinas["nuevo_proc"] = "PROCEDURE"
+    assert not await servicio.validate_procedure_exists("nuevo_proc", "dev")
+    servicio.invalidate_routines("dev")
+    assert await servicio.validate_procedure_exists("nuevo_proc", "dev")
+    assert len(servicio.client.consultas) == 2
+
+    await servicio.list_procedures("prd")
+    assert "onus-prd-" in servicio.client.consultas[-1]
+    assert len(servicio.client.consultas) == 3
+
+    monkeypatch.setattr(settings, "ROUTINE_CACHE_TTL_SECONDS", 0)
+    await servicio.list_procedures("dev")
+    assert len(servicio.client.consultas) == 4
+
+
+def test_api_refresh(monkeypatch):
+    """POST /procedures/{env}/refresh vuelve a consultar el catálogo"""
+    cliente = _ClienteRutinas(RUTINAS)
+    monkeypatch.setattr(bigquery_service, "client", cliente)
+    monkeypatch.setattr(bigquery_service, "_routines", {})
+
+    with TestClient(app) as client:
+        assert client.get("/procedures/dev").json()["total_procedures"] == 3
+        cliente.rutinas["nuevo_proc"] = "PROCEDURE"
+        assert client.get("/procedures/dev").json()["total_procedures"] == 3
+
+        response = client.post("/procedures/dev/refresh")
+        assert response.status_code == 200
+        assert "nuevo_proc" in response.json()["procedures"]
+        assert client.post("/procedures/qa/refresh").status_code == 400
+
+    assert len(cliente.consultas) == 2
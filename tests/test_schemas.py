@@ -0,0 +1,194 @@
+"""
+Tests para los tipos compactos por tabla
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from app.processing.bounds import agregar_limites
+from app.processing.model_selection import (
+    CLAVES,
+    optimizar_por_modelo,
+    seleccionar_modelo,
+)
+from app.processing.price_solver import (
+    COLUMNAS_ENTRADA,
+    calcular_coef_k,
+    calcular_efecto_externo,
+    resolver_lote,
+)
+from app.processing.query_reader import a_dataframe, cargar_lotes, leer_consulta
+from app.processing.schemas import (
+    aplicar_tipos,
+    memoria_mb,
+    memoria_sin_tipos_mb,
+    reporte_memoria,
+    tipos_de,
+    unificar_categorias,
+)
+from tests.test_price_solver import _tabla_sintetica
+from tests.test_query_reader import _FilasGrabadas, _Job
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _tablas(filas: int = 120, semilla: int = 3):
+    """Tablas de optimización, historia de elasticidad y cambio de precio"""
+    rng = np.random.default_rng(semilla)
+    df = _tabla_sintetica(filas=filas, semilla=semilla)
+    df["grupo_articulo"] = rng.choice(["LÁCTEOS", "RES", "CONGELADOS"], filas)
+    df["id_canal_venta"] = rng.choice(["PU", "MM", "TR"], filas)
+    df = df[[*CLAVES, "grupo_articulo", *COLUMNAS_ENTRADA]]
+
+    # Historia con claves que no están en la tabla de optimización
+    df_check = pd.concat(
+        [df[CLAVES].iloc[::2], df[CLAVES].iloc[:5].assign(id_zona="Z9")]
+    ).reset_index(drop=True)
+    df_check["elasticidad_promedio_historico_count"] = pd.array(
+        rng.choice([1, 5, 20, None], len(df_check)), dtype="Int64"
+    )
+    df_check["elasticidad_promedio_historico"] = rng.uniform(-2, 0, len(df_check))
+
+    semanas = pd.concat([df[CLAVES]] * 3, ignore_index=True)
+    precio = rng.uniform(10, 20, len(semanas))
+    df_cambio = semanas.assign(
+        precio_unitario_promedio=precio,
+        precio_unitario_promedio_anterior=precio * rng.uniform(0.9, 1.1, len(precio)),
+    )
+    return df, df_check, df_cambio
+
+
+def _flujo(df, df_check, df_cambio):
+    """Los pasos de optimizacion_v3 después de la lectura"""
+    df = df.copy()
+    df["coef_k"] = calcular_coef_k(df["elasticidad_promedio_historico"])
+    df["efecto_aproximada"] = calcular_efecto_externo(df, "aproximada")
+    df["efecto_exacta"] = calcular_efecto_externo(df, "exacta")
+    df = agregar_limites(df)
+    df_metodo = seleccionar_modelo(df_check, df_cambio)
+    df_salida, _ = optimizar_por_modelo(
+        df,
+        df_metodo,
+        resolver_lote,
+        efectos={"aproximada": "efecto_aproximada", "exacta": "efecto_exacta"},
+    )
+    return df_salida
+
+
+def test_flujo_con_tipos_compactos_igual_al_original():
+    """Con categorías y float32 la salida coincide con la de tipos por defecto"""
+    df, df_check, df_cambio = _tablas()
+    esperado = _flujo(df, df_check, df_cambio)
+
+    compactas = unificar_categorias(
+        [
+            aplicar_tipos(df, tipos_de("tabla_prep_optimizacion_semanal")),
+            aplicar_tipos(df_check, tipos_de("test_elasticidad_historica_kgv_semanal")),
+            aplicar_tipos(
+                df_cambio,
+                tipos_de("staging.test_variaciones_precios_unidad_semanal_externos_v2"),
+            ),
+        ],
+        CLAVES,
+    )
+    assert compactas[0]["elasticidad_promedio_historico"].dtype == "float32"
+    assert compactas[0]["precio_unitario_promedio"].dtype == "float64"
+    obtenido = _flujo(*compactas)
+
+    assert len(obtenido) == len(esperado) > 0
+    for columna in esperado.columns:
+        if pd.api.types.is_numeric_dtype(esperado[columna]):
+            np.testing.assert_allclose(
+                obtenido[columna].to_numpy(dtype=float),
+                esperado[columna].to_numpy(dtype=float),
+                rtol=1e-5,
+            )
+        else:
+            assert (
+                obtenido[columna].astype(str).tolist()
+                == esperado[columna].astype(str).tolist()
+            )
+
+
+def test_unificar_categorias_une_por_codigos():
+    """Con las mismas categorías el merge conserva las claves categóricas"""
+    izquierda = pd.DataFrame({"id_zona": ["Z1", "Z2"], "a": [1, 2]}, dtype="category")
+    derecha = pd.DataFrame({"id_zona": ["Z2", "Z3"], "b": [3, 4]}, dtype="category")
+
+    izquierda, derecha = unificar_categorias([izquierda, derecha], ["id_zona"])
+    unido = izquierda.merge(derecha, on="id_zona")
+
+    assert list(izquierda["id_zona"].cat.categories) == ["Z1", "Z2", "Z3"]
+    assert isinstance(unido["id_zona"].dtype, pd.CategoricalDtype)
+    assert unido["id_zona"].tolist() == ["Z2"]
+
+
+def test_reporte_de_memoria_al_leer():
+    """Los tipos declarados reducen la memoria de la tabla leída"""
+    lotes = cargar_lotes(FIXTURES / "prep_optimizacion_semanal.arrow")
+    por_defecto = a_dataframe(lotes)
+    tipos = tipos_de("tabla_prep_optimizacion_semanal", por_defecto.columns)
+    compacto = a_dataframe(lotes, tipos)
+
+    assert isinstance(compacto["grupo_articulo"].dtype, pd.CategoricalDtype)
+    assert compacto["precio_unitario_promedio"].dtype == "float64"
+    assert compacto["elasticidad_promedio_historico"].dtype == "float32"
+    reporte = reporte_memoria(por_defecto, compacto)
+    assert reporte["despues_mb"] < reporte["antes_mb"]
+    assert reporte["reduccion_porcentaje"] > 30
+
+    # La estimación sin tipos coincide con la lectura por defecto; los
+    # NUMERIC (Decimal sin tipos) se cuentan como float64
+    numericas = ["precio_unitario_promedio", "coste_unitario"]
+    assert memoria_sin_tipos_mb(compacto.drop(columns=numericas)) == memoria_mb(
+        por_defecto.drop(columns=numericas)
+    )
+
+    with pytest.raises(KeyError):
+        tipos_de("tabla_sin_esquema")
+
+
+class _ClienteConsulta:
+    """Cliente cuya consulta devuelve un lote con las columnas indicadas"""
+
+    def __init__(self, lote):
+        self.lote = lote
+
+    def query(self, query):
+        return _Job(_FilasGrabadas([self.lote], []), None)
+
+
+def test_lectura_de_cambio_de_precio_con_tipos_proyectados():
+    """Los tipos de la lectura proyectada solo cubren las columnas del SELECT"""
+    columnas = [*CLAVES, "precio_unitario_promedio"]
+    lote = pa.RecordBatch.from_pydict(
+        {
+            "id_material": ["M1", "M1", "M2"],
+            "id_zona": ["Z1", "Z1", "Z2"],
+            "id_canal_venta": ["PU", "PU", "TR"],
+            "precio_unitario_promedio": [10.0, 10.5, 7.0],
+            "precio_unitario_promedio_anterior": [None, 10.0, None],
+        }
+    )
+    cliente = _ClienteConsulta(lote)
+    tabla = "test_variaciones_precios_unidad_semanal_externos_v2"
+
+    df = leer_consulta(
+        cliente,
+        "SELECT ...",
+        tipos=tipos_de(tabla, [*columnas, "precio_unitario_promedio_anterior"]),
+    )
+
+    assert isinstance(df["id_zona"].dtype, pd.CategoricalDtype)
+    assert df["precio_unitario_promedio_anterior"].isna().tolist() == [
+        True,
+        False,
+        True,
+    ]
+    # El esquema completo declara coste_unitario, que esta consulta no lee
+    with pytest.raises(ValueError, match="coste_unitario"):
+        leer_consulta(cliente, "SELECT ...", tipos=tipos_de(tabla))
@@ -0,0 +1,115 @@
+"""
+Tests para la lectura acotada de la salida de los scripts
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.models.flow import FlowStep
+from app.services.flow_executor import FlowExecutor
+from app.services.flow_runner import FlowRunner
+from app.services.script_output import OutputBuffer
+from app.services.script_worker import ScriptWorkerPool
+
+# Imprime muchas líneas, como un DataFrame con display.max_rows = None
+VERBOSO = """
+print("inicio")
+for i in range(50000):
+    print(f"fila {i:05d} " + "x" * 40)
+print("fin")
+"""
+
+# Avisa cada fase y espera a que el test la observe en el estado del flujo
+POR_FASES = """
+import sys, time
+from pathlib import Path
+print("fase 1: lectura", flush=True)
+while not (Path(__file__).parent / "continuar").exists():
+    time.sleep(0.02)
+print("fase 2: escritura", flush=True)
+print("aviso", file=sys.stderr)
+"""
+
+
+@pytest.fixture
+def scripts(tmp_path):
+    (tmp_path / "dev").mkdir()
+    (tmp_path / "dev" / "verboso.py").write_text(VERBOSO)
+    (tmp_path / "dev" / "por_fases.py").write_text(POR_FASES)
+    return tmp_path
+
+
+def test_output_buffer_conserva_inicio_y_final():
+    """Se omiten las líneas intermedias y las líneas enormes se recortan"""
+    lineas = []
+    buffer = OutputBuffer(max_chars=40, on_line=lineas.append)
+    buffer.feed("uno\ndos\ntr")
+    buffer.feed("es\n" + "".join(f"{i}\n" for i in range(100)))
+    buffer.feed("y" * 500)
+    buffer.close()
+
+    texto = buffer.text()
+    assert texto.startswith("uno\ndos\ntres\n")
+    assert texto.rstrip().endswith("y" * 18 + "…")
+    assert "líneas omitidas" in texto
+    assert len(lineas) == buffer.lines == 104
+    assert buffer.omitted_lines > 90
+    assert len(texto) < 100
+
+
+@pytest.mark.parametrize("modo", ["subprocess", "worker"])
+@pytest.mark.asyncio
+async def test_salida_extensa_acotada(scripts, modo, monkeypatch):
+    """La salida guardada no crece con la verbosidad del script"""
+    monkeypatch.setattr(settings, "SCRIPT_OUTPUT_MAX_CHARS", 2000)
+    executor = FlowExecutor()
+    executor.scripts_path = scripts
+    executor.worker_pool = ScriptWorkerPool(size=1, preload=())
+    step = FlowStep(step=1, type="script", name="verboso.py", execution=modo)
+    try:
+        result = await executor._execute_step(step, "dev")
+    finally:
+        await executor.close()
+
+    assert result.status == "success"
+    assert len(result.output) < 2100
+    assert result.output.startswith("inicio\nfila 00000")
+    assert result.output.endswith("fila 49999 " + "x" * 40 + "\nfin\n")
+    assert result.metadata["output_lines"] == 50002
+    assert result.metadata["omitted_output_lines"] > 49000
+
+
+@pytest.mark.parametrize("modo", ["subprocess", "worker"])
+@pytest.mark.asyncio
+async def test_avance_en_vivo(scripts, modo, monkeypatch):
+    """La salida parcial del paso en ejecución se publica en el estado del flujo"""
+    monkeypatch.setattr(settings, "FLOW_PROGRESS_INTERVAL", 0.05)
+    executor = FlowExecutor()
+    executor.scripts_path = scripts
+    executor.worker_pool = ScriptWorkerPool(size=1, preload=())
+    runner = FlowRunner(executor)
+    try:
+        flow = await runner.submit(
+            [FlowStep(step=1, type="script", name="por_fases.py", execution=modo)],
+            "dev",
+        )
+        for _ in range(200):
+            paso = (await runner.get_steps(flow.flow_id))[0]
+            if paso.output:
+                break
+            await asyncio.sleep(0.05)
+
+        assert paso.status == "running"
+        assert paso.output == "fase 1: lectura\n"
+        assert paso.metadata == {"output_lines": 1}
+
+        (scripts / "dev" / "continuar").touch()
+        await runner.wait(flow.flow_id)
+    finally:
+        await executor.close()
+
+    paso = (await runner.get_steps(flow.flow_id))[0]
+    assert paso.status == "success"
+    assert paso.output == "fase 1: lectura\nfase 2: escritura\n"
@@ -0,0 +1,96 @@
+"""
+Tests para la ejecución de scripts en workers persistentes
+"""
+
+import asyncio
+
+import pytest
+
+from app.models.flow import FlowStep
+from app.services.flow_executor import FlowExecutor
+from app.services.script_worker import ScriptWorkerPool, run_script
+
+SCRIPT = """
+import argparse, os, sys
+parser = argparse.ArgumentParser()
+parser.add_argument("--valor", default="0")
+args = parser.parse_args()
+print(os.getpid(), os.environ["ENVIRONMENT"], args.valor, "json" in sys.modules)
+if args.valor == "falla":
+    sys.exit("valor inválido")
+"""
+
+
+@pytest.fixture
+def scripts(tmp_path):
+    (tmp_path / "dev").mkdir()
+    (tmp_path / "dev" / "paso.py").write_text(SCRIPT)
+    (tmp_path / "dev" / "lento.py").write_text("import time\ntime.sleep(30)\n")
+    return tmp_path
+
+
+def test_run_script_como_main(scripts):
+    """Argumentos, entorno, salida y códigos de salida como en un subproceso"""
+    path = str(scripts / "dev" / "paso.py")
+
+    ok = run_script(path, ["--valor", "7"], "prd")
+    falla = run_script(path, ["--valor", "falla"], "dev")
+
+    assert ok["returncode"] == 0 and ok["stdout"].split()[1:3] == ["prd", "7"]
+    assert falla["returncode"] == 1 and falla["stderr"].strip() == "valor inválido"
+
+
+@pytest.mark.asyncio
+async def test_pool_reutiliza_worker_y_reemplaza_en_timeout(scripts):
+    """El mismo proceso atiende varios pasos; un timeout lo reemplaza"""
+    pool = ScriptWorkerPool(size=1, preload=("json",))
+    path = str(scripts / "dev" / "paso.py")
+    try:
+        primero = await pool.run(path, ["--valor", "1"], "dev")
+        segundo = await pool.run(path, ["--valor", "2"], "dev")
+        pid, _, _, precargado = primero["stdout"].split()
+        assert segundo["stdout"].split()[0] == pid
+        assert precargado == "True"
+
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(str(scripts / "dev" / "lento.py"), [], "dev", timeout=0.5)
+        tercero = await pool.run(path, [], "dev")
+
+        assert tercero["stdout"].split()[0] != pid
+        assert pool.stats == {
+            "runs": 3,
+            "restarts": 1,
+            "overhead_seconds": pytest.approx(pool.stats["overhead_seconds"]),
+        }
+    finally:
+        await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_executor_modo_worker(scripts):
+    """El paso registra el modo de ejecución; el error del script se reporta igual"""
+    executor = FlowExecutor()
+    executor.scripts_path = scripts
+    executor.worker_pool = ScriptWorkerPool(size=1, preload=("json",))
+    pasos = [
+        FlowStep(step=1, type="script", name="paso.py", execution="worker"),
+        FlowStep(
+            step=2,
+            type="script",
+            name="paso.py",
+            execution="worker",
+            parameters={"valor": "falla"},
+        ),
+        FlowStep(step=3, type="script", name="paso.py", execution="subprocess"),
+    ]
+    try:
+        flow = await executor.execute_flow(pasos, "dev")
+    finally:
+        await executor.close()
+
+    uno, dos, tres = flow.results
+    assert uno.status == "success" and uno.metadata["execution_mode"] == "worker"
+    assert uno.metadata["overhead_seconds"] >= 0
+    assert dos.status == "error" and "valor inválido" in dos.error
+    assert tres.metadata["execution_mode"] == "subprocess"
+    assert uno.output.split()[0] != tres.output.split()[0]
@@ -0,0 +1,241 @@
+"""
+Tests para el suavizado de elasticidades por grupo
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.processing.smoothing import (
+    COLUMNAS_SUAVIZADO,
+    ESTRATEGIAS,
+    EstrategiaSuavizado,
+    MediaMovil,
+    aplicar_suavizado,
+    crear_estrategias,
+    en_rango,
+    parsear_nombres,
+    suavizar_elasticidades,
+)
+
+
+def _ciclo_original(df: pd.DataFrame, lim_elast_neg: float = -3) -> pd.DataFrame:
+    """
+    Recorrido material × zona × canal de suavizado_de_elasticidades.py
+
+    Con la evaluación por prioridad: si la media móvil queda en rango, el
+    suavizado exponencial no se calcula (repite el promedio y queda "False").
+    """
+    list_suav = []
+    for m in df.id_material.unique().tolist():
+        for z in df.id_zona.unique().tolist():
+            for c in df.id_canal_venta.unique().tolist():
+                df_ev = df[
+                    (df["id_material"] == m)
+                    & (df["id_zona"] == z)
+                    & (df["id_canal_venta"] == c)
+                ][["fecha_semana", "elasticidad_semana"]]
+                if len(df_ev) > 0:
+                    s = df_ev.sort_values(by="fecha_semana")["elasticidad_semana"]
+                    elas_prom = s.mean()
+                    prom_rango = en_rango(elas_prom, lim_elast_neg).item()
+                    if prom_rango == "False":
+                        elas_media_movil = s.rolling(window=3).mean().dropna().mean()
+                        media_rango = en_rango(elas_media_movil, lim_elast_neg).item()
+                        if media_rango == "True":
+                            elas_suav_exp, suav_rango = elas_prom, "False"
+                        else:
+                            elas_suav_exp = s.ewm(alpha=0.3, adjust=False).mean().mean()
+                            suav_rango = en_rango(elas_suav_exp, lim_elast_neg).item()
+                        list_suav.append(
+                            [
+                                m,
+                                z,
+                                c,
+                                elas_prom,
+                                prom_rango,
+                                elas_media_movil,
+                                media_rango,
+                                elas_suav_exp,
+                                suav_rango,
+                            ]
+                        )
+                    else:
+                        list_suav.append(
+                            [m, z, c, elas_prom, prom_rango]
+                            + [elas_prom, "False", elas_prom, "False"]
+                        )
+    return pd.DataFrame(list_suav, columns=COLUMNAS_SUAVIZADO)
+
+
+def _tabla_semanal(materiales: int = 40, semilla: int = 5) -> pd.DataFrame:
+    """Elasticidades semanales con combinaciones faltantes y nulos"""
+    rng = np.random.default_rng(semilla)
+    filas = []
+    for m in range(materiales):
+        for z in ["Z1", "Z2", "Z3"]:
+            for c in ["PU", "MM", "MA"]:
+                if rng.random() < 0.4:
+                    continue
+                for w in rng.permutation(int(rng.integers(1, 12))):
+                    filas.append(
+                        [
+                            str(1000 + m),
+                            z,
+                            c,
+                            pd.Timestamp("2024-01-01") + pd.Timedelta(weeks=int(w)),
+                            rng.normal(-1.0, 2.5),
+                        ]
+                    )
+    df = pd.DataFrame(
+        filas,
+        columns=[
+            "id_material",
+            "id_zona",
+            "id_canal_venta",
+            "fecha_semana",
+            "elasticidad_semana",
+        ],
+    )
+    df.loc[rng.choice(len(df), 10, replace=False), "elasticidad_semana"] = np.nan
+    return df.sample(frac=1, random_state=semilla, ignore_index=True)
+
+
+def test_suavizar_elasticidades_identico_al_ciclo_original():
+    """El groupby reproduce exactamente la tabla df_suav_test del ciclo"""
+    df = _tabla_semanal()
+
+    esperado = _ciclo_original(df)
+    resultado = suavizar_elasticidades(df)
+
+    assert (esperado["elasticidad_promedio_historico_rango"] == "False").any()
+    assert (esperado["elasticidad_media_movil_rango"] == "True").any()
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+
+def test_en_rango_trata_nulos_como_fuera_de_rango():
+    """Los nulos y los valores fuera de [lim, 0] quedan en "False" """
+    assert en_rango([-1.0, 0.5, np.nan, -4.0, 0.0]).tolist() == [
+        "True",
+        "False",
+        "False",
+        "False",
+        "True",
+    ]
+
+
+def _aplicacion_original(df_backup: pd.DataFrame, df_suav_test: pd.DataFrame):
+    """Unión y selección de elasticidad de suavizado_de_elasticidades.py"""
+    df_suav_test = df_suav_test.drop(columns=["elasticidad_promedio_historico"])
+    df_g = df_backup.merge(
+        df_suav_test, on=["id_material", "id_zona", "id_canal_venta"], how="left"
+    )
+    df_g["elasticidad_fix"] = np.select(
+        [
+            df_g["elasticidad_promedio_historico_rango"] == "True",
+            df_g["elasticidad_media_movil_rango"] == "True",
+            df_g["elasticidad_exp_rango"] == "True",
+        ],
+        [
+            df_g["elasticidad_promedio_historico"],
+            df_g["elasticidad_media_movil"],
+            df_g["elasticidad_exp"],
+        ],
+        default=df_g["elasticidad_promedio_historico"],
+    )
+    df_g["suavizado_aplicado"] = np.select(
+        [
+            df_g["elasticidad_media_movil_rango"] == "True",
+            df_g["elasticidad_exp_rango"] == "True",
+        ],
+        ["suavizado", "suavizado"],
+        default="no_suavizado",
+    )
+    df_g["elasticidad_promedio_historico_presuavizado"] = df_g[
+        "elasticidad_promedio_historico"
+    ]
+    df_g["elasticidad_promedio_historico"] = df_g["elasticidad_fix"]
+    return df_g.drop(
+        columns=[
+            "elasticidad_fix",
+            "elasticidad_promedio_historico_rango",
+            "elasticidad_media_movil",
+            "elasticidad_media_movil_rango",
+            "elasticidad_exp",
+            "elasticidad_exp_rango",
+        ]
+    )
+
+
+def test_aplicar_suavizado_identico_a_la_seleccion_original():
+    """La tabla final coincide con la selección np.select del script"""
+    df = _tabla_semanal()
+    rng = np.random.default_rng(1)
+    df["elasticidad_promedio_historico"] = rng.uniform(-1, 1, len(df))
+
+    evaluadas = df[
+        (df["elasticidad_promedio_historico"] > 0)
+        & (df["elasticidad_promedio_historico"] <= 0.5)
+    ]
+    df_suav = suavizar_elasticidades(evaluadas)
+
+    pd.testing.assert_frame_equal(
+        aplicar_suavizado(df, df_suav), _aplicacion_original(df, df_suav)
+    )
+
+
+class _Contador(EstrategiaSuavizado):
+    """Estrategia de prueba que registra cuántas combinaciones recibe"""
+
+    nombre = "contador"
+    columna = "elasticidad_contador"
+
+    def __init__(self):
+        self.combinaciones = 0
+
+    def calcular(self, grupos):
+        self.combinaciones += grupos.ngroups
+        return grupos.mean()
+
+
+def test_suavizar_elasticidades_evalua_por_prioridad():
+    """Cada estrategia solo recibe las combinaciones aún fuera de rango"""
+    df = _tabla_semanal()
+    contador = _Contador()
+    estrategias = [*crear_estrategias(["promedio", "media_movil"]), contador]
+
+    df_suav = suavizar_elasticidades(df, estrategias=estrategias)
+
+    resueltas = (df_suav["elasticidad_promedio_historico_rango"] == "True") | (
+        df_suav["elasticidad_media_movil_rango"] == "True"
+    )
+    assert 0 < contador.combinaciones == (~resueltas).sum() < len(df_suav)
+    assert (df_suav.loc[resueltas, "elasticidad_contador_rango"] == "False").all()
+    assert list(df_suav.columns[-2:]) == [
+        "elasticidad_contador",
+        "elasticidad_contador_rango",
+    ]
+
+
+def test_crear_estrategias_parametros_y_errores():
+    """Los parámetros llegan a cada estrategia y los nombres se validan"""
+    estrategias = crear_estrategias(
+        ["media_movil", "exponencial"], ventana=5, alpha=0.5
+    )
+
+    assert isinstance(estrategias[0], MediaMovil) and estrategias[0].ventana == 5
+    assert estrategias[1].alpha == 0.5
+    assert set(ESTRATEGIAS) == {"promedio", "media_movil", "exponencial"}
+    with pytest.raises(ValueError):
+        crear_estrategias(["promedio", "otra"])
+    with pytest.raises(ValueError):
+        crear_estrategias([])
+
+
+def test_parsear_nombres_acepta_texto_y_lista():
+    """Acepta nombres separados por comas o una lista convertida a texto"""
+    assert parsear_nombres("promedio, exponencial") == ["promedio", "exponencial"]
+    assert parsear_nombres(str(["promedio", "media_movil"])) == [
+        "promedio",
+        "media_movil",
+    ]
@@ -0,0 +1,87 @@
+"""
+Tests para el archivo de métricas estructuradas de los scripts
+"""
+
+import json
+
+import pytest
+
+from app.models.flow import FlowStep
+from app.processing.step_metrics import MetricasPaso
+from app.services.flow_executor import FlowExecutor
+from app.services.script_worker import ScriptWorkerPool
+
+CON_METRICAS = """
+import time
+from app.processing.step_metrics import MetricasPaso
+
+metricas = MetricasPaso()
+with metricas.fase("lectura"):
+    filas = metricas.leidas(list(range(120)))
+with metricas.fase("escritura"):
+    time.sleep(0.01)
+metricas.escritas(80)
+print("resultado en texto")
+metricas.guardar(modelo="exacta")
+"""
+
+
+@pytest.fixture
+def scripts(tmp_path):
+    (tmp_path / "dev").mkdir()
+    (tmp_path / "dev" / "con_metricas.py").write_text(CON_METRICAS)
+    (tmp_path / "dev" / "sin_metricas.py").write_text("print('ok')\n")
+    (tmp_path / "dev" / "invalido.py").write_text(
+        "import os\nopen(os.environ['FLOW_RESULT_FILE'], 'w').write('[1, 2')\n"
+    )
+    return tmp_path
+
+
+def test_metricas_paso_guardar(tmp_path, monkeypatch):
+    """Sin FLOW_RESULT_FILE no se escribe nada; las fases repetidas se suman"""
+    monkeypatch.delenv("FLOW_RESULT_FILE", raising=False)
+    metricas = MetricasPaso()
+    for _ in range(2):
+        with metricas.fase("lectura"):
+            metricas.leidas([1, 2, 3])
+    assert metricas.guardar() is False
+
+    ruta = tmp_path / "resultado.json"
+    monkeypatch.setenv("FLOW_RESULT_FILE", str(ruta))
+    assert metricas.guardar(modelo="exacta") is True
+
+    data = json.loads(ruta.read_text())
+    assert data["rows_read"] == 6 and data["rows_written"] == 0
+    assert list(data["phase_seconds"]) == ["lectura"]
+    assert data["peak_memory_mb"] > 0
+    assert data["modelo"] == "exacta"
+
+
+@pytest.mark.parametrize("modo", ["subprocess", "worker"])
+@pytest.mark.asyncio
+async def test_metricas_en_metadata(scripts, modo):
+    """Las métricas del script llegan a StepResult.metadata en ambos modos"""
+    executor = FlowExecutor()
+    executor.scripts_path = scripts
+    executor.worker_pool = ScriptWorkerPool(size=1, preload=())
+    pasos = [
+        FlowStep(step=i, type="script", name=nombre, execution=modo)
+        for i, nombre in enumerate(
+            ["con_metricas.py", "sin_metricas.py", "invalido.py"], start=1
+        )
+    ]
+    try:
+        con, sin, invalido = [await executor._execute_step(p, "dev") for p in pasos]
+    finally:
+        await executor.close()
+
+    assert con.status == "success" and con.output == "resultado en texto\n"
+    assert con.metadata["rows_read"] == 120 and con.metadata["rows_written"] == 80
+    assert set(con.metadata["phase_seconds"]) == {"lectura", "escritura"}
+    assert con.metadata["phase_seconds"]["escritura"] >= 0.01
+    assert con.metadata["modelo"] == "exacta"
+    assert con.metadata["execution_mode"] == modo
+
+    assert "rows_read" not in sin.metadata
+    assert invalido.status == "success"
+    assert invalido.metadata["result_error"].startswith("archivo de resultado inválido")
@@ -0,0 +1,154 @@
+"""
+Tests para la escritura de tablas como Parquet con esquema explícito
+"""
+
+import datetime
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.processing.query_reader import a_dataframe, cargar_lotes
+from app.processing.schemas import tipos_de
+from app.processing.table_writer import (
+    EscritorBigQuery,
+    EscritorLocal,
+    EscritorParquet,
+    campos_bigquery,
+    esquema_arrow,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def df():
+    """Tabla de la fixture con las claves como categorías"""
+    lotes = cargar_lotes(FIXTURES / "prep_optimizacion_semanal.arrow")
+    df = a_dataframe(lotes)
+    return a_dataframe(lotes, tipos_de("tabla_prep_optimizacion_semanal", df.columns))
+
+
+def test_esquema_fijo_compatible_con_bigquery():
+    """Categorías, float32, Int32 y decimales quedan con tipos estables"""
+    df = pd.DataFrame(
+        {
+            "id_zona": pd.Categorical(["Z1", "Z2"]),
+            "nombre": ["a", None],
+            "conteo": pd.array([1, None], dtype="Int32"),
+            "elasticidad": pd.array([-1.5, 0.0], dtype="float32"),
+            "precio": [Decimal("1.1"), None],
+            "fecha": [datetime.date(2023, 1, 2), None],
+            "cargado": pd.to_datetime(["2023-01-02", "2023-01-03"], utc=True),
+            "activo": [True, False],
+        }
+    )
+
+    campos = {c.name: c.field_type for c in campos_bigquery(esquema_arrow(df))}
+
+    assert campos == {
+        "id_zona": "STRING",
+        "nombre": "STRING",
+        "conteo": "INTEGER",
+        "elasticidad": "FLOAT",
+        "precio": "NUMERIC",
+        "fecha": "DATE",
+        "cargado": "TIMESTAMP",
+        "activo": "BOOLEAN",
+    }
+    with pytest.raises(ValueError, match="no tiene valores"):
+        esquema_arrow(pd.DataFrame({"vacia": [None, None]}))
+
+
+def test_escritor_local_reemplaza_por_fragmentos(tmp_path, df):
+    """Los fragmentos leídos de vuelta son la tabla original"""
+    escritor = EscritorLocal(tmp_path, filas_por_fragmento=250, compresion="zstd")
+    escritor.escribir(df.head(10), "staging.tabla_optimizacion_semanal")
+
+    reporte = escritor.escribir(df, "staging.tabla_optimizacion_semanal")
+
+    ruta = escritor.ruta("staging.tabla_optimizacion_semanal")
+    archivos = sorted(p.name for p in ruta.iterdir())
+    assert archivos == [f"parte-0000{i}.parquet" for i in range(3)]
+    assert reporte["filas"] == len(df) == 600
+    assert reporte["fragmentos"] == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == [ruta.name]
+
+    leido = pq.read_table(ruta)
+    campos = {c.name: c.field_type for c in campos_bigquery(leido.schema)}
+    assert campos["id_zona"] == "STRING"
+    assert campos["elasticidad_promedio_historico"] == "FLOAT"
+    assert campos["venta_unidades"] == "INTEGER"
+    assert leido.num_rows == len(df)
+    leido = leido.to_pandas()
+    assert leido["id_zona"].tolist() == df["id_zona"].astype(str).tolist()
+    assert leido["venta_unidades"].isna().sum() == df["venta_unidades"].isna().sum()
+
+    with pytest.raises(TypeError):
+        EscritorParquet()
+
+
+class _Job:
+    def result(self):
+        return self
+
+
+class _ClienteGrabado:
+    """Cliente de BigQuery que registra las cargas, copias y borrados"""
+
+    def __init__(self, fallar_en: int = 0):
+        self.llamadas = []
+        self.fallar_en = fallar_en
+
+    def load_table_from_file(self, archivo, tabla, size, job_config):
+        filas = pq.read_table(pa.BufferReader(archivo.read())).num_rows
+        self.llamadas.append(("carga", tabla, job_config.write_disposition, filas))
+        assert job_config.source_format == "PARQUET"
+        assert not job_config.autodetect and job_config.schema
+        if len(self.llamadas) == self.fallar_en:
+            raise RuntimeError("carga fallida")
+        return _Job()
+
+    def copy_table(self, origen, destino, job_config):
+        self.llamadas.append(("copia", origen, destino, job_config.write_disposition))
+        return _Job()
+
+    def delete_table(self, tabla, not_found_ok):
+        self.llamadas.append(("borrado", tabla))
+
+
+def test_escritor_bigquery_usa_tabla_temporal_y_copia(df):
+    cliente = _ClienteGrabado()
+    EscritorBigQuery(cliente, filas_por_fragmento=250).escribir(df, "staging.t")
+
+    temporal = cliente.llamadas[0][1]
+    assert temporal.startswith("staging.t_carga_")
+    assert cliente.llamadas == [
+        ("carga", temporal, "WRITE_TRUNCATE", 250),
+        ("carga", temporal, "WRITE_APPEND", 250),
+        ("carga", temporal, "WRITE_APPEND", 100),
+        ("copia", temporal, "staging.t", "WRITE_TRUNCATE"),
+        ("borrado", temporal),
+    ]
+
+    # Un solo fragmento va directo al destino
+    cliente = _ClienteGrabado()
+    EscritorBigQuery(cliente).escribir(df, "staging.t")
+    assert cliente.llamadas == [("carga", "staging.t", "WRITE_TRUNCATE", 600)]
+
+
+def test_escritor_bigquery_no_toca_el_destino_si_falla_una_carga(df):
+    cliente = _ClienteGrabado(fallar_en=2)
+    with pytest.raises(RuntimeError):
+        EscritorBigQuery(cliente, filas_por_fragmento=250).escribir(df, "staging.t")
+
+    assert [llamada[0] for llamada in cliente.llamadas] == [
+        "carga",
+        "carga",
+        "borrado",
+    ]
+    with pytest.raises(ValueError):
+        EscritorBigQuery(cliente, compresion="lz4")